@@ -44,7 +44,7 @@ class PlanAppliedSerializer(serializers.ModelSerializer):
 
   class Meta:
     model = PlanApplied
-    fields = ('id', 'user', 'status')
+    fields = ('id', 'user', 'status', 'compliance')
 
 class PlanSessionSerializer(serializers.ModelSerializer):
   sport = serializers.PrimaryKeyRelatedField(queryset=Sport.objects.filter(depth=1))
@@ -36,6 +36,19 @@ urlpatterns += patterns('',
   # Copy a plan
   url(r'^plans/(?P<pk>[\d]+)/copy/', views.PlanCopyView.as_view(), name='plan-copy'),
 
+  # Precomputed club stats
+  url(r'^clubs/(?P<slug>[\w\_\-]+)/stats/(?P<period>week|month)/', views.ClubStatsView.as_view(), name='club-stats'),
+
+  # Club leaderboards, from redis
+  url(r'^clubs/(?P<slug>[\w\_\-]+)/leaderboard/(?P<period>week|month)/', views.ClubLeaderboardView.as_view(), name='club-leaderboard'),
+
+  # Trainer inbox, by pages
+  url(r'^inbox/', views.TrainerInboxView.as_view(), name='trainer-inbox'),
+
+  # Athlete stats, with conditional requests
+  url(r'^users/(?P<username>[\w\_\-]+)/stats/(?P<period>months|weeks|sports)/', views.AthleteStatsView.as_view(), name='athlete-stats'),
+  url(r'^users/(?P<username>[\w\_\-]+)/year/(?P<year>\d{4})/', views.AthleteYearView.as_view(), name='athlete-year'),
+
   # Initiate a paymill payment
   url(r'payment/token/', views.PaymentTokenView.as_view(), name='payment-token'),
 )
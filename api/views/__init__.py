@@ -2,3 +2,5 @@ from .user import AthleteDetails, ClubMembershipViewSet
 from .sport import SportViewSet
 from .plan import PlanViewSet, PlanSessionViewSet, PlanPublishView, PlanCopyView, PlanAppliedViewSet, PlanMessagesViewSet
 from .payment import PaymentTokenView
+from .club import ClubStatsView, ClubLeaderboardView, TrainerInboxView
+from .stats import AthleteStatsView, AthleteYearView
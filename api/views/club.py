@@ -0,0 +1,121 @@
+from __future__ import absolute_import
+from rest_framework import views, response
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from club.stats import ClubStats, CLUB_STATS_OFFSETS
+from club.tasks import build_club_stats
+from club.leaderboard import Leaderboard, LEADERBOARD_CRITERIAS, load_athletes
+from club.inbox import TrainerInbox
+from club.models import Club, TRAINER_ACTIVITY_KINDS
+from api.serializers import AthleteSerializer, SportSerializer
+
+def load_club(request, slug, roles):
+  '''
+  Load a club for the current user, like ClubMixin:
+  admins or members with an allowed role
+  '''
+  club = get_object_or_404(Club, slug=slug)
+  if not request.user.is_staff and not request.user.memberships.filter(club=club, role__in=roles).exists():
+    raise PermissionDenied
+  return club
+
+class ClubStatsView(views.APIView):
+  '''
+  Precomputed stats of a club,
+  for its trainers & staff
+  '''
+  def get(self, request, *args, **kwargs):
+    club = load_club(request, kwargs['slug'], ('trainer', 'staff'))
+
+    try:
+      offset = int(request.query_params.get('offset', 0))
+    except ValueError:
+      raise Http404('Invalid offset')
+    if offset not in CLUB_STATS_OFFSETS:
+      raise Http404('Invalid offset')
+
+    # Only read the precomputed document
+    stats = ClubStats(club).get(kwargs['period'], offset)
+    if stats is None:
+      build_club_stats.delay(club.pk)
+      return response.Response({'detail' : 'Stats are being computed'}, status=202)
+    return response.Response(stats)
+
+class ClubLeaderboardView(views.APIView):
+  '''
+  Top athletes of a club leaderboard,
+  with the rank of the current user
+  '''
+  def get(self, request, *args, **kwargs):
+    club = load_club(request, kwargs['slug'], ('athlete', 'trainer', 'staff'))
+
+    try:
+      offset = int(request.query_params.get('offset', 0))
+      limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+    except ValueError:
+      raise Http404('Invalid offset or limit')
+    if offset not in CLUB_STATS_OFFSETS:
+      raise Http404('Invalid offset')
+    criteria = request.query_params.get('criteria', 'distance')
+    if criteria not in LEADERBOARD_CRITERIAS:
+      raise Http404('Invalid criteria')
+
+    board = Leaderboard.current(club.pk, kwargs['period'], offset)
+    ranking = board.get(criteria, request.user.pk, limit)
+
+    # Add athletes names, when sharing their stats
+    load_athletes([ranking, ], request.user)
+    for r in ranking['top']:
+      u = r.pop('athlete')
+      r['username'] = u and u.username
+      r['name'] = u and u'%s %s' % (u.first_name, u.last_name)
+
+    ranking.update({
+      'period' : kwargs['period'],
+      'start' : board.start,
+      'criteria' : criteria,
+    })
+    return response.Response(ranking)
+
+class TrainerInboxView(views.APIView):
+  '''
+  Recent activity of the current
+  trainer athletes, by pages
+  '''
+  def get(self, request, *args, **kwargs):
+    if not request.user.is_trainer:
+      raise PermissionDenied
+
+    kinds = [k for k in request.query_params.get('kinds', '').split(',') if k]
+    if set(kinds) - set(dict(TRAINER_ACTIVITY_KINDS).keys()):
+      raise Http404('Invalid kinds')
+    try:
+      limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+    except ValueError:
+      raise Http404('Invalid limit')
+    try:
+      activities, cursor = TrainerInbox(request.user).page(kinds, cursor=request.query_params.get('cursor'), limit=limit)
+    except ValueError, e:
+      raise Http404(str(e))
+
+    context = {'request' : request}
+    return response.Response({
+      'next' : cursor,
+      'results' : [{
+        'id' : a.pk,
+        'kind' : a.kind,
+        'date' : a.date,
+        'updated' : a.updated,
+        'athlete' : AthleteSerializer(a.athlete, context=context).data,
+        'session' : {
+          'id' : a.session.pk,
+          'name' : a.session.name,
+          'type' : a.session.type,
+          'sport' : SportSerializer(a.session.sport).data,
+          'distance' : a.session.distance,
+          'time' : a.session.time and a.session.time.total_seconds() or None,
+          'status' : getattr(a.session, 'plan_session', None) and a.session.plan_session.status or None,
+        },
+      } for a in activities],
+    })
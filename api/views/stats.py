@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+from rest_framework import views, response
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.utils import translation
+from api.serializers import SportSerializer
+from sport.stats import StatsWeek, list_periods
+from sport.summary import YearSummary, YEAR_TYPES, YEAR_EMPTY
+from sport.version import DataVersion
+from sport.views.stats import SportStatsMixin
+from users.models import Athlete
+from datetime import date
+
+def _seconds(td):
+  return td and td.total_seconds() or 0.0
+
+def export_stats(stat):
+  '''
+  Json payload of a cached week or month
+  '''
+  data = stat.data or {}
+  return {
+    'start' : stat.start,
+    'end' : stat.end,
+    'timestamp' : stat.timestamp,
+    'sessions' : data.get('sessions', {}),
+    'days' : data.get('days', 0),
+    'distance' : data.get('distance') or 0.0,
+    'time' : _seconds(data.get('time')),
+    'hours' : data.get('hours', 0),
+    'sports' : dict((pk, {
+      'nb' : s['nb'],
+      'distance' : s['distance'] or 0.0,
+      'time' : _seconds(s['time']),
+      'hours' : s['hours'],
+    }) for pk, s in data.get('sports', {}).items()),
+  }
+
+class AthleteStatsView(SportStatsMixin, views.APIView):
+  '''
+  Months, weeks or per sport series of an athlete
+  stats, with the privacy rules of the stats page
+  Answers 304 when the client has the current version
+  '''
+  member = None
+
+  def get(self, request, *args, **kwargs):
+    self.member = get_object_or_404(Athlete, username=kwargs['username'])
+    if 'stats' not in self.member.get_privacy_rights(request.user):
+      raise PermissionDenied
+
+    # Ranges depend on today, and sports names on the language
+    extra = (
+      request.get_full_path(),
+      translation.get_language(),
+      date.today().isoformat(),
+    )
+    version = DataVersion(self.member.pk, extra=':'.join(map(unicode, extra)))
+    if version.match(request):
+      return version.set_headers(response.Response(status=304))
+
+    # Same dates ranges as the stats page
+    context = self.get_stats_months(request.query_params)
+    months = context['months']
+    period = kwargs['period']
+    if period == 'months':
+      stats = months
+      data = [export_stats(m) for m in months]
+
+    elif period == 'weeks':
+      weeks, _ = list_periods(context['start'], context['end'])
+      stats = StatsWeek.fetch_all([StatsWeek(self.member, year, week, preload=False) for year, week in weeks])
+      data = [export_stats(w) for w in stats]
+
+    else:
+      # One months serie per sport
+      stats = months
+      data = []
+      for sport in context['sports']:
+        serie = SportSerializer(sport).data
+        serie['months'] = []
+        for m in months:
+          s = m.sports and m.sports.get(sport.pk)
+          serie['months'].append({
+            'start' : m.start,
+            'timestamp' : m.timestamp,
+            'nb' : s and s['nb'] or 0,
+            'distance' : s and s['distance'] or 0.0,
+            'time' : s and _seconds(s['time']) or 0.0,
+          })
+        data.append(serie)
+
+    refreshing = any([st.refreshing for st in stats])
+    resp = response.Response({
+      'start' : context['start'],
+      'end' : context['end'],
+      'refreshing' : refreshing,
+      'stats' : data,
+    })
+
+    # Incomplete data must not be revalidated
+    if refreshing:
+      return resp
+    return version.set_headers(resp)
+
+class AthleteYearView(views.APIView):
+  '''
+  Compact year of an athlete, one value
+  per day, for calendar displays
+  Answers 304 when the client has the current version
+  '''
+  def get(self, request, *args, **kwargs):
+    member = get_object_or_404(Athlete, username=kwargs['username'])
+    if 'calendar' not in member.get_privacy_rights(request.user):
+      raise PermissionDenied
+
+    version = DataVersion(member.pk)
+    if version.match(request):
+      return version.set_headers(response.Response(status=304))
+
+    data = YearSummary(member, int(kwargs['year'])).get()
+    return version.set_headers(response.Response({
+      'year' : data['year'],
+      'start' : data['start'],
+      'codes' : dict([(code, t) for t, code in YEAR_TYPES] + [(YEAR_EMPTY, None)]),
+      'types' : data['types'],
+      'nb' : data['nb'],
+      'load' : data['load'],
+      'distance' : data['distance'],
+      'sports' : data['sports'],
+    }))
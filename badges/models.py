@@ -21,8 +21,9 @@ class BadgeCategory(models.Model):
     '''
     Get the user value for each category
     '''
-    from sport.models import SportSession
-    sessions = SportSession.objects.filter(day__week__user=user)
+    # Rollups skip the failed plan sessions, like stats
+    from sport.models import SportDailyRollup
+    sessions = SportDailyRollup.objects.filter(user=user)
 
     if self.name == 'distance':
       # Sum of distance for user
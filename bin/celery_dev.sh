@@ -1,2 +1,2 @@
 #!/bin/bash
-celery -A coach worker -B -l info --autoreload --purge -n base
+celery -A coach worker -B -l info --autoreload --purge -n base -Q base,tracks,stats
@@ -0,0 +1,137 @@
+from django.db.models import Q
+from datetime import date, datetime, timedelta
+
+# Days of past activity kept in the inboxes
+INBOX_RETENTION = 60
+
+# Roles followed by trainers
+INBOX_ROLES = ('athlete', 'trainer')
+
+
+def inbox_kind(session_type, status):
+  # Validated plan sessions come first
+  if status and status != 'applied':
+    return 'validation'
+  return session_type == 'race' and 'race' or 'session'
+
+class TrainerInbox(object):
+  '''
+  Activity of a trainer athletes, newest first,
+  paginated with (date, id) keyset cursors
+  Shared by the dashboard, the daily mail & the api
+  '''
+  def __init__(self, trainer):
+    self.trainer = trainer
+
+  @staticmethod
+  def cutoff():
+    return date.today() - timedelta(days=INBOX_RETENTION)
+
+  @classmethod
+  def update(cls, session_ids):
+    '''
+    Fan out some sessions changes on the inboxes
+    of their athletes trainers & plans creators
+    '''
+    from club.models import ClubMembership, TrainerActivity
+    from sport.models import SportSession
+    sessions = SportSession.objects.filter(pk__in=session_ids)
+    sessions = sessions.values_list('pk', 'user', 'date', 'type', 'plan_session__status', 'plan_session__plan_session__plan__creator')
+    for session_id, user_id, day, session_type, status, creator_id in sessions:
+      activities = TrainerActivity.objects.filter(session=session_id)
+      if day < cls.cutoff():
+        activities.delete()
+        continue
+
+      # Validations are sent to the plan creator too
+      memberships = ClubMembership.objects.filter(user=user_id, role__in=INBOX_ROLES)
+      trainers = set(memberships.values_list('trainers', flat=True))
+      if status and status != 'applied' and creator_id:
+        trainers.add(creator_id)
+      trainers.discard(None)
+      trainers.discard(user_id)
+
+      activities.exclude(trainer__in=trainers).delete()
+      for trainer_id in trainers:
+        TrainerActivity.objects.update_or_create(trainer_id=trainer_id, session_id=session_id, defaults={
+          'athlete_id' : user_id,
+          'kind' : inbox_kind(session_type, status),
+          'date' : day,
+        })
+
+  @classmethod
+  def rebuild(cls, trainer_id):
+    '''
+    Rebuild a trainer inbox from
+    the recent athletes sessions
+    '''
+    from club.models import ClubMembership, TrainerActivity
+    from sport.models import SportSession
+    users = ClubMembership.objects.filter(trainers=trainer_id, role__in=INBOX_ROLES).values_list('user', flat=True)
+    sessions = SportSession.objects.filter(date__gte=cls.cutoff())
+    sessions = sessions.filter(Q(user__in=users) | Q(plan_session__plan_session__plan__creator=trainer_id) & ~Q(plan_session__status='applied'))
+    sessions = sessions.exclude(user=trainer_id).distinct()
+    sessions = sessions.values_list('pk', 'user', 'date', 'type', 'plan_session__status')
+
+    TrainerActivity.objects.filter(trainer=trainer_id).delete()
+    TrainerActivity.objects.bulk_create([TrainerActivity(
+      trainer_id=trainer_id,
+      athlete_id=user_id,
+      session_id=session_id,
+      kind=inbox_kind(session_type, status),
+      date=day,
+      updated=datetime.now(),
+    ) for session_id, user_id, day, session_type, status in sessions])
+    return len(sessions)
+
+  @classmethod
+  def purge(cls):
+    # Remove the old activity
+    from club.models import TrainerActivity
+    TrainerActivity.objects.filter(date__lt=cls.cutoff()).delete()
+
+  def page(self, kinds=None, start=None, end=None, cursor=None, limit=20, reverse=True):
+    '''
+    List a page of activities, and the cursor
+    of the next one (None on the last page)
+    '''
+    activities = self.trainer.inbox.all()
+    if kinds:
+      activities = activities.filter(kind__in=kinds)
+    if start:
+      activities = activities.filter(date__gte=start)
+    if end:
+      activities = activities.filter(date__lte=end)
+
+    # Continue after the cursor
+    if cursor:
+      try:
+        day, pk = cursor.split(':')
+        day, pk = datetime.strptime(day, '%Y-%m-%d').date(), int(pk)
+      except ValueError:
+        raise ValueError('Invalid cursor %s' % cursor)
+      if reverse:
+        activities = activities.filter(Q(date__lt=day) | Q(date=day, pk__lt=pk))
+      else:
+        activities = activities.filter(Q(date__gt=day) | Q(date=day, pk__gt=pk))
+
+    activities = activities.order_by(*(reverse and ('-date', '-pk') or ('date', 'pk')))
+    activities = activities.select_related('athlete', 'session', 'session__user', 'session__sport', 'session__track', 'session__plan_session')
+    activities = list(activities[:limit + 1])
+
+    next_cursor = None
+    if len(activities) > limit:
+      activities = activities[:limit]
+      last = activities[-1]
+      next_cursor = '%s:%d' % (last.date.isoformat(), last.pk)
+    return activities, next_cursor
+
+  def iterate(self, **kwargs):
+    # All the pages activities
+    cursor = None
+    while True:
+      activities, cursor = self.page(cursor=cursor, **kwargs)
+      for a in activities:
+        yield a
+      if cursor is None:
+        break
@@ -0,0 +1,161 @@
+from django.db.models import Sum
+from datetime import date
+from helpers import get_redis, date_to_day
+from club.stats import period_dates
+
+# Ranked values of a leaderboard
+LEADERBOARD_CRITERIAS = ('distance', 'time')
+
+# Days kept after the end of a period
+LEADERBOARD_RETENTION = 62
+
+# Roles ranked in the leaderboards
+LEADERBOARD_ROLES = ('athlete', 'trainer')
+
+def _seconds(td):
+  return td and td.total_seconds() or 0.0
+
+def period_starts(day):
+  # Start of the week & month containing a day
+  return (('week', date_to_day(day)), ('month', day.replace(day=1)))
+
+class Leaderboard(object):
+  '''
+  Club athletes ranked on a week or a month,
+  in Redis sorted sets: one per criteria,
+  athletes ids as members
+  '''
+  def __init__(self, club_id, period, start):
+    self.club_id = club_id
+    self.period = period
+    self.start = start
+
+  @staticmethod
+  def key(club_id, period, start, criteria):
+    return 'club:leaderboard:%d:%s:%s:%s' % (club_id, period, start.isoformat(), criteria)
+
+  @staticmethod
+  def expiry(period, start):
+    # Keep the key some time after the period end
+    _, end = period_dates(period, today=start)
+    return max(int((end - date.today()).days + LEADERBOARD_RETENTION) * 24 * 3600, 3600)
+
+  @classmethod
+  def current(cls, club_id, period, offset=0):
+    start, _ = period_dates(period, offset)
+    return cls(club_id, period, start)
+
+  @classmethod
+  def apply_deltas(cls, deltas):
+    '''
+    Increment the leaderboards of all the athletes clubs
+    with rollups differences, in one redis call
+    '''
+    from club.models import ClubMembership
+    deltas = [d for d in deltas if d['distance'] or d['time']]
+    if not deltas:
+      return
+    memberships = ClubMembership.objects.filter(user__in=set([d['user'] for d in deltas]), role__in=LEADERBOARD_ROLES)
+    clubs = {}
+    for user_id, club_id in memberships.values_list('user', 'club'):
+      clubs.setdefault(user_id, []).append(club_id)
+
+    pipe = get_redis().pipeline(transaction=False)
+    keys = set()
+    for d in deltas:
+      values = {
+        'distance' : d['distance'] or 0.0,
+        'time' : _seconds(d['time']),
+      }
+      for club_id in clubs.get(d['user'], []):
+        for period, start in period_starts(d['date']):
+          for criteria in LEADERBOARD_CRITERIAS:
+            if not values[criteria]:
+              continue
+            key = cls.key(club_id, period, start, criteria)
+            pipe.zincrby(key, d['user'], values[criteria])
+            if key not in keys:
+              keys.add(key)
+              pipe.expire(key, cls.expiry(period, start))
+
+    # Athletes without activity left are removed
+    for key in keys:
+      pipe.zremrangebyscore(key, '-inf', 0)
+    pipe.execute()
+
+  def rebuild(self):
+    '''
+    Rebuild from the club athletes daily rollups
+    '''
+    from club.models import ClubMembership
+    from sport.models import SportDailyRollup
+    _, end = period_dates(self.period, today=self.start)
+    users = ClubMembership.objects.filter(club=self.club_id, role__in=LEADERBOARD_ROLES).values_list('user', flat=True)
+    rollups = SportDailyRollup.objects.filter(user__in=users, date__gte=self.start, date__lte=end)
+    rollups = rollups.values('user').annotate(total_distance=Sum('distance'), total_time=Sum('time')).order_by()
+    values = {
+      'distance' : [(r['total_distance'] or 0.0, r['user']) for r in rollups],
+      'time' : [(_seconds(r['total_time']), r['user']) for r in rollups],
+    }
+
+    pipe = get_redis().pipeline()
+    for criteria in LEADERBOARD_CRITERIAS:
+      key = self.key(self.club_id, self.period, self.start, criteria)
+      pipe.delete(key)
+      scores = [x for score, user in values[criteria] if score > 0 for x in (score, user)]
+      if scores:
+        pipe.zadd(key, *scores)
+        pipe.expire(key, self.expiry(self.period, self.start))
+    pipe.execute()
+
+  def get(self, criteria, user_id=None, limit=10):
+    '''
+    Top athletes, and the rank of a user
+    '''
+    key = self.key(self.club_id, self.period, self.start, criteria)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrange(key, 0, limit - 1, withscores=True)
+    pipe.zcard(key)
+    if user_id:
+      pipe.zrevrank(key, user_id)
+      pipe.zscore(key, user_id)
+    results = pipe.execute()
+
+    rank = None
+    if user_id and results[2] is not None:
+      rank = {
+        'user' : user_id,
+        'rank' : results[2] + 1,
+        'score' : results[3],
+      }
+
+    return {
+      'top' : [{'user' : int(u), 'rank' : i + 1, 'score' : s} for i, (u, s) in enumerate(results[0])],
+      'total' : results[1],
+      'viewer' : rank,
+    }
+
+def load_athletes(rankings, viewer):
+  '''
+  Attach the ranked athletes to some rankings
+  Athletes hiding their stats from the viewer
+  are anonymized: only their rank is kept
+  '''
+  from users.models import Athlete
+  users = set([r['user'] for ranking in rankings for r in ranking['top']])
+  users = Athlete.objects.in_bulk(users)
+  rights = {}
+  for ranking in rankings:
+    for r in ranking['top']:
+      athlete = users.get(r['user'])
+      if athlete and athlete.pk not in rights:
+        rights[athlete.pk] = athlete == viewer or 'stats' in athlete.get_privacy_rights(viewer)
+      if athlete and rights[athlete.pk]:
+        r['athlete'] = athlete
+      else:
+        r.update({
+          'user' : None,
+          'athlete' : None,
+          'score' : None,
+        })
+  return rankings
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from users.models import Athlete
+from club.inbox import TrainerInbox
+from optparse import make_option
+
+class Command(BaseCommand):
+  help = 'Rebuild the trainers inboxes from the recent sessions'
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Only rebuild the inbox of this trainer.'),
+  )
+
+  def handle(self, *args, **options):
+    trainers = Athlete.objects.filter(memberships__role='trainer').distinct()
+    if options['username']:
+      trainers = trainers.filter(username=options['username'])
+
+    TrainerInbox.purge()
+    for trainer in trainers.order_by('username'):
+      nb = TrainerInbox.rebuild(trainer.pk)
+      print '%s : %d activities' % (trainer.username, nb)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from club.models import Club
+from club.leaderboard import Leaderboard
+from club.stats import CLUB_STATS_OFFSETS
+from optparse import make_option
+
+class Command(BaseCommand):
+  help = 'Repair the clubs leaderboards from the daily rollups'
+  option_list = BaseCommand.option_list + (
+    make_option('--club',
+      action='store',
+      dest='club',
+      type='string',
+      default=False,
+      help='Only rebuild the club with this slug.'),
+  )
+
+  def handle(self, *args, **options):
+    clubs = Club.objects.all()
+    if options['club']:
+      clubs = clubs.filter(slug=options['club'])
+
+    for club in clubs.order_by('name'):
+      print club
+      for period in ('week', 'month'):
+        for offset in CLUB_STATS_OFFSETS:
+          board = Leaderboard.current(club.pk, period, offset)
+          board.rebuild()
+          print ' %s %s : %d athletes' % (period, board.start, board.get('distance', limit=1)['total'])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sport', '0022_sportsession_indexes'),
+        ('club', '0008_auto_20150726_2000'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerActivity',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('kind', models.CharField(max_length=12, choices=[('session', 'Session'), ('race', 'Race'), ('validation', 'Plan session validation')])),
+                ('date', models.DateField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('athlete', models.ForeignKey(related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('session', models.ForeignKey(related_name='trainer_activities', to='sport.SportSession')),
+                ('trainer', models.ForeignKey(related_name='inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='traineractivity',
+            unique_together=set([('trainer', 'session')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='traineractivity',
+            index_together=set([('trainer', 'date'), ('trainer', 'kind', 'date')]),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from datetime import date, datetime, timedelta
+
+def build_inboxes(apps, schema_editor):
+  '''
+  Fill the trainers inboxes from
+  the recent athletes sessions
+  '''
+  from club.inbox import inbox_kind, INBOX_RETENTION, INBOX_ROLES
+  ClubMembership = apps.get_model('club', 'ClubMembership')
+  SportSession = apps.get_model('sport', 'SportSession')
+  TrainerActivity = apps.get_model('club', 'TrainerActivity')
+
+  # Trainers of every athlete
+  trainers = {}
+  memberships = ClubMembership.objects.filter(role__in=INBOX_ROLES, trainers__isnull=False)
+  for user_id, trainer_id in memberships.values_list('user', 'trainers'):
+    trainers.setdefault(user_id, set()).add(trainer_id)
+
+  # Validations are sent to the plan creator too
+  activities = []
+  sessions = SportSession.objects.filter(date__gte=date.today() - timedelta(days=INBOX_RETENTION))
+  sessions = sessions.values_list('pk', 'user', 'date', 'type', 'plan_session__status', 'plan_session__plan_session__plan__creator')
+  for session_id, user_id, day, session_type, status, creator_id in sessions.iterator():
+    recipients = set(trainers.get(user_id, []))
+    if status and status != 'applied' and creator_id:
+      recipients.add(creator_id)
+    recipients.discard(user_id)
+    activities += [TrainerActivity(
+      trainer_id=trainer_id,
+      athlete_id=user_id,
+      session_id=session_id,
+      kind=inbox_kind(session_type, status),
+      date=day,
+      updated=datetime.now(),
+    ) for trainer_id in recipients]
+
+  TrainerActivity.objects.all().delete()
+  TrainerActivity.objects.bulk_create(activities, batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club', '0009_traineractivity'),
+        ('plan', '0011_workoutstep'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_inboxes, migrations.RunPython.noop),
+    ]
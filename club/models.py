@@ -1,10 +1,12 @@
 #!coding=utf-8
 from django.db import models
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from users.models import Athlete
 from coach.mail import MailBuilder
 from coach.mailman import MailMan
 from datetime import datetime
 from club import ROLES
+from helpers import on_commit
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from django.utils.functional import cached_property
@@ -353,3 +355,138 @@ class ClubGroup(models.Model):
     self.mailing_list = None
 
     return True
+
+
+# Kinds of the trainers inbox entries
+TRAINER_ACTIVITY_KINDS = (
+  ('session', _('Session')),
+  ('race', _('Race')),
+  ('validation', _('Plan session validation')),
+)
+
+class TrainerActivity(models.Model):
+  '''
+  Recent sessions, races & plan validations
+  of a trainer athletes, fanned out on write
+  Read through club.inbox.TrainerInbox
+  '''
+  trainer = models.ForeignKey(Athlete, related_name='inbox')
+  athlete = models.ForeignKey(Athlete, related_name='+')
+  session = models.ForeignKey('sport.SportSession', related_name='trainer_activities')
+  kind = models.CharField(max_length=12, choices=TRAINER_ACTIVITY_KINDS)
+  date = models.DateField()
+  updated = models.DateTimeField(auto_now=True)
+
+  class Meta:
+    unique_together = (('trainer', 'session'),)
+    index_together = (('trainer', 'date'), ('trainer', 'kind', 'date'))
+
+  def __unicode__(self):
+    return u'%s > %s : %s %s' % (self.athlete_id, self.trainer_id, self.kind, self.date)
+
+
+def club_stats_invalidate(sender, instance, **kwargs):
+  '''
+  Members or groups changed: switch to a new
+  club stats version, and rebuild it
+  '''
+  from club.stats import ClubStats
+  from club.tasks import build_club_stats
+  if kwargs.get('raw') or kwargs.get('action', 'post_').startswith('pre_'):
+    return
+  club = isinstance(instance, Club) and instance or instance.club
+  ClubStats(club).invalidate()
+  build_club_stats.delay(club.pk)
+
+def club_leaderboards_rebuild(sender, instance, raw=False, **kwargs):
+  '''
+  Members changed: rebuild the leaderboards
+  '''
+  from club.tasks import build_leaderboards
+  if raw:
+    return
+  build_leaderboards.delay(instance.club_id)
+
+def club_dashboards_refresh(sender, instance, raw=False, **kwargs):
+  '''
+  Members, roles or trainers changed: rebuild
+  the member, manager & trainers dashboards
+  '''
+  from sport.dashboard import Dashboard
+  if raw or kwargs.get('action', 'post_').startswith('pre_'):
+    return
+  if not isinstance(instance, ClubMembership):
+    return # changed from the athlete side
+  users = [instance.user_id, instance.club.manager_id]
+  users += list(instance.trainers.values_list('pk', flat=True))
+  Dashboard.schedule(users)
+
+def club_inbox_trainers(sender, instance, **kwargs):
+  '''
+  Keep the trainers of a removed membership,
+  as they are cleared before post_delete
+  '''
+  instance._inbox_trainers = list(instance.trainers.values_list('pk', flat=True))
+
+def club_inbox_rebuild(sender, instance, raw=False, action=None, pk_set=None, **kwargs):
+  '''
+  Roles or trainers changed: rebuild
+  the inboxes of the trainers involved
+  '''
+  from club.tasks import rebuild_trainer_inbox
+  if raw or action not in (None, 'post_add', 'post_remove', 'pre_clear'):
+    return
+  if not isinstance(instance, ClubMembership):
+    return # changed from the athlete side
+  if action in ('post_add', 'post_remove'):
+    trainers = pk_set or []
+  elif hasattr(instance, '_inbox_trainers'):
+    trainers = instance._inbox_trainers
+  else:
+    trainers = instance.trainers.values_list('pk', flat=True)
+  if trainers:
+    trainers = list(trainers)
+    on_commit(lambda: rebuild_trainer_inbox.delay(trainers))
+
+def club_menu_bump(sender, instance, raw=False, **kwargs):
+  '''
+  Clubs, links & roles are in the
+  members navigation menus
+  '''
+  from coach.menu import bump_menu
+  if raw:
+    return
+  if isinstance(instance, ClubMembership):
+    bump_menu([instance.user_id, ])
+  else:
+    club = isinstance(instance, Club) and instance or instance.club
+    bump_menu(club.clubmembership_set.values_list('user', flat=True))
+
+# register the club stats signals
+post_save.connect(club_stats_invalidate, sender=ClubMembership)
+post_delete.connect(club_stats_invalidate, sender=ClubMembership)
+post_save.connect(club_stats_invalidate, sender=ClubGroup)
+post_delete.connect(club_stats_invalidate, sender=ClubGroup)
+m2m_changed.connect(club_stats_invalidate, sender=ClubGroup.members.through)
+
+# register the leaderboards signals
+post_save.connect(club_leaderboards_rebuild, sender=ClubMembership)
+post_delete.connect(club_leaderboards_rebuild, sender=ClubMembership)
+
+# register the dashboards signals
+post_save.connect(club_dashboards_refresh, sender=ClubMembership)
+post_delete.connect(club_dashboards_refresh, sender=ClubMembership)
+m2m_changed.connect(club_dashboards_refresh, sender=ClubMembership.trainers.through)
+
+# register the trainers inbox signals
+post_save.connect(club_inbox_rebuild, sender=ClubMembership)
+pre_delete.connect(club_inbox_trainers, sender=ClubMembership)
+post_delete.connect(club_inbox_rebuild, sender=ClubMembership)
+m2m_changed.connect(club_inbox_rebuild, sender=ClubMembership.trainers.through)
+
+# register the navigation menus signals
+post_save.connect(club_menu_bump, sender=ClubMembership)
+post_delete.connect(club_menu_bump, sender=ClubMembership)
+post_save.connect(club_menu_bump, sender=Club)
+post_save.connect(club_menu_bump, sender=ClubLink)
+post_delete.connect(club_menu_bump, sender=ClubLink)
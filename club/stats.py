@@ -0,0 +1,143 @@
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from calendar import monthrange
+from datetime import date, timedelta
+from helpers import date_to_day, get_version, bump_version
+
+# Periods precomputed, as offsets from the current one
+CLUB_STATS_OFFSETS = (0, 1)
+
+# Cache duration of a club stats document, in seconds
+CLUB_STATS_CACHE = 7 * 24 * 3600
+
+
+def period_dates(period, offset=0, today=None):
+  '''
+  Start & end dates of a week or month,
+  some periods before today
+  '''
+  today = today or date.today()
+  if period == 'week':
+    start = date_to_day(today) - timedelta(days=7 * offset)
+    return start, start + timedelta(days=6)
+  if period == 'month':
+    year, month = today.year, today.month - offset
+    while month < 1:
+      year, month = year - 1, month + 12
+    _, last_day = monthrange(year, month)
+    return date(year, month, 1), date(year, month, last_day)
+  raise Exception('Invalid period %s' % period)
+
+def _total(rows):
+  # Sum athletes or groups rows
+  active = len([r for r in rows if r['sessions']])
+  return {
+    'athletes' : len(rows),
+    'active' : active,
+    'participation' : rows and 100.0 * active / len(rows) or 0.0,
+    'sessions' : sum([r['sessions'] for r in rows]),
+    'distance' : sum([r['distance'] for r in rows]),
+    'time' : sum([r['time'] for r in rows]),
+  }
+
+class ClubStats(object):
+  '''
+  Aggregated stats of all the club athletes,
+  built in background and cached per club
+  Keys are versioned: any membership change
+  makes previous documents obsolete
+  '''
+  def __init__(self, club):
+    self.club = club
+
+  @property
+  def version_key(self):
+    return 'club:stats:%d:version' % self.club.pk
+
+  @property
+  def version(self):
+    return get_version(self.version_key)
+
+  def invalidate(self):
+    # Switch to a new version of every document
+    bump_version(self.version_key)
+
+  def key(self, period, start, version=None):
+    return 'club:stats:%d:v%d:%s:%s' % (self.club.pk, version or self.version, period, start.isoformat())
+
+  def get(self, period, offset=0):
+    # Only read the precomputed document
+    start, _ = period_dates(period, offset)
+    return cache.get(self.key(period, start))
+
+  def build(self, period, offset=0):
+    '''
+    Build a period document from the athletes
+    daily rollups, using a single aggregation
+    '''
+    from sport.models import SportDailyRollup
+    version = self.version
+    start, end = period_dates(period, offset)
+
+    # List athletes & their groups
+    memberships = self.club.clubmembership_set.filter(role__in=('athlete', 'trainer'))
+    memberships = memberships.select_related('user').prefetch_related('groups')
+    athletes = {}
+    for m in memberships:
+      athletes[m.user_id] = {
+        'user' : m.user_id,
+        'username' : m.user.username,
+        'name' : u'%s %s' % (m.user.first_name, m.user.last_name),
+        'groups' : [g.pk for g in m.groups.all()],
+        'sessions' : 0,
+        'days' : 0,
+        'distance' : 0.0,
+        'time' : 0.0,
+      }
+
+    # Aggregate athletes rollups
+    rollups = SportDailyRollup.objects.filter(user__in=athletes.keys(), date__gte=start, date__lte=end)
+    rollups = rollups.values('user').annotate(total_nb=Sum('nb'), total_distance=Sum('distance'), total_time=Sum('time'), total_days=Count('date', distinct=True))
+    for r in rollups.order_by():
+      athletes[r['user']].update({
+        'sessions' : r['total_nb'],
+        'days' : r['total_days'],
+        'distance' : r['total_distance'] or 0.0,
+        'time' : r['total_time'] and r['total_time'].total_seconds() or 0.0,
+      })
+    rows = athletes.values()
+
+    # Rankings per criteria
+    rankings = {}
+    for criteria in ('distance', 'time', 'sessions'):
+      ranked = sorted([r for r in rows if r[criteria]], key=lambda r: r[criteria], reverse=True)
+      rankings[criteria] = [r['user'] for r in ranked]
+
+    # Groups totals
+    groups = []
+    for g in self.club.groups.all().order_by('name'):
+      group = _total([r for r in rows if g.pk in r['groups']])
+      group.update({
+        'id' : g.pk,
+        'name' : g.name,
+        'slug' : g.slug,
+      })
+      groups.append(group)
+
+    data = {
+      'club' : self.club.pk,
+      'period' : period,
+      'start' : start,
+      'end' : end,
+      'version' : version,
+      'total' : _total(rows),
+      'athletes' : sorted(rows, key=lambda r: r['name'].lower()),
+      'rankings' : rankings,
+      'groups' : groups,
+    }
+    cache.set(self.key(period, start, version), data, CLUB_STATS_CACHE)
+    return data
+
+  def build_all(self):
+    # Build every precomputed period
+    return [self.build(period, offset) for period in ('week', 'month') for offset in CLUB_STATS_OFFSETS]
@@ -76,3 +76,63 @@ def mail_member_role(membership, role):
   On role change, send an email to user
   '''
   membership.mail_user(role)
+
+@shared_task
+def build_club_stats(club_id=None):
+  '''
+  Precompute the athletes stats
+  of one or all the clubs
+  '''
+  from club.models import Club
+  from club.stats import ClubStats
+
+  clubs = Club.objects.all()
+  if club_id:
+    clubs = clubs.filter(pk=club_id)
+  for club in clubs:
+    ClubStats(club).build_all()
+
+@shared_task
+def build_leaderboards(club_id=None):
+  '''
+  Rebuild the current & previous leaderboards
+  of one or all the clubs, from the rollups
+  '''
+  from club.models import Club
+  from club.leaderboard import Leaderboard
+  from club.stats import CLUB_STATS_OFFSETS
+
+  clubs = Club.objects.all()
+  if club_id:
+    clubs = clubs.filter(pk=club_id)
+  for club in clubs:
+    for period in ('week', 'month'):
+      for offset in CLUB_STATS_OFFSETS:
+        Leaderboard.current(club.pk, period, offset).rebuild()
+
+@shared_task
+def update_trainer_inbox(session_ids):
+  '''
+  Fan out sessions changes
+  on the trainers inboxes
+  '''
+  from club.inbox import TrainerInbox
+  TrainerInbox.update(session_ids)
+
+@shared_task
+def rebuild_trainer_inbox(trainer_ids):
+  '''
+  Rebuild some trainers inboxes,
+  after their athletes changed
+  '''
+  from club.inbox import TrainerInbox
+  for trainer_id in set(trainer_ids):
+    TrainerInbox.rebuild(trainer_id)
+
+@shared_task
+def purge_trainer_inbox():
+  '''
+  Remove the old trainers activity
+  '''
+  from club.inbox import TrainerInbox
+  TrainerInbox.purge()
@@ -12,6 +12,10 @@ club_patterns = patterns('',
 
   # Manager
   url(r'^/races/?$', ClubRaces.as_view(), name="club-races"),
+  url(r'^/stats/?$', ClubStatsView.as_view(), name="club-stats"),
+  url(r'^/stats/(?P<period>week|month)/(?P<offset>\d+)/?$', ClubStatsView.as_view(), name="club-stats-period"),
+  url(r'^/leaderboard/?$', ClubLeaderboardView.as_view(), name="club-leaderboard"),
+  url(r'^/leaderboard/(?P<period>week|month)/(?P<offset>\d+)/?$', ClubLeaderboardView.as_view(), name="club-leaderboard-period"),
   url(r'^/manage/?$', ClubManage.as_view(), name="club-manage"),
   url(r'^/link/add/?$', ClubLinkAdd.as_view(), name="club-link-add"),
   url(r'^/link/delete/(?P<id>\d+)?$', ClubLinkDelete.as_view(), name="club-link-delete"),
@@ -20,6 +24,9 @@ club_patterns = patterns('',
   url(r'^/join/?$', ClubJoin.as_view(), name="club-join"),
   url(r'^/join/(?P<secret>[\w]+)/?$', ClubJoin.as_view(), name="club-join-private"),
 
+  # Sessions export, before members urls
+  url(r'^/export/sessions/?$', ClubSessionsExport.as_view(), name="club-sessions-export"),
+
   # Member
   url(r'^/(?P<username>[\w\_]+)/', include(user_patterns)),
 
@@ -1,4 +1,4 @@
-from members import ClubMembers, ClubMemberRole, ClubMembersExport
+from members import ClubMembers, ClubMemberRole, ClubMembersExport, ClubSessionsExport
 from create import ClubCreate
 from manage import ClubManage, ClubLinkAdd, ClubLinkDelete
 from invite import ClubInviteCheck, ClubInviteAsk
@@ -7,3 +7,5 @@ from races import ClubRaces, ClubMemberRaces
 from group import ClubGroupList, ClubGroupCreate, ClubGroupEdit, ClubGroupMembers, ClubGroupView, ClubGroupDelete
 from subscriptions import ClubSubscriptionsUpload, ClubSubscriptionsEditor
 from admin import ClubAdminListView
+from stats import ClubStatsView
+from leaderboard import ClubLeaderboardView
@@ -0,0 +1,41 @@
+from mixins import ClubMixin
+from django.views.generic import TemplateView
+from django.http import Http404
+from club.leaderboard import Leaderboard, LEADERBOARD_CRITERIAS, load_athletes
+from club.stats import CLUB_STATS_OFFSETS
+
+class ClubLeaderboardView(ClubMixin, TemplateView):
+  '''
+  Distance & time rankings of the club
+  on the current or previous period
+  '''
+  template_name = 'club/leaderboard.html'
+  roles_allowed = (
+    'athlete',
+    'trainer',
+    'staff',
+  )
+
+  def get_context_data(self, *args, **kwargs):
+    context = super(ClubLeaderboardView, self).get_context_data(*args, **kwargs)
+
+    period = self.kwargs.get('period', 'week')
+    offset = int(self.kwargs.get('offset') or 0)
+    if offset not in CLUB_STATS_OFFSETS:
+      raise Http404('Invalid offset')
+
+    board = Leaderboard.current(self.club.pk, period, offset)
+    rankings = dict((c, board.get(c, self.request.user.pk)) for c in LEADERBOARD_CRITERIAS)
+
+    # Load all the ranked athletes at once,
+    # with their stats privacy
+    load_athletes(rankings.values(), self.request.user)
+
+    context.update({
+      'period' : period,
+      'offset' : offset,
+      'offsets' : CLUB_STATS_OFFSETS,
+      'start' : board.start,
+      'rankings' : rankings,
+    })
+    return context
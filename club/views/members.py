@@ -6,6 +6,8 @@ from users.models import Athlete
 from django.db.models import Count, Max
 from mixins import ClubMixin, ClubManagerMixin
 from club.models import ClubMembership
+from sport.models import TrainingLoad
+from sport.views import ExportSessions
 from club.forms import ClubMembershipForm
 from club import ROLES
 from club.tasks import mail_member_role
@@ -85,6 +87,13 @@ class ClubMembers(ClubMixin, ListView):
     for m in members:
       m.max_report_date, m.sessions_count = agg.get(m.pk, (None, 0))
 
+    # Add current training load, for trainers
+    show_loads = self.role in ('trainer', 'staff') or self.request.user.is_staff
+    if show_loads:
+      loads = TrainingLoad.current([m.pk for m in members])
+      for m in members:
+        m.training_load = loads.get(m.pk)
+
     # Sort helpers
     mindate = date(MINYEAR, 1, 1)
     def date_sort(a):
@@ -113,6 +122,7 @@ class ClubMembers(ClubMixin, ListView):
       'sort' : sort,
       'trainers' : self.club.members.filter(memberships__role='trainer', memberships__club=self.club).order_by('first_name'),
       'members' : members,
+      'show_loads' : show_loads,
     }
 
   def load_simplified_members(self):
@@ -258,6 +268,23 @@ class ClubMembersExport(ClubMixin, CsvResponseMixin, View):
   Export the list of members
   as a CSV file
   '''
+  def list_members(self):
+    # Add all data for members
+    members = self.club.clubmembership_set.filter(role__in=('athlete', 'trainer', 'staff'))
+    members = members.select_related('user').prefetch_related('trainers')
+    members = members.order_by('user__last_name', 'user__first_name')
+    for m in members:
+      # Same order as headers
+      yield [
+        m.user.last_name,
+        m.user.first_name,
+        m.user.email,
+        m.role,
+        m.user.vma,
+        m.user.birthday,
+        ' - '.join([t.first_name for t in m.trainers.all()]),
+      ]
+
   def get(self, *args, **kwargs):
 
     # Headers with trainers
@@ -271,27 +298,28 @@ class ClubMembersExport(ClubMixin, CsvResponseMixin, View):
       _('Trainers'),
     ]
 
-    # Add all data for members
-    data = []
-    members = self.club.clubmembership_set.filter(role__in=('athlete', 'trainer', 'staff'))
-    members = members.order_by('user__last_name', 'user__first_name')
-    for m in members:
-      # Base data
-      mdata = {
-        _('Lastname') : m.user.last_name,
-        _('Firstname') : m.user.first_name,
-        _('Email') : m.user.email,
-        _('Role') : m.role,
-        _('VMA') : m.user.vma,
-        _('Birthday') : m.user.birthday,
-        _('Trainers') : ' - '.join(m.trainers.values_list('first_name', flat=True)),
-      }
-      data.append(mdata)
-
-    # Render CSV
+    # Render CSV, streamed
     context = {
-      'csv_filename' : '%s.csv' % self.club.slug,
+      'csv_filename' : self.club.slug,
       'csv_headers' : headers,
-      'csv_data' : data,
+      'csv_data' : self.list_members(),
+      'csv_stream' : True,
     }
     return self.render_to_response(context)
+
+class ClubSessionsExport(ClubMixin, ExportSessions):
+  '''
+  Export the sessions of the athletes
+  trained by the visitor, as a CSV file
+  '''
+  empty_days = False
+  with_users = True
+
+  def get_users(self):
+    members = self.club.clubmembership_set.filter(role='athlete')
+    if not self.request.user.is_staff:
+      members = members.filter(trainers=self.request.user)
+    return members.values_list('user', flat=True)
+
+  def get_filename(self, start, end):
+    return '%s_%s_%s' % (self.club.slug, start, end)
@@ -20,8 +20,8 @@ class ClubRaces(ClubMixin, ListView):
     # Add myself to view my races
     users.append(self.request.user)
 
-    races = self.model.objects.filter(type='race', day__date__gte=date.today(), day__week__user__in=users)
-    races = races.order_by('day__date', 'day__week__user__first_name')
+    races = self.model.objects.filter(type='race', date__gte=date.today(), user__in=users)
+    races = races.order_by('date', 'user__first_name')
     return races
 
 
@@ -0,0 +1,37 @@
+from mixins import ClubMixin
+from django.views.generic import TemplateView
+from django.http import Http404
+from club.stats import ClubStats, CLUB_STATS_OFFSETS
+from club.tasks import build_club_stats
+
+class ClubStatsView(ClubMixin, TemplateView):
+  '''
+  Athletes & groups stats of the club,
+  only read from the precomputed documents
+  '''
+  template_name = 'club/stats.html'
+
+  def get_context_data(self, *args, **kwargs):
+    context = super(ClubStatsView, self).get_context_data(*args, **kwargs)
+
+    period = self.kwargs.get('period', 'week')
+    offset = int(self.kwargs.get('offset') or 0)
+    if offset not in CLUB_STATS_OFFSETS:
+      raise Http404('Invalid offset')
+
+    # Schedule a build when missing
+    stats = ClubStats(self.club).get(period, offset)
+    if stats is None:
+      build_club_stats.delay(self.club.pk)
+    else:
+      athletes = dict((a['user'], a) for a in stats['athletes'])
+      for criteria, users in stats['rankings'].items():
+        stats['rankings'][criteria] = [athletes[u] for u in users[:10]]
+
+    context.update({
+      'period' : period,
+      'offset' : offset,
+      'offsets' : CLUB_STATS_OFFSETS,
+      'stats' : stats,
+    })
+    return context
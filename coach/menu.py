@@ -1,25 +1,103 @@
 # coding=utf-8
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from django.utils import translation
 from users.notification import UserNotifications
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
+from helpers import get_version, bump_version
 from datetime import datetime
+import copy
 
 MENU_SEPARATOR = '__SEPARATOR__'
 
+# Cache duration of a built menu, in seconds
+MENU_CACHE = 7 * 24 * 3600
+
+def menu_version_key(user_id):
+  return 'menu:%d:version' % user_id
+
+def bump_menu(user_ids):
+  '''
+  Obsolete the cached menus of some users
+  '''
+  for user_id in set(user_ids):
+    bump_version(menu_version_key(user_id))
+
+def menu_version(user_id):
+  # Current version of a user menu, never reused
+  return get_version(menu_version_key(user_id))
+
+def get_menu(user):
+  '''
+  Load the menu pages of a user, in the
+  current language, or build them
+  '''
+  language = translation.get_language()
+  year = datetime.now().year # in the calendar links
+  if user.is_authenticated():
+    version = menu_version(user.pk)
+    key = 'menu:%d:%s:%d:v%d' % (user.pk, language, year, version)
+  else:
+    key = 'menu:anonymous:%s:%d' % (language, year)
+
+  menu = cache.get(key)
+  if menu is None:
+    menu = build_menu(user)
+    cache.set(key, menu, MENU_CACHE)
+  return menu
+
 def add_pages(request):
   '''
   List menu pages, with active status
+  Skipped for fragments & json
+  '''
+  if request.is_ajax() or 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+    return {}
+
+  def _active(page):
+    if page.get('external'):
+      return False
+    return page.get('lazy') and request.path.startswith(page['url']) or (request.path == page['url'])
+
+  menu = copy.deepcopy(get_menu(request.user))
+  for m in menu:
+    if 'notifications' in m:
+      # Show notifications count
+      un = UserNotifications(request.user)
+      m['notifications'] = un.total()
+    elif 'url' in m:
+      m['active'] = _active(m)
+    for l in m.get('menu', []):
+      if isinstance(l, dict) and 'url' in l:
+        l['active'] = _active(l)
+
+  # Search for active main menu
+  # based on sub items
+  for m in menu:
+    if 'menu' not in m: continue
+    if len([l['active'] for l in m['menu'] if isinstance(l, dict) and l['active']]):
+      m['active'] = True
+      break
+
+  return {
+    'menu' : menu,
+  }
+
+def build_menu(user):
+  '''
+  List menu pages, without active status
+  Captions are translated, as the menu
+  is cached per language
   '''
   def _p(url_tuple, caption, icon=False, lazy=False):
     url_name = isinstance(url_tuple, tuple) and url_tuple[0] or url_tuple
     url_args = isinstance(url_tuple, tuple) and url_tuple[1:] or ()
     url = reverse(url_name, args=url_args)
-    active = lazy and request.path.startswith(url) or (request.path == url)
-    return {'url' : url, 'caption' : caption, 'active' : active, 'icon': icon}
+    return {'url' : url, 'caption' : unicode(caption), 'active' : False, 'icon': icon, 'lazy' : lazy}
 
   def _ext(url, caption):
-    return {'url' : url, 'caption' : caption, 'active' : False, 'external' : True}
+    return {'url' : url, 'caption' : unicode(caption), 'active' : False, 'external' : True}
 
   def _build_club_generic(admin=False):
     club_creation = settings.CLUB_CREATION_OPEN and 'club-create' or 'club-landing'
@@ -51,7 +129,7 @@ def add_pages(request):
     return submenu
 
   menu = []
-  if request.user.is_authenticated():
+  if user.is_authenticated():
     # Dashboard
     menu.append(_p('dashboard', _('Home'), 'icon-home'))
 
@@ -68,10 +146,10 @@ def add_pages(request):
     menu.append(submenu)
 
     # Load memberships
-    members = request.user.memberships.exclude(role__in=('archive', 'prospect'))
+    members = user.memberships.exclude(role__in=('archive', 'prospect')).select_related('club')
 
     # Build generic club menu
-    menu.append(_build_club_generic(request.user.is_staff))
+    menu.append(_build_club_generic(user.is_staff))
 
     # Build Club menu
     for m in members:
@@ -85,17 +163,20 @@ def add_pages(request):
       if m.role in ('athlete', ):
         submenu['menu'].append(_p(('club-members', m.club.slug), _('Members')))
         submenu['menu'].append(_p(('club-groups', m.club.slug, ), _('Groups'), lazy=True))
+        submenu['menu'].append(_p(('club-leaderboard', m.club.slug, ), _('Leaderboard'), lazy=True))
         submenu['menu'].append(MENU_SEPARATOR)
 
       # Add club admin links for trainers
-      if m.role in ('trainer', 'staff') or request.user.is_superuser:
+      if m.role in ('trainer', 'staff') or user.is_superuser:
         submenu['menu'].append(_p(('club-members-name', m.club.slug, 'athletes', 'name'), _('My athletes')))
         submenu['menu'].append(_p(('club-races', m.club.slug, ), _('Races')))
+        submenu['menu'].append(_p(('club-stats', m.club.slug, ), _('Stats'), lazy=True))
+        submenu['menu'].append(_p(('club-leaderboard', m.club.slug, ), _('Leaderboard'), lazy=True))
         submenu['menu'].append(_p(('club-groups', m.club.slug, ), _('Groups'), lazy=True))
         submenu['menu'].append(_p(('club-members-name', m.club.slug, 'all', 'name'), _('All the club')))
 
         # Manage links
-        if m.club.manager == request.user or request.user.is_superuser:
+        if m.club.manager == user or user.is_superuser:
           submenu['menu'].append(_p(('club-members-name', m.club.slug, 'prospects', 'name'), _('Newcomers')))
           submenu['menu'].append(_p(('club-members-name', m.club.slug, 'archives', 'name'), _('Archives')))
           submenu['menu'].append(_p(('places', m.club.slug, ), _('Places'), lazy=True))
@@ -105,7 +186,7 @@ def add_pages(request):
         submenu['menu'].append(MENU_SEPARATOR)
         submenu['menu'].append({
           'url' : 'https://plans.runreport.fr',
-          'caption' : _('Training plans'),
+          'caption' : unicode(_('Training plans')),
           'active' : False,
           'icon': None,
         })
@@ -121,16 +202,14 @@ def add_pages(request):
     # Help menu
     menu.append(_build_help())
 
-    # Show notifications count
-    un = UserNotifications(request.user)
-    nb_notif = un.total()
+    # Notifications count, set per request
     menu.append({
-      'notifications' : nb_notif,
+      'notifications' : 0,
     })
 
     # User menu
     submenu = {
-      'caption' : request.user.first_name or request.user.username,
+      'caption' : user.first_name or user.username,
       'menu' : [],
       'icon' : 'icon-user',
     }
@@ -138,7 +217,7 @@ def add_pages(request):
     submenu['menu'].append(_p('user-preferences', _('My preferences')))
     submenu['menu'].append(_p('posts', _('My posts')))
     submenu['menu'].append(_p('friends', _('My friends')))
-    submenu['menu'].append(_p(('user-public-profile', request.user.username), _('My public profile')))
+    submenu['menu'].append(_p(('user-public-profile', user.username), _('My public profile')))
     submenu['menu'].append(_p('stats', _('My statistics'), lazy=True))
     submenu['menu'].append(_p('vma', _('My paces')))
     submenu['menu'].append(_p('user-races', _('My races')))
@@ -154,14 +233,9 @@ def add_pages(request):
     menu.append(_p('user-create', _('Create an account'), 'icon-plus'))
     menu.append(_p('login', _('Login'), 'icon-user'))
 
-  # Search for active main menu
-  # based on sub items
+  # Translate the sub menus captions
   for m in menu:
-    if 'menu' not in m: continue
-    if len([l['active'] for l in m['menu'] if isinstance(l, dict) and l['active']]):
-      m['active'] = True
-      break
+    if 'menu' in m:
+      m['caption'] = unicode(m['caption'])
 
-  return {
-    'menu' : menu,
-  }
+  return menu
@@ -2,7 +2,8 @@
 # Gist : https://gist.github.com/michelts/1029336
 from django.views.generic.base import TemplateResponseMixin
 from django.views.generic.edit import ModelFormMixin, ProcessFormView
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.functional import Promise
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
@@ -174,15 +175,34 @@ class JsonResponseMixin(object):
 
     return resp
 
+class CsvEcho(object):
+  '''
+  Pseudo buffer for csv writers,
+  giving back the written lines
+  '''
+  def write(self, value):
+    return value
+
+def _csv_encode(value):
+  # Csv writers only support bytes
+  if isinstance(value, (unicode, Promise)):
+    return unicode(value).encode('utf-8')
+  return value
+
 class CsvResponseMixin(object):
   '''
   This mixin render a response using csv writer
    and add HTTP header to donwload this render.
+  With csv_stream, lines are streamed from
+   any iterable of lists or dicts
   '''
   def render_to_response(self, context):
     if 'csv_data' not in context:
       return super(CsvResponseMixin, self).render_to_response(context)
 
+    if context.get('csv_stream'):
+      return self.render_to_stream(context)
+
     # Prepare response
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="%s.csv"' % context.get('csv_filename', 'output')
@@ -204,3 +224,23 @@ class CsvResponseMixin(object):
 
     return response
 
+  def render_to_stream(self, context):
+    '''
+    Stream the csv lines, built lazily
+    '''
+    headers = context.get('csv_headers')
+    writer = csv.writer(CsvEcho(), delimiter=';', dialect='excel')
+
+    def _lines():
+      yield u'\ufeff'.encode('utf8')
+      if headers:
+        yield writer.writerow([_csv_encode(h) for h in headers])
+      for line in context['csv_data']:
+        if isinstance(line, dict):
+          line = [line.get(h) for h in headers]
+        yield writer.writerow([_csv_encode(v) for v in line])
+
+    response = StreamingHttpResponse(_lines(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="%s.csv"' % context.get('csv_filename', 'output')
+    return response
+
@@ -290,6 +290,13 @@ GARMIN_DIR=os.path.join(HOME, 'garmin_data')
 # Tracks data
 TRACK_DATA=os.path.join(HOME, 'tracks_data')
 
+# Local elevation model (SRTM .hgt tiles)
+# Disabled when empty
+DEM_DIR = None
+
+# Max age of the dashboards snapshots, in seconds
+DASHBOARD_STALENESS = 3600
+
 # Strava config
 STRAVA_ID = 0
 STRAVA_SECRET = ''
@@ -311,6 +318,9 @@ FACEBOOK_SECRET = None
 
 # Celery broker
 BROKER_URL = 'redis://'
+
+# Redis used directly, for queues & sorted sets
+REDIS_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_TIMEZONE = 'Europe/Paris'
 
@@ -327,6 +337,14 @@ CELERYBEAT_SCHEDULE = {
     'task': 'tracks.tasks.tracks_import',
     'schedule': timedelta(minutes=30),
   },
+  'group-runs-every-hour': {
+    'task': 'tracks.tasks.group_runs',
+    'schedule': timedelta(hours=1),
+  },
+  'club-stats-every-30-min': {
+    'task': 'club.tasks.build_club_stats',
+    'schedule': timedelta(minutes=30),
+  },
   'send-race-mail-every-day-at-9': {
     'task': 'sport.tasks.race_mail',
     'schedule': crontab(hour=9, minute=10),
@@ -335,6 +353,10 @@ CELERYBEAT_SCHEDULE = {
     'task': 'users.tasks.build_demos',
     'schedule': crontab(hour=1, minute=0),
   },
+  'purge-trainer-inbox-every-night': {
+    'task': 'club.tasks.purge_trainer_inbox',
+    'schedule': crontab(hour=2, minute=0),
+  },
   'send-sessions-report-every-morning': {
     'task': 'plan.tasks.athletes_daily_sessions',
     'schedule': crontab(hour=7, minute=30),
@@ -355,6 +377,18 @@ CELERY_ROUTES = {
   'tracks.tasks.provider_import' : {
     'queue' : 'tracks',
   },
+  'tracks.tasks.group_runs' : {
+    'queue' : 'tracks',
+  },
+  'sport.tasks.rebuild_stats' : {
+    'queue' : 'stats',
+  },
+  'club.tasks.build_club_stats' : {
+    'queue' : 'stats',
+  },
+  'sport.tasks.build_dashboard' : {
+    'queue' : 'stats',
+  },
 }
 
 # Js/Css Compressor
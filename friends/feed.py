@@ -0,0 +1,118 @@
+from helpers import get_redis
+from datetime import date, timedelta
+
+# Days of past sessions kept in a timeline
+FEED_RETENTION = 60
+
+# Member marking a built timeline, scored 0
+FEED_BUILT = '-'
+
+
+class FriendsFeed(object):
+  '''
+  Friends sessions of a user, from the recent past on,
+  in a Redis sorted set scored by the sessions dates
+  Members are compact "session:user" strings,
+  updated from the committed sessions on every write,
+  and hydrated by ids on read; unfriending rebuilds them
+  Older ranges are read from the database
+  '''
+  def __init__(self, user_id):
+    self.user_id = user_id
+
+  @staticmethod
+  def key(user_id):
+    return 'friends:sessions:%d' % user_id
+
+  @staticmethod
+  def member(session_id, user_id):
+    return '%d:%d' % (session_id, user_id)
+
+  @staticmethod
+  def cutoff():
+    return date.today() - timedelta(days=FEED_RETENTION)
+
+  @classmethod
+  def push(cls, user_id, session_id):
+    '''
+    Move or remove a session on all the user friends
+    timelines, in one redis call
+    Its date is read from the database, so late
+    or unordered pushes can't restore a removed session
+    '''
+    from sport.models import SportSession
+    from users.models import Athlete
+    friends = Athlete.objects.filter(friends=user_id).values_list('pk', flat=True)
+    day = SportSession.objects.filter(pk=session_id, user=user_id).values_list('date', flat=True).first()
+    member = cls.member(session_id, user_id)
+    cutoff = cls.cutoff().toordinal()
+    pipe = get_redis().pipeline(transaction=False)
+    for friend_id in friends:
+      key = cls.key(friend_id)
+      if day is not None and day.toordinal() >= cutoff:
+        pipe.zadd(key, day.toordinal(), member)
+      else:
+        pipe.zrem(key, member)
+      pipe.zremrangebyscore(key, 1, cutoff - 1)
+    pipe.execute()
+
+  def rebuild(self):
+    '''
+    Rebuild from the recent sessions
+    of the user friends
+    '''
+    from sport.models import SportSession
+    sessions = SportSession.objects.filter(user__friends=self.user_id, date__gte=self.cutoff())
+    sessions = sessions.values_list('pk', 'date', 'user')
+    scores = [x for pk, day, user_id in sessions for x in (day.toordinal(), self.member(pk, user_id))]
+
+    key = self.key(self.user_id)
+    pipe = get_redis().pipeline()
+    pipe.delete(key)
+    pipe.zadd(key, 0, FEED_BUILT, *scores)
+    pipe.execute()
+    return len(scores) / 2
+
+  def list_ids(self, start, end):
+    '''
+    Sessions ids of the timeline between two dates,
+    or None when the range is older than the timeline
+    '''
+    if start < self.cutoff():
+      return None
+
+    key = self.key(self.user_id)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zscore(key, FEED_BUILT)
+    pipe.zrangebyscore(key, start.toordinal(), end.toordinal())
+    built, members = pipe.execute()
+    if built is None:
+      # Missing timeline
+      self.rebuild()
+      members = get_redis().zrangebyscore(key, start.toordinal(), end.toordinal())
+    return [int(m.split(':')[0]) for m in members]
+
+  def list_queryset(self, start, end):
+    '''
+    Friends sessions between two dates, hydrated
+    from the timeline ids, without the friends join
+    Older ranges use the indexed dates query
+    '''
+    from sport.models import SportSession
+    ids = self.list_ids(start, end)
+    if ids is None:
+      return SportSession.objects.filter(user__friends=self.user_id, date__gte=start, date__lte=end)
+    return SportSession.objects.filter(pk__in=ids)
+
+  def count_days(self, start, end):
+    # Number of sessions per day
+    days = {}
+    for day in self.list_queryset(start, end).values_list('date', flat=True):
+      days[day] = days.get(day, 0) + 1
+    return days
+
+  def list_sessions(self, start, end):
+    # Hydrate the sessions in one query
+    sessions = self.list_queryset(start, end)
+    sessions = sessions.select_related('day', 'sport', 'track', 'user')
+    return list(sessions.order_by('date', 'pk'))
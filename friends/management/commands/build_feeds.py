@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from users.models import Athlete
+from friends.feed import FriendsFeed
+from optparse import make_option
+
+class Command(BaseCommand):
+  help = 'Repair the friends timelines from the recent sessions'
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Only rebuild the timeline of this user.'),
+  )
+
+  def handle(self, *args, **options):
+    if options['username']:
+      users = Athlete.objects.filter(username=options['username'])
+    else:
+      # Only users having friends
+      users = Athlete.objects.filter(friends__isnull=False).distinct()
+
+    for user in users.order_by('username'):
+      nb = FriendsFeed(user.pk).rebuild()
+      print '%s : %d entries' % (user.username, nb)
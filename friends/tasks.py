@@ -29,3 +29,22 @@ def notify_friend_request(sender, recipient, accepted=False):
 
   mail = builder.build(data)
   mail.send()
+
+@shared_task
+def push_friends_feed(user_id, session_id):
+  '''
+  Push a committed session change
+  on the user friends timelines
+  '''
+  from friends.feed import FriendsFeed
+  FriendsFeed.push(user_id, session_id)
+
+@shared_task
+def rebuild_friends_feeds(user_ids):
+  '''
+  Rebuild the timelines of some users,
+  after friends changes
+  '''
+  from friends.feed import FriendsFeed
+  for user_id in user_ids:
+    FriendsFeed(user_id).rebuild()
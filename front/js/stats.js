@@ -85,3 +85,31 @@ function plot_sports(sports){
   });
 
 }
+
+function plot_training_load(ctl, atl, tsb){
+  if(!ctl.length)
+    return;
+
+  // Fitness, fatigue & form
+  $.plot("#stats .training_load", [
+    { data: ctl, label: "Forme de fond (CTL)" },
+    { data: atl, label: "Fatigue (ATL)" },
+    { data: tsb, label: "Fraicheur (TSB)", yaxis: 2 }
+  ], {
+    legend: { position: "sw" },
+    xaxis: {
+      mode : 'time',
+      timeformat: "%b %Y",
+      monthNames: months_short
+    },
+    yaxes: [ { min: 0 }, {
+      alignTicksWithAxis: true,
+      position: 'right'
+    }],
+    series: {
+      lines: {
+        show: true
+      }
+    }
+  });
+}
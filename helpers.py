@@ -1,8 +1,17 @@
 from celery.result import AsyncResult
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import math
+import threading
+import time
 from PIL import Image
 
+# Functions waiting for the current commit
+_commit_hooks = threading.local()
+
+# Shared Redis client, with its connections pool
+_redis = None
+
 def nameize(s, max = 40):
   import re, unicodedata
 
@@ -32,6 +41,79 @@ def nameize(s, max = 40):
 
   return s
 
+def get_redis():
+  '''
+  Direct access to the Redis server
+  The client is shared by the whole process
+  '''
+  global _redis
+  if _redis is None:
+    import redis
+    from django.conf import settings
+    _redis = redis.StrictRedis.from_url(settings.REDIS_URL)
+  return _redis
+
+@contextmanager
+def commit_hooks():
+  '''
+  Atomic block running the on_commit functions
+  once committed, and dropping them on rollback
+  '''
+  from django.db import transaction
+  outer = getattr(_commit_hooks, 'hooks', None) is None
+  if outer:
+    _commit_hooks.hooks = []
+  start = len(_commit_hooks.hooks)
+  try:
+    with transaction.atomic():
+      yield
+  except:
+    if outer:
+      _commit_hooks.hooks = None
+    else:
+      del _commit_hooks.hooks[start:]
+    raise
+
+  if outer:
+    hooks, _commit_hooks.hooks = _commit_hooks.hooks, None
+    for func in hooks:
+      func()
+
+def on_commit(func):
+  '''
+  Run a function after the commit of the current
+  commit_hooks block, or right away out of it
+  '''
+  hooks = getattr(_commit_hooks, 'hooks', None)
+  if hooks is None:
+    return func()
+  hooks.append(func)
+
+def new_version():
+  # Time based, so never used by an older document
+  return int(time.time() * 1000000)
+
+def get_version(key):
+  '''
+  Version stored in a cache key, a new
+  one when missing or evicted
+  '''
+  from django.core.cache import cache
+  version = cache.get(key)
+  if version is None:
+    version = new_version()
+    if not cache.add(key, version, None):
+      version = cache.get(key) or version
+  return version
+
+def bump_version(key):
+  # Obsolete the documents of a version
+  from django.core.cache import cache
+  try:
+    cache.incr(key)
+  except ValueError:
+    cache.set(key, new_version(), None)
+
 def date_to_day(date, day=0):
   '''
   From any date, get a date in the same week
@@ -97,6 +179,15 @@ def seconds_humanize(t, short=False):
     return '%02d:%02d' % (minutes, seconds)
   return '%d:%02d:%02d' % (hours, minutes, seconds)
 
+def haversine(a, b):
+  '''
+  Distance in meters between
+  two (latitude, longitude) tuples
+  '''
+  lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+  h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+  return 2 * 6371000.0 * math.asin(math.sqrt(h))
+
 def gpolyline_decode(point_str):
   '''
   From : https://gist.github.com/signed0/2031157
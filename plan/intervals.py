@@ -0,0 +1,139 @@
+from tracks.compare import TrackSeries, interpolate
+from tracks.elevation import smooth
+from plan.models import WorkoutStep
+
+# Resampling step of the speed series, in seconds
+BOUT_STEP = 5.0
+
+# Smoothing window on speeds, in points
+BOUT_WINDOW = 3
+
+# Shortest bout kept, in seconds
+BOUT_MIN_TIME = 20.0
+
+
+def _mean(values):
+  return values and sum(values) / float(len(values)) or 0.0
+
+def _ratio(a, b):
+  # Symmetric similarity between 0 and 1
+  if not a or not b:
+    return 0.0
+  return min(a, b) / float(max(a, b))
+
+def speed_threshold(speeds, precision=0.01):
+  '''
+  Split speeds in two clusters (recovery, work)
+  using an iterative 1D two-means
+  '''
+  threshold = (min(speeds) + max(speeds)) / 2.0
+  for i in range(50):
+    lows = [s for s in speeds if s < threshold]
+    highs = [s for s in speeds if s >= threshold]
+    if not lows or not highs:
+      break
+    new = (_mean(lows) + _mean(highs)) / 2.0
+    if abs(new - threshold) < precision:
+      return new
+    threshold = new
+  return threshold
+
+def detect_bouts(series, step=BOUT_STEP):
+  '''
+  Segment a track series in work & rest bouts
+  Speeds are resampled on a regular time grid, then
+  every change of cluster is a change point
+  '''
+  if len(series) < 2:
+    return []
+  duration = series.times[-1] - series.times[0]
+  grid = [series.times[0] + i * step for i in xrange(int(duration / step) + 1)]
+  if len(grid) < 3:
+    return []
+  distances = interpolate(series.times, series.distances, grid)
+  speeds = [(d1 - d0) / step for d0, d1 in zip(distances, distances[1:])]
+  speeds = smooth(speeds, BOUT_WINDOW)
+  threshold = speed_threshold(speeds)
+
+  # Group consecutive points of the same cluster
+  bouts = []
+  for i, s in enumerate(speeds):
+    work = s >= threshold
+    if not bouts or bouts[-1]['work'] != work:
+      bouts.append({'work' : work, 'start' : i, 'end' : i})
+    bouts[-1]['end'] = i + 1
+
+  # Merge short bouts in the previous one
+  merged = []
+  for b in bouts:
+    if merged and ((b['end'] - b['start']) * step < BOUT_MIN_TIME or merged[-1]['work'] == b['work']):
+      merged[-1]['end'] = b['end']
+      continue
+    merged.append(b)
+
+  out = []
+  for b in merged:
+    time = (b['end'] - b['start']) * step
+    distance = distances[b['end']] - distances[b['start']]
+    out.append({
+      'type' : b['work'] and 'work' or 'rest',
+      'time' : time,
+      'distance' : distance,
+      'speed' : distance / time,
+    })
+  return out
+
+def score_workout(steps, bouts, user):
+  '''
+  Compare detected work bouts to planned ones
+  Gives a compliance between 0 and 100
+  '''
+  planned = []
+  for step in steps:
+    planned += step.expand()
+  works = [b for b in bouts if b['type'] == 'work']
+  if not planned or not works:
+    return 0.0
+
+  # Planned bouts are matched in order
+  scores = []
+  for step, bout in zip(planned, works):
+    parts = []
+    if step.work_distance:
+      parts.append(_ratio(bout['distance'], step.work_distance))
+    if step.work_time:
+      parts.append(_ratio(bout['time'], step.work_time.total_seconds()))
+    speed = step.target_speed(user)
+    if speed:
+      parts.append(_ratio(bout['speed'], speed))
+    scores.append(_mean(parts))
+
+  return 100.0 * _ratio(len(works), len(planned)) * _mean(scores)
+
+def check_compliance(psa, track):
+  '''
+  Score a track against the structured workout
+  of a plan session application
+  '''
+  plan_session = psa.plan_session
+  user = psa.application.user
+
+  # Paces per km are only known with the athlete VMA:
+  # fill the stored steps from the parsed ones
+  steps = list(plan_session.steps.all())
+  if not steps or any([s.pace is None for s in steps]):
+    parsed = WorkoutStep.parse(plan_session.name, user.vma)
+    for step, p in zip(steps, parsed):
+      if step.pace is None:
+        step.pace = p.pace
+    steps = steps or parsed
+  if not steps:
+    return None
+
+  series = TrackSeries.from_track(track)
+  bouts = series and detect_bouts(series) or []
+  psa.bouts = len([b for b in bouts if b['type'] == 'work'])
+  psa.compliance = score_workout(steps, bouts, user)
+  psa.save()
+
+  return psa.compliance
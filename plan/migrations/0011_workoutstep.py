@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0010_auto_20150224_1558'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutStep',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('position', models.IntegerField(default=0)),
+                ('repeat', models.IntegerField(default=1)),
+                ('work_distance', models.FloatField(null=True, blank=True)),
+                ('work_time', models.DurationField(null=True, blank=True)),
+                ('rest_distance', models.FloatField(null=True, blank=True)),
+                ('rest_time', models.DurationField(null=True, blank=True)),
+                ('pace', models.IntegerField(null=True, blank=True)),
+                ('plan_session', models.ForeignKey(related_name='steps', to='plan.PlanSession')),
+            ],
+            options={
+                'ordering': ('position',),
+            },
+        ),
+        migrations.AddField(
+            model_name='plansessionapplied',
+            name='bouts',
+            field=models.IntegerField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='plansessionapplied',
+            name='compliance',
+            field=models.FloatField(null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# Fields copied from the parsed steps
+STEP_FIELDS = ('position', 'repeat', 'work_distance', 'work_time', 'rest_distance', 'rest_time', 'pace')
+
+def build_steps(apps, schema_editor):
+  '''
+  Build the workout steps of
+  the existing plan sessions
+  '''
+  from plan.models.workout import WorkoutStep as Parser
+  PlanSession = apps.get_model('plan', 'PlanSession')
+  WorkoutStep = apps.get_model('plan', 'WorkoutStep')
+
+  WorkoutStep.objects.all().delete()
+  steps = []
+  for session_id, name in PlanSession.objects.values_list('pk', 'name').iterator():
+    for parsed in Parser.parse(name):
+      data = dict([(f, getattr(parsed, f)) for f in STEP_FIELDS])
+      steps.append(WorkoutStep(plan_session_id=session_id, **data))
+  WorkoutStep.objects.bulk_create(steps, batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan', '0011_workoutstep'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_steps, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,3 @@
 from .plans import Plan, PlanSession
 from .apps import  PlanApplied, PlanSessionApplied, PLAN_SESSION_APPLICATIONS
+from .workout import WorkoutStep
@@ -1,7 +1,9 @@
 # coding=utf-8
 from django.db import models
-from sport.models import SportSession
+from django.db.models.signals import pre_save, post_save
+from sport.models import SportSession, SportDailyRollup
 from users.notification import UserNotifications
+from helpers import on_commit
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
@@ -37,6 +39,15 @@ class PlanApplied(models.Model):
       out[s] = self.sessions.filter(status=s).count()
     return out
 
+  @property
+  def compliance(self):
+    '''
+    Average execution score of
+    the structured sessions
+    '''
+    agg = self.sessions.filter(compliance__isnull=False).aggregate(avg=models.Avg('compliance'))
+    return agg['avg']
+
 
 class PlanSessionApplied(models.Model):
   '''
@@ -56,6 +67,10 @@ class PlanSessionApplied(models.Model):
   updated = models.DateTimeField(auto_now=True)
   trainer_notified = models.DateTimeField(null=True, blank=True)
 
+  # Execution of the structured workout, from track
+  compliance = models.FloatField(null=True, blank=True) # in percent
+  bouts = models.IntegerField(null=True, blank=True) # detected work bouts
+
   def move(self, date):
     '''
     Move to another day the plan session application
@@ -87,6 +102,14 @@ class PlanSessionApplied(models.Model):
 
     return session
 
+  def check_compliance(self, track):
+    '''
+    Score the planned workout execution
+    using an imported track
+    '''
+    from plan.intervals import check_compliance
+    return check_compliance(self, track)
+
   def notify_trainer(self):
     '''
     Notify trainer of new validation from user
@@ -101,3 +124,50 @@ class PlanSessionApplied(models.Model):
     # Update notification date
     self.trainer_notified = timezone.now()
     self.save()
+
+
+def application_rollup_before(sender, instance, raw=False, **kwargs):
+  '''
+  Keep the previous session & status of an application,
+  the session rollup depends on it
+  '''
+  if raw or not instance.pk:
+    return
+  instance._rollup_previous = PlanSessionApplied.objects.filter(pk=instance.pk).values_list('sport_session', 'status').first()
+
+def application_rollup_after(sender, instance, raw=False, **kwargs):
+  '''
+  Refresh the rollups of the previous
+  and current sessions, when needed
+  '''
+  if raw:
+    return
+  previous = getattr(instance, '_rollup_previous', None)
+  if previous == (instance.sport_session_id, instance.status):
+    return
+  sessions = [instance.sport_session_id, ]
+  if previous:
+    sessions.append(previous[0])
+  keys = SportDailyRollup.session_keys(SportSession.objects.filter(pk__in=sessions))
+  SportDailyRollup.refresh(keys)
+
+def application_inbox_update(sender, instance, raw=False, **kwargs):
+  '''
+  Validations are displayed
+  in the trainers inboxes
+  '''
+  from club.tasks import update_trainer_inbox
+  if raw:
+    return
+  sessions = [instance.sport_session_id, ]
+  previous = getattr(instance, '_rollup_previous', None)
+  if previous and previous[0] != instance.sport_session_id:
+    sessions.append(previous[0])
+  on_commit(lambda: update_trainer_inbox.delay(sessions))
+
+# register the rollups signals
+pre_save.connect(application_rollup_before, sender=PlanSessionApplied)
+post_save.connect(application_rollup_after, sender=PlanSessionApplied)
+
+# register the trainers inbox signals
+post_save.connect(application_inbox_update, sender=PlanSessionApplied)
@@ -1,5 +1,6 @@
 # coding=utf-8
 from django.db import models
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 from users.models import Athlete
 from sport.models import Sport, SportWeek, SportDay, SportSession, SESSION_TYPES
@@ -8,6 +9,7 @@ from helpers import date_to_week
 from coach.mail import MailBuilder
 from plan.export import PlanPdfExporter
 from .apps import PlanApplied, PlanSessionApplied
+from .workout import WorkoutStep
 
 class Plan(models.Model):
   name = models.CharField(max_length=250)
@@ -196,6 +198,20 @@ class PlanSession(models.Model):
 
     return PlanSession.objects.create(**data)
 
+  def build_steps(self):
+    '''
+    Build the structured workout steps
+    from the session name, when possible
+    Paces per km need an athlete VMA, and
+    are left to the compliance checks
+    '''
+    self.steps.all().delete()
+    steps = WorkoutStep.parse(self.name)
+    for step in steps:
+      step.plan_session = self
+    WorkoutStep.objects.bulk_create(steps)
+    return steps
+
   def _build_day(self, user, date):
     # Internal used to create week & day hierarchy
     # Used on PSA move too (so date need to be specified)
@@ -255,3 +271,40 @@ class PlanSession(models.Model):
 
       for c in self.comments.messages.all():
         c.copy(session.comments_private)
+
+
+def plan_dashboard_refresh(sender, instance, raw=False, **kwargs):
+  '''
+  Plans are listed on their creator dashboard
+  '''
+  from sport.dashboard import Dashboard
+  if raw:
+    return
+  Dashboard.schedule([instance.creator_id, ])
+
+def plan_session_name_before(sender, instance, raw=False, **kwargs):
+  '''
+  Keep the name of a session
+  before its update
+  '''
+  if raw or not instance.pk:
+    return
+  instance._previous_name = PlanSession.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+def plan_session_steps_build(sender, instance, raw=False, created=False, **kwargs):
+  '''
+  Build the workout steps of
+  a created or renamed session
+  '''
+  if raw:
+    return
+  if created or instance.name != getattr(instance, '_previous_name', None):
+    instance.build_steps()
+
+# register the dashboard signals
+post_save.connect(plan_dashboard_refresh, sender=Plan)
+post_delete.connect(plan_dashboard_refresh, sender=Plan)
+
+# register the workout steps signals
+pre_save.connect(plan_session_name_before, sender=PlanSession)
+post_save.connect(plan_session_steps_build, sender=PlanSession)
@@ -0,0 +1,100 @@
+# coding=utf-8
+from django.db import models
+from datetime import timedelta
+from sport.vma import VmaCalc
+import re
+
+# Parse names like 10x400m, 5 x 1km, 3x10min or 6x1000m r 1'30
+WORKOUT_REGEX = re.compile(r"(?P<repeat>\d+)\s*[x\*]\s*(?P<value>\d+(?:[\.,]\d+)?)\s*(?P<unit>km|min|m|'|s)(?![a-z])(?:\s*(?:r|rec|recup)\.?\s*(?P<rest_min>\d+)\s*(?:'|min)\s*(?P<rest_sec>\d+)?)?", re.IGNORECASE)
+
+# Target paces following a step: 95%, 3'45/km or a VmaCalc pace name
+PACE_PERCENT_REGEX = re.compile(r"(?P<percent>\d{2,3})\s*%")
+PACE_TIME_REGEX = re.compile(r"(?P<min>\d{1,2})\s*(?:'|:|min)\s*(?P<sec>\d{2})\s*(?:\"|s)?\s*/\s*km", re.IGNORECASE)
+PACE_NAMES = sorted(VmaCalc._paces, key=lambda p: -len(p.name))
+
+def parse_pace(text, vma=None):
+  '''
+  Target pace in a text, as a percentage of VMA
+  Paces per km need the athlete VMA
+  '''
+  m = PACE_PERCENT_REGEX.search(text)
+  if m:
+    return int(m.group('percent'))
+
+  m = PACE_TIME_REGEX.search(text)
+  if m:
+    if not vma:
+      return None
+    seconds = int(m.group('min')) * 60 + int(m.group('sec'))
+    return seconds and int(round(100.0 * 3600.0 / seconds / vma)) or None
+
+  for pace in PACE_NAMES:
+    if re.search(r'(?<![a-z])%s(?![a-z0-9])' % re.escape(pace.name), text, re.IGNORECASE):
+      return pace.percent
+  return None
+
+class WorkoutStep(models.Model):
+  '''
+  Structured part of a PlanSession:
+  repeated work bouts, followed by recoveries
+  '''
+  plan_session = models.ForeignKey('plan.PlanSession', related_name='steps')
+  position = models.IntegerField(default=0)
+  repeat = models.IntegerField(default=1)
+
+  # Work bout, on distance (m) or time
+  work_distance = models.FloatField(null=True, blank=True)
+  work_time = models.DurationField(null=True, blank=True)
+
+  # Recovery bout
+  rest_distance = models.FloatField(null=True, blank=True)
+  rest_time = models.DurationField(null=True, blank=True)
+
+  # Target pace, as a percentage of VMA
+  pace = models.IntegerField(null=True, blank=True)
+
+  class Meta:
+    ordering = ('position', )
+
+  def __unicode__(self):
+    work = self.work_distance and '%dm' % self.work_distance or self.work_time
+    return u'%dx%s' % (self.repeat, work)
+
+  def target_speed(self, user):
+    '''
+    Target speed in m/s, using the athlete VMA
+    '''
+    if not self.pace or not user.vma:
+      return None
+    return VmaCalc(user.vma).get_speed(self.pace) / 3.6
+
+  @classmethod
+  def parse(cls, name, vma=None):
+    '''
+    Build unsaved steps from a session name
+    The target pace is read after each step
+    '''
+    steps = []
+    matches = list(WORKOUT_REGEX.finditer(name or ''))
+    for i, m in enumerate(matches):
+      step = cls(position=i, repeat=int(m.group('repeat')))
+      value = float(m.group('value').replace(',', '.'))
+      unit = m.group('unit').lower()
+      if unit == 'km':
+        step.work_distance = value * 1000.0
+      elif unit == 'm':
+        step.work_distance = value
+      elif unit == 's':
+        step.work_time = timedelta(seconds=value)
+      else:
+        step.work_time = timedelta(minutes=value)
+      if m.group('rest_min'):
+        step.rest_time = timedelta(minutes=int(m.group('rest_min')), seconds=int(m.group('rest_sec') or 0))
+      end = i + 1 < len(matches) and matches[i + 1].start() or len(name)
+      step.pace = parse_pace(name[m.end():end], vma)
+      steps.append(step)
+    return steps
+
+  def expand(self):
+    # List every planned work bout
+    return [self] * self.repeat
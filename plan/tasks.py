@@ -20,27 +20,28 @@ def athletes_daily_sessions():
   with sessions about to be done today
   '''
   from django.utils.translation import ugettext_lazy as _
-  from club.models import ClubMembership
-  from sport.models import SportSession
+  from club.models import TrainerActivity
+  from club.inbox import TrainerInbox
+  from users.models import Athlete
   from coach.mail import MailBuilder
   from datetime import date
 
+  # Only trainers with activity today, from their inbox
   today = date.today()
-  memberships = ClubMembership.objects.filter(role='trainer', user__daily_trainer_mail=True)
-  for m in memberships:
-    # List athletes sessions for today
-    users = [cm.user for cm in m.athletes]
-    sessions = SportSession.objects.filter(day__date=today, day__week__user__in=users)
+  trainers = TrainerActivity.objects.filter(date=today, trainer__daily_trainer_mail=True)
+  trainers = Athlete.objects.filter(pk__in=trainers.values('trainer'))
+  for trainer in trainers:
+    activities = TrainerInbox(trainer).iterate(start=today, end=today, reverse=False, limit=100)
+    sessions = [a.session for a in activities]
     if not sessions:
       continue
 
     # Build mail
-    mb = MailBuilder('mail/sessions.html', m.user.language)
-    mb.to = [m.user.email, ]
+    mb = MailBuilder('mail/sessions.html', trainer.language)
+    mb.to = [trainer.email, ]
     mb.subject = _('Your athlete\'s sessions today')
     context = {
-      'club' : m.club,
-      'user' : m.user,
+      'user' : trainer,
       'sessions' : sessions,
     }
     mail = mb.build(context)
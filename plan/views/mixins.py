@@ -32,5 +32,5 @@ class PlanMixin(object):
       return Plan.objects.none()
     return Plan.objects.filter( \
       Q(creator=self.request.user) | \
-      Q(sessions__applications__sport_session__day__week__user=self.request.user) \
+      Q(sessions__applications__sport_session__user=self.request.user) \
     ).distinct()
@@ -23,12 +23,12 @@ class PostSessionsView(PostWriterMixin, JsonResponseMixin, DetailView):
 
     # Add a session ?
     if 'add' in self.request.POST:
-      session = SportSession.objects.get(day__week__user=self.request.user, pk=self.request.POST['add'])
+      session = SportSession.objects.get(user=self.request.user, pk=self.request.POST['add'])
       self.object.sessions.add(session)
 
     # Remove a session ?
     if 'remove' in self.request.POST:
-      session = SportSession.objects.get(day__week__user=self.request.user, pk=self.request.POST['remove'])
+      session = SportSession.objects.get(user=self.request.user, pk=self.request.POST['remove'])
       self.object.sessions.remove(session)
 
     return self.render_to_response(self.get_context_data())
@@ -61,10 +61,10 @@ class PostSessionsView(PostWriterMixin, JsonResponseMixin, DetailView):
     List user sport sessions, one month at a time
     Default to current month
     '''
-    sessions = SportSession.objects.filter(day__week__user=self.request.user)
-    sessions = sessions.filter(day__date__month=self.date.month, day__date__year=self.date.year)
+    sessions = SportSession.objects.filter(user=self.request.user)
+    sessions = sessions.filter(date__month=self.date.month, date__year=self.date.year)
     sessions = sessions.prefetch_related('day', 'day__week')
-    sessions = sessions.order_by('day__date')
+    sessions = sessions.order_by('date')
 
     return {
       'user_sessions' : sessions,
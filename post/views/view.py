@@ -23,6 +23,6 @@ class PostView(DetailView):
     context['medias'] = self.object.medias.filter(type='image crop').prefetch_related('parent', 'post')
 
     # Embed sessions
-    context['sessions'] = self.object.sessions.all().order_by('day__date').prefetch_related('track', 'sport', 'day')
+    context['sessions'] = self.object.sessions.all().order_by('date').prefetch_related('track', 'sport', 'day')
 
     return context
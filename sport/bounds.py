@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db.models import Min, Max
+from helpers import on_commit
+
+# Cache duration of the bounds, in seconds
+BOUNDS_CACHE = 24 * 3600
+
+
+class CalendarBounds(object):
+  '''
+  First & last days of an athlete calendar,
+  and the years having some days
+  Kept in cache, dropped after commit
+  when days changes can move them
+  '''
+  def __init__(self, user_id):
+    self.user_id = user_id
+
+  @staticmethod
+  def key(user_id):
+    return 'calendar:bounds:%d' % user_id
+
+  def get(self):
+    key = self.key(self.user_id)
+    bounds = cache.get(key)
+    if bounds is None:
+      bounds = self.build()
+      cache.add(key, bounds, BOUNDS_CACHE)
+    return bounds
+
+  def build(self):
+    from sport.models import SportDay
+    days = SportDay.objects.filter(week__user=self.user_id)
+    limits = days.aggregate(first=Min('date'), last=Max('date'))
+    return {
+      'first' : limits['first'],
+      'last' : limits['last'],
+      'years' : sorted([d.year for d in days.dates('date', 'year')]),
+    }
+
+  @classmethod
+  def add(cls, user_id, day):
+    '''
+    Drop the bounds when a new day
+    is out of them, never patched
+    '''
+    key = cls.key(user_id)
+    bounds = cache.get(key)
+    if bounds is None:
+      return
+    if bounds['first'] and bounds['first'] <= day <= bounds['last'] and day.year in bounds['years']:
+      return
+    cls.reset(user_id)
+
+  @classmethod
+  def reset(cls, user_id):
+    # A removed day can change any bound
+    on_commit(lambda: cache.delete(cls.key(user_id)))
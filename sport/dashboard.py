@@ -0,0 +1,293 @@
+from django.conf import settings
+from django.core.cache import cache
+from sport.stats import StatsWeek
+from sport.models import SportSession
+from sport.vma import VmaCalc
+from club.models import ClubMembership
+from friends.feed import FriendsFeed
+from club.inbox import TrainerInbox
+from helpers import date_to_day, on_commit
+from datetime import timedelta, date, datetime
+from collections import OrderedDict
+
+# Modes having a dashboard
+DASHBOARD_MODES = ('athlete', 'trainer')
+
+# Delay before a scheduled rebuild, in seconds
+# to group the changes of a single edition
+DASHBOARD_DELAY = 10
+
+
+class Dashboard(object):
+  '''
+  Everything displayed on the home page of a user,
+  rebuilt in background when its inputs change
+  Stored as a snapshot, read with one cache fetch,
+  and built live on misses or stale snapshots
+  '''
+  def __init__(self, user, mode='athlete', today=None):
+    self.user = user
+    self.mode = mode
+    self.today = today or date.today()
+
+  @staticmethod
+  def key(user_id, mode):
+    return 'dashboard:%d:%s' % (user_id, mode)
+
+  @staticmethod
+  def pending_key(user_id):
+    return 'dashboard:%d:pending' % user_id
+
+  @classmethod
+  def schedule(cls, user_ids):
+    '''
+    Queue a rebuild of some users dashboards,
+    only once for close changes
+    '''
+    from sport.tasks import build_dashboard
+    def _schedule():
+      for user_id in set(user_ids):
+        if cache.add(cls.pending_key(user_id), True, DASHBOARD_DELAY * 6):
+          build_dashboard.apply_async((user_id, ), countdown=DASHBOARD_DELAY)
+
+    # Only build from committed data
+    on_commit(_schedule)
+
+  def get(self):
+    '''
+    Load the snapshot, or build it live
+    when missing, stale or from another day
+    '''
+    snapshot = cache.get(self.key(self.user.pk, self.mode))
+    if snapshot is not None:
+      age = datetime.now() - snapshot['built']
+      if snapshot['today'] == self.today and age < timedelta(seconds=settings.DASHBOARD_STALENESS):
+        return snapshot['context']
+
+    return self.save()
+
+  def save(self):
+    context = self.build()
+
+    # Don't keep weeks stats still in build,
+    # nor the older snapshot: rebuilt with the stats
+    key = self.key(self.user.pk, self.mode)
+    if context.get('weeks_refreshing'):
+      cache.delete(key)
+    else:
+      snapshot = {
+        'built' : datetime.now(),
+        'today' : self.today,
+        'context' : context,
+      }
+      cache.set(key, snapshot, settings.DASHBOARD_STALENESS)
+    return context
+
+  def build(self):
+    context = {}
+
+    # Load athlete datas
+    if self.mode == 'athlete':
+      context.update(self.load_weeks())
+      context.update(self.load_races())
+      context.update(self.load_sessions())
+      context.update(self.load_friends_sessions())
+      context.update(self.load_vma())
+
+    # Load trainer data
+    if self.mode == 'trainer':
+      context['memberships'] = list(self.user.memberships.filter(role='trainer').select_related('club'))
+      context.update(self.load_prospects())
+      context.update(self.load_trained_sessions())
+      context.update(self.load_trained_races())
+      context.update(self.load_plans())
+
+    return context
+
+  def load_weeks(self):
+    '''
+    Load previous weeks
+    '''
+    # List 12 previous weeks
+    start = date_to_day(self.today)
+    weeks_future = 3
+    weeks_past = 6
+    weeks = []
+    empty = True # Check if there are some data to display
+    for w in range(-weeks_past * 7, weeks_future * 7, 7):
+      day = start + timedelta(days=w)
+      week, year = int(day.strftime('%W')), day.year
+      if w > 0:
+        state = 'future'
+      elif w < 0:
+        state = 'past'
+      else:
+        state = 'current'
+      weeks.append({
+        'date' : day,
+        'year' : year,
+        'week' : week,
+        'stats' : StatsWeek(self.user, year, week, preload=False),
+        'state' : state,
+      })
+
+    # Fetch all weeks at once
+    StatsWeek.fetch_all([w['stats'] for w in weeks])
+    for w in weeks:
+      if empty:
+        empty = not (w['stats'].sessions and w['stats'].sessions['total'])
+
+    # Only keep the stats data, for the snapshot
+    refreshing = any([w['stats'].refreshing for w in weeks])
+    for w in weeks:
+      w['data'] = w.pop('stats').data or {}
+
+    return {
+      'weeks_empty' : empty,
+      'weeks_refreshing' : refreshing,
+      'weeks' : weeks,
+    }
+
+  def load_sessions(self):
+    '''
+    Load sessions close to today
+    '''
+    filters = {
+      'type' : 'training',
+      'user' : self.user,
+      'date__gte' : self.today,
+      'date__lte' : self.today + timedelta(days=10),
+    }
+    sessions = SportSession.objects.filter(**filters)
+    sessions = sessions.select_related('day', 'track')
+    sessions = sessions.order_by('date')
+
+    return {
+      'sessions' : list(sessions),
+    }
+
+  def load_races(self):
+    '''
+    Load all future races
+    '''
+    filters = {
+      'user' : self.user,
+      'date__gte' : self.today,
+      'type' : 'race',
+    }
+    races = SportSession.objects.filter(**filters)
+    races = races.select_related('day', 'track')
+    races = races.order_by('date')
+
+    return {
+      'races' : list(races),
+    }
+
+  def load_friends_sessions(self):
+    '''
+    Load athlete friends sessions
+    * close to today
+    * grouped by athletes
+    '''
+    sessions = FriendsFeed(self.user.pk).list_sessions(self.today, self.today + timedelta(days=30))
+    sessions = sorted(sessions, key=lambda s: (s.user.first_name, s.date))
+
+    # Group
+    friends = OrderedDict()
+    for s in sessions:
+      user = s.user
+      if user.pk not in friends:
+        friends[user.pk] = {
+          'user' : user,
+          'sessions' : [],
+        }
+      friends[user.pk]['sessions'].append(s)
+
+    return {
+      'friends' : friends,
+    }
+
+  def load_prospects(self):
+    '''
+    Load prospects in all the clubs of manager
+    '''
+    filters = {
+      'club__manager' : self.user,
+      'role' : 'prospect',
+    }
+    prospects = ClubMembership.objects.filter(**filters)
+    prospects = prospects.select_related('user', 'club')
+
+    return {
+      'prospects' : list(prospects),
+    }
+
+  def load_trained_sessions(self):
+    '''
+    Load past sessions close to today
+    for all the trainer's athletes
+    Grouped by dates
+    '''
+    inbox = TrainerInbox(self.user)
+    activities = inbox.iterate(start=self.today - timedelta(days=7), end=self.today, limit=100)
+
+    # Group by dates
+    groups = OrderedDict()
+    for a in activities:
+      d = a.date
+      if d not in groups:
+        groups[d] = []
+      groups[d].append(a.session)
+
+    return {
+      'sessions' : groups,
+    }
+
+  def load_trained_races(self):
+    '''
+    Load future races
+    for all the trainer's athletes
+    '''
+    inbox = TrainerInbox(self.user)
+    races, _ = inbox.page(kinds=('race', ), start=self.today, end=self.today + timedelta(days=60), limit=15, reverse=False)
+
+    return {
+      'races' : [r.session for r in races],
+    }
+
+  def load_vma(self):
+    '''
+    Load some vma speeds for current user
+    '''
+    vma = self.user.vma
+    if not vma:
+      return {
+        'vma': None,
+      }
+
+    # Calc some times
+    vc = VmaCalc(vma)
+    paces = (60, 80, 90, 100)
+    distances = (100, 200, 400, 500, 1000)
+    speeds = []
+    for i,d in enumerate(distances):
+      speeds.append([])
+      for p in paces:
+        speeds[i].append(vc.get_time(p, d))
+
+    return {
+      'vma' : {
+        'paces' : paces,
+        'distances' : distances,
+        'speeds' : speeds,
+      }
+    }
+
+  def load_plans(self):
+    '''
+    Load last created plans
+    '''
+    plans = self.user.plans.order_by('-created')[0:3]
+    return {
+      'plans' : list(plans),
+    }
@@ -202,5 +202,5 @@ class GCalSync(object):
     self.user.save()
 
     # Remove all id from Sport sessions
-    sessions = SportSession.objects.filter(day__week__user=self.user, gcal_id__isnull=False)
+    sessions = SportSession.objects.filter(user=self.user, gcal_id__isnull=False)
     sessions.update(gcal_id=None)
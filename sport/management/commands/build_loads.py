@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from sport.models import TrainingLoad
+from users.models import Athlete
+from optparse import make_option
+
+class Command(BaseCommand):
+  help = 'Rebuild the full training load history of athletes'
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Only rebuild the specified user.'),
+  )
+
+  def handle(self, *args, **options):
+    users = Athlete.objects.all()
+    if options['username']:
+      users = users.filter(username=options['username'])
+    users = users.order_by('username')
+
+    for user in users:
+      rows = TrainingLoad.update_user(user.pk)
+      print '%s : %d days' % (user, len(rows))
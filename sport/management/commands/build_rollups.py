@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sport.models import SportDailyRollup
+from users.models import Athlete
+from optparse import make_option
+
+# Compared values of a rollup
+ROLLUP_FIELDS = ('nb', 'distance', 'time', 'elevation_gain', 'elevation_loss')
+
+class Command(BaseCommand):
+  help = 'Verify & rebuild the sessions daily rollups'
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Only check the specified user.'),
+    make_option('--check',
+      action='store_true',
+      dest='check',
+      default=False,
+      help='Only report invalid rollups, without rebuilding them.'),
+  )
+
+  def handle(self, *args, **options):
+    users = Athlete.objects.all()
+    if options['username']:
+      users = users.filter(username=options['username'])
+    users = users.order_by('username')
+
+    nb_invalid = 0
+    for user in users:
+      # Compare expected rollups with saved ones
+      def _key(r):
+        return (r.date, r.sport_id, r.type)
+      def _values(r):
+        return tuple(getattr(r, f) for f in ROLLUP_FIELDS)
+      expected = dict((_key(r), r) for r in SportDailyRollup.build_user(user))
+      saved = dict((_key(r), r) for r in user.rollups.all())
+      invalid = [k for k in set(expected.keys() + saved.keys()) if k not in expected or k not in saved or _values(expected[k]) != _values(saved[k])]
+      if not invalid:
+        continue
+
+      nb_invalid += 1
+      print '%s : %d invalid rollups' % (user, len(invalid))
+      if options['check']:
+        continue
+
+      # Rebuild all the user rollups
+      with transaction.atomic():
+        user.rollups.all().delete()
+        SportDailyRollup.objects.bulk_create(expected.values())
+
+    print '%d users with invalid rollups' % nb_invalid
@@ -1,12 +1,55 @@
 from django.core.management.base import BaseCommand
-from sport.models import SportDay
-from sport.stats import StatsMonth, StatsWeek
+from django.db import connections
+from sport.models import SportSession, SportDailyRollup
+from sport.stats import build_periods, list_stats
+from sport.bounds import CalendarBounds
 from users.models import Athlete
-from datetime import date
+from django.utils import timezone
+from helpers import get_redis
+from datetime import date, datetime
+from multiprocessing import Pool
 from optparse import make_option
-import calendar
+import time
+
+# High-water mark on SportSession.updated of the last complete run
+BUILD_MARK = 'stats:build:mark'
+
+# Run in progress (mark targeted & mode), per scope
+BUILD_PENDING = 'stats:build:pending:%s'
+
+# Users already built by the run in progress, per scope
+BUILD_DONE = 'stats:build:done:%s'
+
+# Format of the stored marks, in UTC
+BUILD_MARK_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+def build_user(args):
+  '''
+  Build the stats of a user, in a worker process
+  Only the periods containing some dates when
+  specified, all of them otherwise
+  '''
+  user_id, dates, done_key = args
+  user = Athlete.objects.get(pk=user_id)
+  if dates is None:
+    first = CalendarBounds(user_id).get()['first']
+    dates = first and [(first, date.today())] or []
+  else:
+    dates = [(d, d) for d in dates]
+
+  # Remove duplicates periods
+  stats = {}
+  for start, end in dates:
+    for st in list_stats([user], start, end):
+      stats[st.key] = st
+  build_periods(stats.values())
+
+  # Save progress, for a resume
+  get_redis().sadd(done_key, user_id)
+  return user_id, len(stats)
 
 class Command(BaseCommand):
+  help = 'Rebuild the weekly & monthly stats changed since the last run'
   option_list = BaseCommand.option_list + (
     make_option('--username',
       action='store',
@@ -14,47 +57,92 @@ class Command(BaseCommand):
       type='string',
       default=False,
       help='Ran the import on the specified user.'),
+    make_option('--full',
+      action='store_true',
+      dest='full',
+      default=False,
+      help='Rebuild all the periods, ignoring the last run.'),
+    make_option('--processes',
+      action='store',
+      dest='processes',
+      type='int',
+      default=4,
+      help='Number of worker processes.'),
   )
 
   def handle(self, *args, **options):
-    today = date.today()
+    redis = get_redis()
+
+    # Runs on a single user have their own progress
+    scope = options['username'] or 'all'
+    pending_key, done_key = BUILD_PENDING % scope, BUILD_DONE % scope
+
+    # Resume an interrupted run, in its mode, or start a new one
+    pending = redis.hgetall(pending_key)
+    if pending:
+      print 'Resuming %s run until %s' % (pending['mode'], pending['mark'])
+    else:
+      pending = {
+        'mark' : timezone.now().astimezone(timezone.utc).strftime(BUILD_MARK_FORMAT),
+        'mode' : options['full'] and 'full' or 'incremental',
+      }
+      redis.delete(done_key)
+      redis.hmset(pending_key, pending)
+    done = set(int(pk) for pk in redis.smembers(done_key))
+    mark = pending['mode'] == 'incremental' and redis.get(BUILD_MARK) or None
 
     users = Athlete.objects.all()
     if options['username']:
       users = users.filter(username=options['username'])
+    users = users.exclude(pk__in=done)
+
+    if mark:
+      # Only the days having updated sessions
+      print 'Sessions updated since %s UTC' % mark
+      mark = datetime.strptime(mark, BUILD_MARK_FORMAT).replace(tzinfo=timezone.utc)
+      sessions = SportSession.objects.filter(user__in=users, updated__gt=mark)
+      sessions = sessions.values_list('user', 'date').distinct()
+      days = {}
+      for user_id, day in sessions:
+        days.setdefault(user_id, set()).add(day)
+
+      # Also the days left by moved or deleted sessions
+      user_ids = set(users.values_list('pk', flat=True))
+      for user_id, day in SportDailyRollup.list_changes(mark):
+        if user_id in user_ids:
+          days.setdefault(user_id, set()).add(day)
+      jobs = [(user_id, sorted(d), done_key) for user_id, d in days.items()]
+    else:
+      jobs = [(user_id, None, done_key) for user_id in users.values_list('pk', flat=True)]
+
+    print '%d users to build (%d already done)' % (len(jobs), len(done))
+
+    # Forked workers can't share the db connections
+    connections.close_all()
+
+    start = time.time()
+    nb_users, nb_stats = 0, 0
+    pool = Pool(options['processes'])
+    try:
+      for user_id, nb in pool.imap_unordered(build_user, jobs):
+        nb_users += 1
+        nb_stats += nb
+        if nb_users % 100 == 0:
+          elapsed = time.time() - start
+          print '%d/%d users, %d stats (%.1f users/s, %.1f stats/s)' % (nb_users, len(jobs), nb_stats, nb_users / elapsed, nb_stats / elapsed)
+      pool.close()
+    except:
+      pool.terminate()
+      raise
+    finally:
+      pool.join()
+
+    elapsed = time.time() - start
+    print '%d users, %d stats built in %.1fs (%.1f stats/s)' % (nb_users, nb_stats, elapsed, elapsed and nb_stats / elapsed or 0)
 
-    users = users.order_by('username')
-
-    cal = calendar.Calendar()
-
-    for user in users:
-      print user
-
-      # Search first active day
-      first = SportDay.objects.filter(week__user=user).order_by('date').first()
-      if not first:
-        print ' !! No day, no stats !!'
-        continue
-
-      # Buil StatsMonth until now
-      for year in range(first.date.year, today.year+1):
-        print year
-        for month in range(1, 13):
-
-          # Skip unecessary months (no data)
-          if (year, month) < (first.date.year, first.date.month) or (year, month) > (today.year, today.month):
-            continue
-
-          # Build StatsMonth
-          stats = StatsMonth(user, year, month)
-          stats.build()
-
-          # Build weeks
-          weeks = cal.monthdatescalendar(year, month)
-          for w in weeks:
-            day = w[0]
-            if day.month != month:
-              continue
-            week = int(day.strftime('%W'))
-            stats = StatsWeek(user, year, week)
-            stats.build()
+    # Complete run: move the high-water mark
+    # Partial runs don't, as other users were skipped
+    if not options['username']:
+      redis.set(BUILD_MARK, pending['mark'])
+      SportDailyRollup.purge_changes(datetime.strptime(pending['mark'], BUILD_MARK_FORMAT).replace(tzinfo=timezone.utc))
+    redis.delete(pending_key, done_key)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from sport.models import SportSession
+from users.models import Athlete
+from datetime import date, timedelta
+from optparse import make_option
+import time
+
+class Command(BaseCommand):
+  help = 'Compare the query plans of sessions filtered through their day or directly'
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Athlete used in the queries.'),
+  )
+
+  def explain(self, name, queryset):
+    # Run & display the plan of a queryset
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    start = time.time()
+    cursor.execute('EXPLAIN ANALYZE %s' % sql, params)
+    plan = [row[0] for row in cursor.fetchall()]
+    print '=== %s (%.1f ms)' % (name, (time.time() - start) * 1000.0)
+    print '\n'.join(plan)
+    print
+
+  def handle(self, *args, **options):
+    users = Athlete.objects.all()
+    if options['username']:
+      users = users.filter(username=options['username'])
+    user = users.order_by('pk').first()
+    today = date.today()
+    start = today - timedelta(days=30)
+
+    queries = (
+      ('athlete month', {'day__week__user' : user, 'day__date__gte' : start, 'day__date__lte' : today}, {'user' : user, 'date__gte' : start, 'date__lte' : today}),
+      ('races tomorrow', {'type' : 'race', 'day__date' : today + timedelta(days=1)}, {'type' : 'race', 'date' : today + timedelta(days=1)}),
+      ('friends month', {'day__week__user__in' : user.friends.all(), 'day__date__gte' : start}, {'user__in' : user.friends.all(), 'date__gte' : start}),
+    )
+    for name, before, after in queries:
+      self.explain('%s : through days' % name, SportSession.objects.filter(**before).order_by('day__date'))
+      self.explain('%s : direct' % name, SportSession.objects.filter(**after).order_by('date'))
@@ -20,11 +20,10 @@ class Command(BaseCommand):
 
     # Sum stats
     stats = {}
-    for m in range(1, 13):
-      month = StatsMonth(user, year, m)
-      data = month.fetch()
-      if data:
-        stats = self.merge(stats, data)
+    months = [StatsMonth(user, year, m, preload=False) for m in range(1, 13)]
+    for month in StatsMonth.fetch_all(months, build=False):
+      if month.data:
+        stats = self.merge(stats, month.data)
 
     # Load sports objects
     if stats and 'sports' in stats:
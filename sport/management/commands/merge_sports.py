@@ -20,7 +20,7 @@ class Command(BaseCommand):
     print 'From #%d %s to #%d %s' % (self.source.pk, self.source.name, self.dest.pk, self.dest.name)
 
     # Load sessions
-    self.sessions = SportSession.objects.filter(sport=self.source).order_by('day__date')
+    self.sessions = SportSession.objects.filter(sport=self.source).order_by('date')
 
     self.merge_tracks()
     self.adopt_sport()
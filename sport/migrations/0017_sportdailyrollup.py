@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sport', '0016_auto_20150722_1630'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SportDailyRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('date', models.DateField()),
+                ('type', models.CharField(default=b'training', max_length=12, choices=[(b'training', 'Training'), (b'race', 'Race'), (b'rest', 'Rest')])),
+                ('nb', models.IntegerField(default=0)),
+                ('distance', models.FloatField(null=True, blank=True)),
+                ('time', models.DurationField(null=True, blank=True)),
+                ('elevation_gain', models.FloatField(null=True, blank=True)),
+                ('elevation_loss', models.FloatField(null=True, blank=True)),
+                ('sport', models.ForeignKey(to='sport.Sport')),
+                ('user', models.ForeignKey(related_name='rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'sport_daily_rollup',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='sportdailyrollup',
+            unique_together=set([('user', 'date', 'sport', 'type')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='sportdailyrollup',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sport', '0017_sportdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingLoad',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('date', models.DateField()),
+                ('load', models.FloatField(default=0.0)),
+                ('ctl', models.FloatField(default=0.0)),
+                ('atl', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(related_name='training_loads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('date',),
+                'db_table': 'sport_training_load',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='trainingload',
+            unique_together=set([('user', 'date')]),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sport', '0018_trainingload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_comments',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_distance',
+            field=models.FloatField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_nb',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_sessions',
+            field=models.TextField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_time',
+            field=models.DurationField(null=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_track',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='sportday',
+            name='summary_type',
+            field=models.CharField(max_length=12, null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sport', '0019_sportday_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sportsession',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='sportsession',
+            name='user',
+            field=models.ForeignKey(related_name='sport_sessions', to=settings.AUTH_USER_MODEL, null=True),
+        ),
+    ]
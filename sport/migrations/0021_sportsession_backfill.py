@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sport', '0020_sportsession_user_date'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            '''
+            UPDATE sport_session AS s
+            SET user_id = w.user_id, date = d.date
+            FROM sport_day AS d
+            INNER JOIN sport_week AS w ON w.id = d.week_id
+            WHERE s.day_id = d.id
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
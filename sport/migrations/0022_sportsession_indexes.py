@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sport', '0021_sportsession_backfill'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sportsession',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='sportsession',
+            name='user',
+            field=models.ForeignKey(related_name='sport_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterIndexTogether(
+            name='sportsession',
+            index_together=set([('user', 'date'), ('type', 'date')]),
+        ),
+    ]
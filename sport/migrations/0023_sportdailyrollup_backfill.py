@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sport', '0022_sportsession_indexes'),
+        ('plan', '0007_auto_20150209_1812'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            '''
+            DELETE FROM sport_daily_rollup;
+            INSERT INTO sport_daily_rollup (user_id, date, sport_id, type, nb, distance, time, elevation_gain, elevation_loss)
+            SELECT s.user_id, s.date, s.sport_id, s.type, COUNT(s.id), SUM(s.distance), SUM(s.time), SUM(s.elevation_gain), SUM(s.elevation_loss)
+            FROM sport_session AS s
+            LEFT OUTER JOIN plan_plansessionapplied AS p ON p.sport_session_id = s.id
+            WHERE p.id IS NULL OR p.status != 'failed'
+            GROUP BY s.user_id, s.date, s.sport_id, s.type
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
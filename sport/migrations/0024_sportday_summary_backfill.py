@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from itertools import groupby
+
+def build_summaries(apps, schema_editor):
+  '''
+  Fill the days summaries, reading
+  all the sessions in a single query
+  '''
+  from sport.summary import day_summary, DAY_SUMMARY_VALUES
+  SportDay = apps.get_model('sport', 'SportDay')
+  SportSession = apps.get_model('sport', 'SportSession')
+
+  # Days without sessions
+  SportDay.objects.update(summary_sessions='[]')
+
+  sessions = SportSession.objects.order_by('day', 'created').values('day', *DAY_SUMMARY_VALUES)
+  for day_id, rows in groupby(sessions.iterator(), key=lambda r: r['day']):
+    SportDay.objects.filter(pk=day_id).update(**day_summary(list(rows)))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sport', '0023_sportdailyrollup_backfill'),
+        ('plan', '0007_auto_20150209_1812'),
+        ('tracks', '0014_track_companions'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -8,3 +8,5 @@ SESSION_TYPES = (
 
 from .organisation import SportWeek, SportDay, RaceCategory
 from .sport import Sport, SportSession
+from .rollup import SportDailyRollup
+from .load import TrainingLoad
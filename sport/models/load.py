@@ -0,0 +1,155 @@
+# coding=utf-8
+from django.db import models, transaction
+from django.db.models import Max, Q
+from datetime import date, timedelta
+import math
+import operator
+
+# Time constants of the moving averages, in days
+LOAD_CHRONIC_DAYS = 42 # fitness
+LOAD_ACUTE_DAYS = 7 # fatigue
+
+# Defaults for incomplete sessions
+LOAD_DEFAULT_RPE = 5 # on the CR-10 scale
+LOAD_DEFAULT_PACE = 6.0 # in minutes per km
+
+def session_load(time, distance, note, type):
+  '''
+  Session-RPE load: duration in minutes
+  multiplied by the perceived difficulty
+  The 5 stars note is mapped on the CR-10 scale
+  '''
+  if type == 'rest':
+    return 0.0
+  if time:
+    minutes = time.total_seconds() / 60.0
+  else:
+    minutes = (distance or 0.0) * LOAD_DEFAULT_PACE
+  rpe = note and note * 2 or LOAD_DEFAULT_RPE
+  return minutes * rpe
+
+class TrainingLoad(models.Model):
+  '''
+  Daily training load of an athlete, with its
+  chronic (CTL) & acute (ATL) moving averages
+  '''
+  user = models.ForeignKey('users.Athlete', related_name='training_loads')
+  date = models.DateField()
+  load = models.FloatField(default=0.0)
+  ctl = models.FloatField(default=0.0)
+  atl = models.FloatField(default=0.0)
+
+  class Meta:
+    db_table = 'sport_training_load'
+    app_label = 'sport'
+    unique_together = (('user', 'date'),)
+    ordering = ('date', )
+
+  def __unicode__(self):
+    return u'%s : %s %.1f' % (self.user_id, self.date, self.load)
+
+  @property
+  def tsb(self):
+    # Training stress balance, or form
+    return self.ctl - self.atl
+
+  @property
+  def acwr(self):
+    # Acute:chronic workload ratio
+    return self.ctl and self.atl / self.ctl or None
+
+  @property
+  def timestamp(self):
+    # Used by flot js
+    return int(self.date.strftime('%s'))
+
+  def decay(self, day):
+    '''
+    Unsaved load at a later day,
+    without any session in between
+    '''
+    days = (day - self.date).days
+    return TrainingLoad(
+      user_id=self.user_id,
+      date=day,
+      ctl=self.ctl * math.pow(1.0 - ewma_factor(LOAD_CHRONIC_DAYS), days),
+      atl=self.atl * math.pow(1.0 - ewma_factor(LOAD_ACUTE_DAYS), days),
+    )
+
+  @staticmethod
+  def daily_loads(user_id, start):
+    '''
+    Sum of the sessions load per day
+    '''
+    from .sport import SportSession
+    sessions = SportSession.objects.filter(user=user_id, date__gte=start)
+    sessions = sessions.exclude(plan_session__status='failed')
+    loads = {}
+    for day, time, distance, note, type in sessions.values_list('date', 'time', 'distance', 'note', 'type'):
+      loads[day] = loads.get(day, 0.0) + session_load(time, distance, note, type)
+    return loads
+
+  @classmethod
+  def update_user(cls, user_id, start=None, end=None):
+    '''
+    Recompute the loads of a user, from a day until today
+    The averages before that day are kept as seed
+    '''
+    end = end or date.today()
+    previous = None
+    if start:
+      previous = cls.objects.filter(user=user_id, date__lt=start).order_by('-date').first()
+    loads = cls.daily_loads(user_id, start or date.min)
+    if not start:
+      start = loads and min(loads.keys()) or end
+
+    # Seed with previous averages
+    seed = previous and previous.decay(start - timedelta(days=1))
+    ctl, atl = seed and (seed.ctl, seed.atl) or (0.0, 0.0)
+
+    # Moving averages, in one pass
+    k_ctl, k_atl = ewma_factor(LOAD_CHRONIC_DAYS), ewma_factor(LOAD_ACUTE_DAYS)
+    rows = []
+    day = start
+    while day <= end:
+      load = loads.get(day, 0.0)
+      ctl += (load - ctl) * k_ctl
+      atl += (load - atl) * k_atl
+      rows.append(cls(user_id=user_id, date=day, load=load, ctl=ctl, atl=atl))
+      day += timedelta(days=1)
+
+    # Only replace the tail
+    with transaction.atomic():
+      cls.objects.filter(user=user_id, date__gte=start).delete()
+      cls.objects.bulk_create(rows)
+
+    return rows
+
+  @classmethod
+  def weekly(cls, user, start, end):
+    '''
+    Loads of a user between two days, one per week
+    on sundays, and the last computed day
+    '''
+    loads = cls.objects.filter(user=user, date__gte=start, date__lte=end)
+    last = loads.aggregate(last=Max('date'))['last']
+    if last is None:
+      return cls.objects.none()
+    return loads.filter(Q(date__week_day=1) | Q(date=last))
+
+  @classmethod
+  def current(cls, users, day=None):
+    '''
+    Loads of several users at a day,
+    from their last computed values
+    '''
+    day = day or date.today()
+    last = cls.objects.filter(user__in=users, date__lte=day).values('user').annotate(last=Max('date')).order_by()
+    if not last:
+      return {}
+    filters = reduce(operator.or_, [Q(user=l['user'], date=l['last']) for l in last])
+    return dict((l.user_id, l.decay(day)) for l in cls.objects.filter(filters))
+
+def ewma_factor(days):
+  # Smoothing factor of an exponential moving average
+  return 1.0 - math.exp(-1.0 / days)
@@ -1,20 +1,29 @@
 # coding=utf-8
 from __future__ import absolute_import
 from django.db import models
-from django.db.models import Count
+from django.utils.functional import cached_property
 from users.models import Athlete
 from datetime import datetime, date, time
 import xlwt
 import tempfile
+import json
 from django.conf import settings
 from coach.mail import MailBuilder
 from helpers import date_to_day, week_to_date
-from sport.stats import StatsMonth, StatsWeek
-from .sport import SportSession
+from sport.stats import list_stats, mark_dirty
 from collections import OrderedDict
-from messages.models import Conversation, TYPE_COMMENTS_WEEK
+from messages.models import Conversation, Message, TYPE_COMMENTS_WEEK, TYPE_COMMENTS_PUBLIC, TYPE_COMMENTS_PRIVATE
+from django.db.models.signals import post_save, pre_delete, post_delete
+from sport.version import DataVersion
+from sport.bounds import CalendarBounds
+from sport.summary import day_summary, DAY_SUMMARY_VALUES
 from django.core.urlresolvers import reverse
 from django.contrib.sites.models import Site
+import threading
+
+# Days in deletion, their sessions
+# are removed first by cascade
+_days_deleted = threading.local()
 
 class SportWeek(models.Model):
   user = models.ForeignKey(Athlete, related_name='sportweek')
@@ -44,9 +53,14 @@ class SportWeek(models.Model):
     # Days from monday to sunday
     return [self.get_date(day) for day in (1,2,3,4,5,6,0)]
 
+  def get_summary(self):
+    # Cached summary of the whole week
+    from sport.summary import WeekSummary
+    return WeekSummary(self).get()
+
   def get_days_per_date(self):
     sessions = OrderedDict()
-    days = self.days.prefetch_related('sessions').prefetch_related('sessions__comments_public', 'sessions__comments_private')
+    days = SportDay.load_summaries(self.days.all())
 
     # Empty days by default
     for d in self.get_dates():
@@ -87,9 +101,9 @@ class SportWeek(models.Model):
   def get_absolute_url(self):
     return ('report-week', [self.year, self.week])
 
-  def build_xls(self):
+  def build_xls(self, summary=None):
     '''
-    Build excel file using sessions
+    Build excel file using the week summary
     '''
     from django.utils import formats
 
@@ -110,22 +124,20 @@ class SportWeek(models.Model):
 
     # Add content to xls
     i = 0
-    days = self.get_days_per_date()
-    for day_date, day in days.items():
-      ws.write(i, 0, formats.date_format(day_date, 'DATE_FORMAT'), style_date)
+    summary = summary or self.get_summary()
+    for day in summary['days']:
+      ws.write(i, 0, formats.date_format(day['date'], 'DATE_FORMAT'), style_date)
       content = []
-      if not day:
-        i += 1
-        continue
 
       # Sessions listing
-      for s in day.sessions.all().order_by('created'):
-        if s.name:
-          content.append('%s - %s :' % (s.sport.name, s.name,))
-        if s.comment:
-          content.append(s.comment)
-
-      ws.write(i, 1, '\n'.join(content), style_align)
+      for s in day['sessions']:
+        if s['name']:
+          content.append('%s - %s :' % (s['sport'].name, s['name'],))
+        if s['comment']:
+          content.append(s['comment'])
+
+      if content:
+        ws.write(i, 1, '\n'.join(content), style_align)
       i += 1
     ws.col(0).width = 4000 # Static width for dates
 
@@ -139,7 +151,8 @@ class SportWeek(models.Model):
     Publish this report
     '''
     # Build xls
-    xls = open(self.build_xls(), 'r')
+    summary = self.get_summary()
+    xls = open(self.build_xls(summary), 'r')
     xls_name = '%s_semaine_%d.xls' % (self.user.username, self.week+1)
 
     # Context for html
@@ -147,7 +160,7 @@ class SportWeek(models.Model):
       'week_human' : self.week + 1,
       'report': self,
       'club': membership.club,
-      'days' : self.get_days_per_date(),
+      'summary' : summary,
       'base_uri' : base_uri,
     }
 
@@ -168,53 +181,9 @@ class SportWeek(models.Model):
     self.save()
 
 
-  def get_sports_stats(self):
-    '''
-    List all the cumulated time & distance
-    per sport for this week
-    '''
-    stats = []
-    sessions = SportSession.objects.filter(day__week=self)
-    sessions = sessions.exclude(plan_session__status='failed')
-    sports = set([s.sport for s in sessions])
-
-    for sport in sports:
-      t, d, e = 0.0, 0.0, 0.0
-      sport_sessions = sessions.filter(sport=sport)
-      for s in sport_sessions :
-        if s.time:
-          t += s.time.total_seconds()
-        if s.distance:
-          d += s.distance
-        if s.elevation_gain:
-          e += s.elevation_gain
-      stats.append({
-        'sport' : sport,
-        'time' : t,
-        'distance' : d,
-        'elevation' : e,
-        'sessions' : sport_sessions.count(),
-      })
-
-    # Add total
-    stats.append({
-      'sport' : None, # Total
-      'time' : sum([s['time'] for s in stats]),
-      'distance' : sum([s['distance'] for s in stats]),
-      'elevation' : sum([s['elevation'] for s in stats]),
-      'sessions' : sum([s['sessions'] for s in stats]),
-    })
-
-    return stats
-
   def rebuild_cache(self):
-    # Rebuild the monthly stats cache
-    st = StatsMonth(self.user, self.year, self.get_date_start().month, preload=False)
-    st.build()
-
-    # Rebuild the weekly stats cache
-    st = StatsWeek(self.user, self.year, self.week, preload=False)
-    st.build()
+    # Queue the weekly & monthly stats rebuild
+    mark_dirty(list_stats([self.user], self.get_date_start(), self.get_date_end()))
 
   def add_comment(self, message, writer):
     '''
@@ -241,6 +210,15 @@ class SportDay(models.Model):
   date = models.DateField()
   sports = models.ManyToManyField('Sport', through='SportSession')
 
+  # Denormalized summary, updated on sessions writes
+  summary_nb = models.IntegerField(default=0)
+  summary_type = models.CharField(max_length=12, null=True, blank=True)
+  summary_distance = models.FloatField(null=True, blank=True)
+  summary_time = models.DurationField(null=True, blank=True)
+  summary_track = models.BooleanField(default=False)
+  summary_comments = models.BooleanField(default=False)
+  summary_sessions = models.TextField(null=True, blank=True) # json
+
   class Meta:
     unique_together = (('week', 'date'),)
     db_table = 'sport_day'
@@ -255,24 +233,70 @@ class SportDay(models.Model):
     url = reverse('report-day', args=(self.date.year, self.date.month, self.date.day))
     return 'https://%s%s' % (site.domain, url)
 
+  def update_summary(self):
+    '''
+    Rebuild the summary from the sessions,
+    in a single query
+    '''
+    rows = []
+    if self.pk:
+      rows = list(self.sessions.order_by('created').values(*DAY_SUMMARY_VALUES))
+    summary = day_summary(rows)
+    for field, value in summary.items():
+      setattr(self, field, value)
+    if self.pk:
+      SportDay.objects.filter(pk=self.pk).update(**summary)
+    self.__dict__.pop('summary', None)
+
+  @classmethod
+  def update_summaries(cls, days):
+    # Update the days of several (user, date)
+    # Skip the days being deleted
+    deleted = getattr(_days_deleted, 'ids', set())
+    for user_id, date in days:
+      day = cls.objects.filter(week__user=user_id, date=date).first()
+      if day and day.pk not in deleted:
+        day.update_summary()
+
+  @cached_property
+  def summary(self):
+    # Decoded sessions summary, built on first use
+    if self.summary_sessions is None:
+      self.update_summary()
+    return json.loads(self.summary_sessions)
+
+  @classmethod
+  def load_summaries(cls, days):
+    '''
+    Attach the sports of several days summaries,
+    using a single query
+    '''
+    from .sport import Sport
+    days = [d for d in days if d is not None]
+    sports = Sport.objects.in_bulk(set([s['sport'] for d in days for s in d.summary]))
+    for d in days:
+      for s in d.summary:
+        s['sport'] = sports.get(s['sport'], s['sport'])
+    return days
+
   def sports_count(self):
     # List sports usage in this day
-    counts = self.sports.all().values('pk').annotate(total=Count('pk')).order_by('total')
-    return [(self.sports.filter(pk=c['pk']).first(), c['total']) for c in counts]
+    counts = OrderedDict()
+    for s in self.summary:
+      counts[s['sport']] = counts.get(s['sport'], 0) + 1
+    return sorted(counts.items(), key=lambda c: c[1])
 
   def types_count(self):
     # List types usage in this day
-    counts = self.sessions.values('type').annotate(total=Count('type')).order_by('total')
-    return [(c['type'], c['total']) for c in counts]
+    counts = {}
+    for s in self.summary:
+      counts[s['type']] = counts.get(s['type'], 0) + 1
+    return sorted(counts.items(), key=lambda c: c[1])
 
   def best_type(self):
     # Gives the best type reprensenting day
     # Race > Training > Rest
-    types = [t[0] for t in self.types_count()]
-    for t in ('race', 'training', 'rest'):
-      if t in types:
-        return t
-    return 'rest'
+    return self.summary_type or 'rest'
 
   def rebuild_cache(self):
     # Rebuild the stats cache
@@ -288,3 +312,65 @@ class RaceCategory(models.Model):
 
   def __unicode__(self):
     return self.name
+
+
+def week_version_bump(sender, instance, raw=False, **kwargs):
+  '''
+  Weeks & days are displayed in calendars
+  '''
+  if raw:
+    return
+  week = isinstance(instance, SportWeek) and instance or instance.week
+  DataVersion.bump(week.user_id)
+
+def comment_version_bump(sender, instance, raw=False, **kwargs):
+  '''
+  Comments on weeks & sessions are displayed
+  in their owner calendars
+  '''
+  if raw:
+    return
+  conversation = instance.conversation
+  if conversation.type == TYPE_COMMENTS_WEEK and hasattr(conversation, 'week'):
+    DataVersion.bump(conversation.week.user_id)
+  elif conversation.type in (TYPE_COMMENTS_PUBLIC, TYPE_COMMENTS_PRIVATE):
+    session = conversation.get_session()
+    if session:
+      DataVersion.bump(session.user_id)
+
+def day_bounds_add(sender, instance, created=False, raw=False, **kwargs):
+  '''
+  Extend the calendar bounds with new days
+  '''
+  if raw or not created:
+    return
+  CalendarBounds.add(instance.week.user_id, instance.date)
+
+def day_deletion_start(sender, instance, **kwargs):
+  # Don't update the summary of a deleted day
+  if not hasattr(_days_deleted, 'ids'):
+    _days_deleted.ids = set()
+  _days_deleted.ids.add(instance.pk)
+
+def day_deletion_end(sender, instance, **kwargs):
+  getattr(_days_deleted, 'ids', set()).discard(instance.pk)
+
+def day_bounds_reset(sender, instance, **kwargs):
+  # Rebuild the calendar bounds without this day
+  CalendarBounds.reset(instance.week.user_id)
+
+# register the data versions signals
+post_save.connect(week_version_bump, sender=SportWeek)
+post_delete.connect(week_version_bump, sender=SportWeek)
+post_save.connect(week_version_bump, sender=SportDay)
+post_delete.connect(week_version_bump, sender=SportDay)
+post_save.connect(comment_version_bump, sender=Message)
+post_delete.connect(comment_version_bump, sender=Message)
+
+# register the days deletion signals
+pre_delete.connect(day_deletion_start, sender=SportDay)
+post_delete.connect(day_deletion_end, sender=SportDay)
+
+# register the calendar bounds signals
+post_save.connect(day_bounds_add, sender=SportDay)
+post_delete.connect(day_bounds_reset, sender=SportDay)
@@ -0,0 +1,227 @@
+# coding=utf-8
+from django.db import models, transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from . import SESSION_TYPES
+from .sport import Sport, SportSession
+from .organisation import SportDay
+from sport.stats import apply_deltas, _diff
+from sport.summary import WeekSummary
+from sport.version import DataVersion
+from helpers import on_commit, get_redis
+from datetime import datetime
+import calendar
+import time
+from ..tasks import update_training_load, refresh_dashboards
+
+# Aggregates stored in a rollup
+ROLLUP_AGGREGATES = {
+  'nb' : Count('id'),
+  'distance' : Sum('distance'),
+  'time' : Sum('time'),
+  'elevation_gain' : Sum('elevation_gain'),
+  'elevation_loss' : Sum('elevation_loss'),
+}
+
+# Days of changed rollups, scored by change time,
+# for the incremental stats builds
+ROLLUP_CHANGES = 'stats:build:changes'
+
+def _timestamp(when):
+  # Epoch of an aware datetime
+  return calendar.timegm(when.utctimetuple()) + when.microsecond / 1000000.0
+
+class SportDailyRollup(models.Model):
+  '''
+  Sessions totals of an athlete, per day, sport & type
+  Maintained on every SportSession write, to
+  avoid scanning all sessions for stats
+  '''
+  user = models.ForeignKey('users.Athlete', related_name='rollups')
+  date = models.DateField()
+  sport = models.ForeignKey(Sport)
+  type = models.CharField(max_length=12, default='training', choices=SESSION_TYPES)
+
+  # Totals
+  nb = models.IntegerField(default=0)
+  distance = models.FloatField(null=True, blank=True)
+  time = models.DurationField(null=True, blank=True)
+  elevation_gain = models.FloatField(null=True, blank=True)
+  elevation_loss = models.FloatField(null=True, blank=True)
+
+  class Meta:
+    db_table = 'sport_daily_rollup'
+    app_label = 'sport'
+    unique_together = (('user', 'date', 'sport', 'type'),)
+    index_together = (('user', 'date'),)
+
+  def __unicode__(self):
+    return u'%s : %s %s %s' % (self.user_id, self.date, self.sport_id, self.type)
+
+  @staticmethod
+  def list_sessions(user):
+    # Sessions counted in stats
+    sessions = SportSession.objects.filter(user=user)
+    return sessions.exclude(plan_session__status='failed')
+
+  @staticmethod
+  def session_keys(sessions):
+    '''
+    List the rollup keys (user, date, sport, type)
+    of a sessions queryset
+    '''
+    return set(sessions.values_list('user', 'date', 'sport', 'type'))
+
+  @classmethod
+  def active_days(cls, days):
+    # List the (user, date) having rollups
+    return set([(u, d) for u, d in days if cls.objects.filter(user=u, date=d).exists()])
+
+  @classmethod
+  def refresh(cls, keys):
+    '''
+    Recompute some rollups from their sessions
+    Empty ones are removed, and the differences
+    are applied on cached stats
+    '''
+    deltas = []
+    days = set([(k[0], k[1]) for k in keys])
+    with transaction.atomic():
+      days_before = cls.active_days(days)
+      for user_id, date, sport_id, type in keys:
+        key = {
+          'user_id' : user_id,
+          'date' : date,
+          'sport_id' : sport_id,
+          'type' : type,
+        }
+        previous = cls.objects.filter(**key).first() or cls(**key)
+        sessions = cls.list_sessions(user_id).filter(date=date, sport=sport_id, type=type)
+        totals = sessions.aggregate(**ROLLUP_AGGREGATES)
+        if totals['nb']:
+          cls.objects.update_or_create(defaults=totals, **key)
+        else:
+          cls.objects.filter(**key).delete()
+
+        deltas.append({
+          'user' : user_id,
+          'date' : date,
+          'sport' : sport_id,
+          'type' : type,
+          'nb' : totals['nb'] - previous.nb,
+          'distance' : _diff(totals['distance'], previous.distance),
+          'time' : _diff(totals['time'], previous.time),
+          'days' : 0,
+        })
+      days_after = cls.active_days(days)
+
+    # Count activity days changes only once
+    for d in deltas:
+      day = (d['user'], d['date'])
+      if day in days:
+        d['days'] = int(day in days_after) - int(day in days_before)
+        days.remove(day)
+
+    # Skip unchanged rollups
+    deltas = [d for d in deltas if d['nb'] or d['days'] or d['distance'] or d['time']]
+
+    # Obsolete the days summaries
+    SportDay.update_summaries(set([(k[0], k[1]) for k in keys]))
+
+    # Caches & tasks only see committed sessions
+    on_commit(lambda: cls.publish(keys, deltas))
+
+    return deltas
+
+  @classmethod
+  def publish(cls, keys, deltas):
+    '''
+    Apply committed rollups changes on cached stats,
+    leaderboards, summaries & data versions
+    then queue the dependent rebuilds
+    '''
+    apply_deltas(deltas)
+
+    # Log the days, including the ones left
+    # by moved & deleted sessions
+    cls.log_changes(set([(k[0], k[1]) for k in keys]))
+
+    # Update the clubs leaderboards
+    from club.leaderboard import Leaderboard
+    Leaderboard.apply_deltas(deltas)
+
+    # Obsolete the weeks summaries, and data versions
+    for user_id, date in set([(k[0], k[1]) for k in keys]):
+      WeekSummary.bump(user_id, date)
+    for user_id in set([k[0] for k in keys]):
+      DataVersion.bump(user_id)
+
+    # Rebuild the dashboards showing these sessions
+    refresh_dashboards.delay(list(set([k[0] for k in keys])))
+
+    # Training loads also use the notes,
+    # update them from the oldest changed day
+    for user_id in set([k[0] for k in keys]):
+      update_training_load.delay(user_id, min([k[1] for k in keys if k[0] == user_id]))
+
+  @staticmethod
+  def log_changes(days):
+    now = time.time()
+    pipe = get_redis().pipeline(transaction=False)
+    for user_id, date in days:
+      pipe.zadd(ROLLUP_CHANGES, now, '%d:%s' % (user_id, date.isoformat()))
+    pipe.execute()
+
+  @staticmethod
+  def list_changes(since):
+    '''
+    List the (user, date) of the rollups
+    changed after an aware datetime
+    '''
+    for member in get_redis().zrangebyscore(ROLLUP_CHANGES, '(%f' % _timestamp(since), '+inf'):
+      user_id, date = member.split(':')
+      yield int(user_id), datetime.strptime(date, '%Y-%m-%d').date()
+
+  @staticmethod
+  def purge_changes(until):
+    # Forget the changes already built
+    get_redis().zremrangebyscore(ROLLUP_CHANGES, '-inf', _timestamp(until))
+
+  @classmethod
+  def build_user(cls, user):
+    '''
+    Build all the rollups of a user,
+    without saving them
+    '''
+    rows = cls.list_sessions(user).values('date', 'sport', 'type')
+    rows = rows.annotate(**ROLLUP_AGGREGATES).order_by()
+    return [cls(user=user, date=r.pop('date'), sport_id=r.pop('sport'), **r) for r in rows]
+
+
+def session_rollup_before(sender, instance, raw=False, **kwargs):
+  '''
+  Keep the rollup keys of a session
+  before its update or deletion
+  '''
+  if raw or not instance.pk:
+    return
+  instance._rollup_keys = SportDailyRollup.session_keys(SportSession.objects.filter(pk=instance.pk))
+
+def session_rollup_after(sender, instance, raw=False, **kwargs):
+  '''
+  Refresh the previous & current rollups
+  of a saved or deleted session
+  '''
+  if raw:
+    return
+  keys = getattr(instance, '_rollup_keys', set())
+  if 'created' in kwargs: # only on save
+    keys.add((instance.user_id, instance.date, instance.sport_id, instance.type))
+  SportDailyRollup.refresh(keys)
+  instance._rollup_keys = set()
+
+# register the rollups signals
+pre_save.connect(session_rollup_before, sender=SportSession)
+post_save.connect(session_rollup_after, sender=SportSession)
+pre_delete.connect(session_rollup_before, sender=SportSession)
+post_delete.connect(session_rollup_after, sender=SportSession)
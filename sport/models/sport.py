@@ -5,6 +5,9 @@ from django.utils.translation import ugettext_lazy as _
 import vinaigrette
 from messages.models import Conversation
 from ..tasks import sync_session_gcal
+from django.db.models.signals import post_save, post_delete
+from friends.tasks import push_friends_feed
+from helpers import on_commit
 
 class Sport(models.Model):
   name = models.CharField(max_length=250)
@@ -40,6 +43,10 @@ vinaigrette.register(Sport, ['name', ])
 
 class SportSession(models.Model):
   day = models.ForeignKey('SportDay', related_name="sessions")
+
+  # Denormalized from day, for direct filters
+  user = models.ForeignKey('users.Athlete', related_name='sport_sessions')
+  date = models.DateField()
   sport = models.ForeignKey(Sport)
   name = models.CharField(max_length=255, null=True, blank=True)
   comment = models.TextField(_('session comment'), null=True, blank=True)
@@ -65,12 +72,20 @@ class SportSession(models.Model):
   class Meta:
     db_table = 'sport_session'
     app_label = 'sport'
+    index_together = (
+      ('user', 'date'),
+      ('type', 'date'),
+    )
 
   def save(self, *args, **kwargs):
     # No race category when we are not in race
     if self.type != 'race':
       self.race_category = None
 
+    # Always follow the day, even after a move
+    self.user_id = self.day.week.user_id
+    self.date = self.day.date
+
     # Only allow depth 1 sports
     if self.sport.depth != 1:
       raise Exception("Invalid sport '%s', only level 1 authorized for SportSession" % self.sport)
@@ -106,3 +121,31 @@ class SportSession(models.Model):
     self.save()
 
     return conversation
+
+
+def session_feed_push(sender, instance, raw=False, **kwargs):
+  '''
+  Add the saved or deleted session
+  on the friends timelines
+  '''
+  if raw:
+    return
+  user_id, session_id = instance.user_id, instance.pk # cleared after a delete
+  on_commit(lambda: push_friends_feed.delay(user_id, session_id))
+
+def session_inbox_update(sender, instance, raw=False, **kwargs):
+  '''
+  Add the saved session on
+  its athlete trainers inboxes
+  '''
+  from club.tasks import update_trainer_inbox
+  if raw:
+    return
+  on_commit(lambda: update_trainer_inbox.delay([instance.pk, ]))
+
+# register the friends feed signals
+post_save.connect(session_feed_push, sender=SportSession)
+post_delete.connect(session_feed_push, sender=SportSession)
+
+# register the trainers inbox signals
+post_save.connect(session_inbox_update, sender=SportSession)
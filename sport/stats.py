@@ -1,12 +1,42 @@
 from django.core.cache import cache
-from django.db.models import Count, Sum
 from django.utils.functional import cached_property
 import sport
 from calendar import monthrange
-from datetime import date
-from helpers import week_to_date
+from datetime import date, datetime, timedelta
+from helpers import week_to_date, date_to_day, date_to_week, get_redis
 import math
 
+def _timedelta_to_hours(td):
+  return td and math.ceil(td.total_seconds() / 3600) or 0
+
+def _add(a, b):
+  # Sum keeping None when no value is available
+  if a is None:
+    return b
+  if b is None:
+    return a
+  return a + b
+
+def _diff(a, b):
+  # Difference keeping None when no value is available
+  if b is None:
+    return a
+  if a is None:
+    return -b
+  return a - b
+
+# Lock duration on a stats entry, in seconds
+STATS_LOCK = 10
+
+# Redis set of the periods to rebuild
+STATS_DIRTY = 'stats:dirty'
+
+# Flag set while a rebuild task is scheduled
+STATS_SCHEDULED = 'stats:dirty:scheduled'
+
+# Coalescing window before rebuilding dirty periods, in seconds
+STATS_QUEUE_DELAY = 30
+
 class StatsCached(object):
   '''
   Stats built & cached for quick access
@@ -15,6 +45,7 @@ class StatsCached(object):
   prefix = None
   key = ''
   data = {}
+  refreshing = False # rebuild queued
 
   def __init__(self, user, prefix, preload=True):
     self.user = user
@@ -47,54 +78,38 @@ class StatsCached(object):
     # Save in cache, no expiry !
     cache.set(self.key, self.data, None)
 
+  @property
+  def dirty_key(self):
+    # Identify the period in the rebuild queue
+    return '%d:%s:%s' % (self.user.pk, self.period, self.start.isoformat())
+
+  @classmethod
+  def fetch_all(cls, stats, build=True):
+    '''
+    Load several stats with a single cache call
+    Missing ones are built together, lazily,
+    even when a rebuild is already queued
+    '''
+    data = cache.get_many([st.key for st in stats])
+    dirty = list_dirty(stats)
+    for st in stats:
+      st.data = data.get(st.key)
+      st.refreshing = st.dirty_key in dirty
+    missing = [st for st in stats if st.data is None]
+    if build and missing:
+      build_periods(missing)
+      for st in missing:
+        st.refreshing = False
+    return stats
+
   @cached_property
   def timestamp(self):
     # Used by flot js
     return int(self.start.strftime('%s'))
 
   def build(self):
-    def _timedelta_to_hours(td):
-      return td and math.ceil(td.total_seconds() / 3600) or 0
-
-    # Fetch all sessions in the month
-    filters = {
-      'day__week__user' : self.user,
-      'day__date__gte' : self.start,
-      'day__date__lte' : self.end,
-    }
-    sessions = sport.models.SportSession.objects.filter(**filters)
-    sessions = sessions.exclude(plan_session__status='failed')
-
-    # Get stats per types
-    types = sessions.values('type').annotate(nb=Count('type'))
-    types = dict((t['type'], t['nb']) for t in types)
-    types.update({u'total' : sessions.count()})
-
-    # Get stats per sports
-    sports = sessions.values('sport').annotate(nb=Count('sport'), distance=Sum('distance'), time=Sum('time'))
-    sports = dict((s['sport'], {
-      'distance' : s['distance'],
-      'time' : s['time'],
-      'hours' : _timedelta_to_hours(s['time']),
-      'nb' : s['nb'],
-    }) for s in sports)
-
-    # Total stats
-    total = sessions.aggregate(distance=Sum('distance'), time=Sum('time'))
-
-    # Join data
-    self.data = {
-      'sessions' : types,
-      'days' : len(sessions.values('day').distinct()), # total nb of days with sport
-      'distance' : total['distance'],
-      'time' : total['time'],
-      'hours' : _timedelta_to_hours(total['time']),
-      'sports' : sports,
-    }
-
-    # Save data
-    self.save()
-
+    # Build & save from the daily rollups
+    build_periods([self, ])
     return self.data
 
 
@@ -102,6 +117,7 @@ class StatsWeek(StatsCached):
   '''
   Represents a week of sport stats about a user
   '''
+  period = 'week'
   year = None
   week = None
 
@@ -125,6 +141,7 @@ class StatsMonth(StatsCached):
   '''
   Represents a month of sport stats about a user
   '''
+  period = 'month'
   year = None
   month = None
 
@@ -145,3 +162,253 @@ class StatsMonth(StatsCached):
     _, last_day = monthrange(self.year, self.month)
     return  date(self.year, self.month, last_day)
 
+
+
+class StatsAggregate(object):
+  '''
+  Accumulate grouped session rows
+  into a StatsCached payload
+  '''
+  def __init__(self):
+    self.types = {u'total' : 0}
+    self.sports = {}
+    self.days = set()
+    self.distance = None
+    self.time = None
+
+  def add(self, row):
+    self.types[row['type']] = self.types.get(row['type'], 0) + row['nb']
+    self.types[u'total'] += row['nb']
+    self.days.add(row['date'])
+    self.distance = _add(self.distance, row['distance'])
+    self.time = _add(self.time, row['time'])
+
+    sport = self.sports.setdefault(row['sport'], {
+      'distance' : None,
+      'time' : None,
+      'nb' : 0,
+    })
+    sport['distance'] = _add(sport['distance'], row['distance'])
+    sport['time'] = _add(sport['time'], row['time'])
+    sport['nb'] += row['nb']
+
+  def export(self):
+    for s in self.sports.values():
+      s['hours'] = _timedelta_to_hours(s['time'])
+    return {
+      'sessions' : self.types,
+      'days' : len(self.days),
+      'distance' : self.distance,
+      'time' : self.time,
+      'hours' : _timedelta_to_hours(self.time),
+      'sports' : self.sports,
+    }
+
+
+def list_periods(start, end):
+  '''
+  List the weeks (year, week) and months (year, month)
+  overlapping a dates range
+  '''
+  weeks = []
+  monday = date_to_day(start)
+  while monday <= end:
+    week, year = date_to_week(monday)
+    weeks.append((year, week))
+    monday += timedelta(days=7)
+
+  months = []
+  year, month = start.year, start.month
+  while (year, month) <= (end.year, end.month):
+    months.append((year, month))
+    year, month = month == 12 and (year + 1, 1) or (year, month + 1)
+
+  return weeks, months
+
+def list_stats(users, start, end):
+  '''
+  List all the weeks & months stats
+  of several users between two dates
+  '''
+  weeks, months = list_periods(start, end)
+  stats = []
+  for user in users:
+    stats += [StatsWeek(user, year, week, preload=False) for year, week in weeks]
+    stats += [StatsMonth(user, year, month, preload=False) for year, month in months]
+  return stats
+
+def build_stats(users, start, end):
+  '''
+  Build all the weeks & months stats
+  of several users between two dates
+  '''
+  return build_periods(list_stats(users, start, end))
+
+def build_periods(stats):
+  '''
+  Build several stats periods, from any users
+  Uses a single query on daily rollups
+  and save all the payloads at once
+  '''
+  if not stats:
+    return []
+  periods = dict(((st.user.pk, st.period, st.start), (st, StatsAggregate())) for st in stats)
+
+  # Query the full range of these periods
+  filters = {
+    'user__in' : set(st.user.pk for st in stats),
+    'date__gte' : min(st.start for st in stats),
+    'date__lte' : max(st.end for st in stats),
+  }
+  rollups = sport.models.SportDailyRollup.objects.filter(**filters)
+  rows = rollups.values('user', 'date', 'sport', 'type', 'nb', 'distance', 'time')
+
+  # Dispatch rows in their week & month
+  for row in rows:
+    user_id, day = row['user'], row['date']
+    for key in ((user_id, 'week', date_to_day(day)), (user_id, 'month', day.replace(day=1))):
+      if key in periods:
+        periods[key][1].add(row)
+
+  # Save everything in one call, no expiry !
+  for st, agg in periods.values():
+    st.data = agg.export()
+  cache.set_many(dict((st.key, st.data) for st in stats), None)
+
+  return stats
+
+
+def apply_delta(data, delta):
+  '''
+  Apply a rollup change on a stats payload
+  Returns False when the payload is inconsistent
+  '''
+  sessions = data['sessions']
+  sessions[delta['type']] = sessions.get(delta['type'], 0) + delta['nb']
+  sessions[u'total'] += delta['nb']
+  if sessions[delta['type']] < 0 or sessions[u'total'] < 0:
+    return False
+  if not sessions[delta['type']]:
+    del sessions[delta['type']]
+
+  data['days'] += delta['days']
+  data['distance'] = _add(data['distance'], delta['distance'])
+  data['time'] = _add(data['time'], delta['time'])
+  data['hours'] = _timedelta_to_hours(data['time'])
+
+  sport = data['sports'].setdefault(delta['sport'], {
+    'distance' : None,
+    'time' : None,
+    'nb' : 0,
+  })
+  sport['nb'] += delta['nb']
+  sport['distance'] = _add(sport['distance'], delta['distance'])
+  sport['time'] = _add(sport['time'], delta['time'])
+  sport['hours'] = _timedelta_to_hours(sport['time'])
+  if sport['nb'] < 0:
+    return False
+  if not sport['nb']:
+    del data['sports'][delta['sport']]
+
+  return data['days'] >= 0
+
+def apply_deltas(deltas):
+  '''
+  Apply rollups changes on the cached
+  weeks & months, instead of rebuilding them
+  Missing, locked or inconsistent entries are rebuilt
+  '''
+  from users.models import Athlete
+  if not deltas:
+    return []
+  users = Athlete.objects.in_bulk(set(d['user'] for d in deltas))
+
+  # List impacted periods
+  periods = {}
+  for d in deltas:
+    week, year = date_to_week(d['date'])
+    for st in (StatsWeek(users[d['user']], year, week, preload=False), StatsMonth(users[d['user']], d['date'].year, d['date'].month, preload=False)):
+      periods.setdefault(st.key, (st, []))[1].append(d)
+
+  # Lock entries during update
+  locked = [key for key in periods if cache.add('%s:lock' % key, True, STATS_LOCK)]
+  try:
+    data = cache.get_many(locked)
+    updated, rebuild = {}, []
+    for key, (st, changes) in periods.items():
+      st.data = data.get(key)
+      if st.data is not None and all([apply_delta(st.data, d) for d in changes]):
+        updated[key] = st.data
+      else:
+        rebuild.append(st)
+
+    # Save all updates, no expiry !
+    if updated:
+      cache.set_many(updated, None)
+  finally:
+    cache.delete_many(['%s:lock' % key for key in locked])
+
+  mark_dirty(rebuild)
+  return rebuild
+
+def mark_dirty(stats):
+  '''
+  Queue some stats periods for a background rebuild
+  Duplicates are coalesced in a Redis set, and
+  a single task is scheduled per time window
+  '''
+  from sport.tasks import rebuild_stats
+  if not stats:
+    return
+  r = get_redis()
+  r.sadd(STATS_DIRTY, *[st.dirty_key for st in stats])
+  if r.set(STATS_SCHEDULED, 1, nx=True, ex=STATS_QUEUE_DELAY * 10):
+    rebuild_stats.apply_async(countdown=STATS_QUEUE_DELAY)
+
+def list_dirty(stats):
+  '''
+  List the queued periods among some stats
+  '''
+  if not stats:
+    return set()
+  pipe = get_redis().pipeline(transaction=False)
+  for st in stats:
+    pipe.sismember(STATS_DIRTY, st.dirty_key)
+  return set([st.dirty_key for st, dirty in zip(stats, pipe.execute()) if dirty])
+
+def rebuild_dirty():
+  '''
+  Rebuild all the queued stats periods,
+  with one bulk build per user
+  '''
+  from users.models import Athlete
+
+  # Pop all the dirty periods at once
+  r = get_redis()
+  r.delete(STATS_SCHEDULED)
+  pipe = r.pipeline()
+  pipe.smembers(STATS_DIRTY)
+  pipe.delete(STATS_DIRTY)
+  members, _ = pipe.execute()
+
+  periods = {}
+  for m in members:
+    user_id, period, start = m.split(':')
+    periods.setdefault(int(user_id), []).append((period, datetime.strptime(start, '%Y-%m-%d').date()))
+
+  stats = []
+  for user_id, user in Athlete.objects.in_bulk(periods.keys()).items():
+    user_stats = []
+    for period, start in periods[user_id]:
+      if period == 'week':
+        week, year = date_to_week(start)
+        user_stats.append(StatsWeek(user, year, week, preload=False))
+      else:
+        user_stats.append(StatsMonth(user, start.year, start.month, preload=False))
+    stats += build_periods(user_stats)
+
+  # Dashboards skipped the snapshots of dirty weeks
+  from sport.dashboard import Dashboard
+  Dashboard.schedule(periods.keys())
+
+  return stats
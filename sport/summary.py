@@ -0,0 +1,277 @@
+from django.core.cache import cache
+from helpers import date_to_day, get_version, bump_version
+from sport.stats import _add
+from datetime import date, timedelta
+import json
+
+# Cache duration of a week summary, in seconds
+SUMMARY_CACHE = 30 * 24 * 3600
+
+# Sessions values read for a day summary
+DAY_SUMMARY_VALUES = ('id', 'sport', 'type', 'name', 'distance', 'time', 'track__id', 'comments_public', 'comments_private', 'plan_session__status', 'plan_session__plan_session__name')
+
+
+def day_summary(rows):
+  '''
+  Columns of a day summary, from the
+  DAY_SUMMARY_VALUES of its sessions
+  '''
+  sessions = []
+  distance, total_time = None, None
+  for r in rows:
+    sessions.append({
+      'id' : r['id'],
+      'sport' : r['sport'],
+      'type' : r['type'],
+      'name' : r['name'] or r['plan_session__plan_session__name'],
+      'plan' : r['plan_session__status'],
+      'track' : r['track__id'] is not None,
+    })
+
+    # Failed plan sessions are not counted
+    if r['plan_session__status'] != 'failed':
+      distance = _add(distance, r['distance'])
+      total_time = _add(total_time, r['time'])
+
+  types = set([s['type'] for s in sessions])
+  return {
+    'summary_nb' : len(sessions),
+    'summary_type' : ([t for t in ('race', 'training', 'rest') if t in types] + [None])[0],
+    'summary_distance' : distance,
+    'summary_time' : total_time,
+    'summary_track' : any([s['track'] for s in sessions]),
+    'summary_comments' : any([r['comments_public'] or r['comments_private'] for r in rows]),
+    'summary_sessions' : json.dumps(sessions),
+  }
+
+
+class WeekSummary(object):
+  '''
+  Everything displayed about a week, built in a
+  single pass over its sessions: per-day sessions,
+  per-sport totals, comments & tracks flags
+  Stored in cache with a version, bumped on changes
+  '''
+  def __init__(self, week):
+    self.week = week
+    self.start = week.get_date_start()
+
+  @staticmethod
+  def base_key(user_id, start):
+    return 'week:summary:%d:%s' % (user_id, start.isoformat())
+
+  @classmethod
+  def version_key(cls, user_id, start):
+    return '%s:version' % cls.base_key(user_id, start)
+
+  @classmethod
+  def bump(cls, user_id, day):
+    # Obsolete the summary of the week containing a day
+    bump_version(cls.version_key(user_id, date_to_day(day)))
+
+  @property
+  def version(self):
+    return get_version(self.version_key(self.week.user_id, self.start))
+
+  def get(self):
+    '''
+    Load the current version, or build it
+    Sports are attached at every load, to
+    keep their names translated
+    '''
+    from sport.models import Sport
+    version = self.version
+    key = '%s:v%d' % (self.base_key(self.week.user_id, self.start), version)
+    data = cache.get(key)
+    if data is None:
+      data = self.build()
+      data['version'] = version
+      cache.set(key, data, SUMMARY_CACHE)
+
+    sports = Sport.objects.in_bulk(data['sports_ids'])
+    for day in data['days']:
+      for s in day['sessions']:
+        s['sport'] = sports[s['sport_id']]
+      day['sports'] = [(sports[pk], nb) for pk, nb in day['sports_count']]
+    for stat in data['sports']:
+      stat['sport'] = stat['sport_id'] and sports[stat['sport_id']] or None
+
+    return data
+
+  def build(self):
+    from sport.models import SportSession
+
+    sessions = SportSession.objects.filter(day__week=self.week).order_by('created')
+    sessions = sessions.select_related('day', 'track', 'track__split_total', 'plan_session__plan_session__plan')
+
+    days = dict((d, {'date' : d, 'sessions' : [], 'sports_count' : [], 'comments' : False, 'tracks' : False}) for d in self.week.get_dates())
+    sports = {}
+    for s in sessions:
+      day = days[s.day.date]
+      track = getattr(s, 'track', None)
+      psa = getattr(s, 'plan_session', None)
+      day['sessions'].append({
+        'id' : s.pk,
+        'name' : s.name,
+        'comment' : s.comment,
+        'type' : s.type,
+        'note' : s.note,
+        'time' : s.time,
+        'distance' : s.distance,
+        'elevation_gain' : s.elevation_gain,
+        'sport_id' : s.sport_id,
+        'comments' : bool(s.comments_public_id or s.comments_private_id),
+        'track' : track and {
+          'thumb' : track.thumb and {'url' : track.thumb.url} or None,
+          'split_total' : track.split_total and {
+            'elevation_gain' : track.split_total.elevation_gain,
+            'speed' : track.split_total.speed,
+          } or None,
+        } or None,
+        'plan_session' : psa and {
+          'status' : psa.status,
+          'plan' : {
+            'id' : psa.plan_session.plan_id,
+            'name' : psa.plan_session.plan.name,
+          },
+        } or None,
+      })
+      day['comments'] = day['comments'] or day['sessions'][-1]['comments']
+      day['tracks'] = day['tracks'] or track is not None
+
+      # Failed plan sessions are not counted
+      if psa and psa.status == 'failed':
+        continue
+      stat = sports.setdefault(s.sport_id, {
+        'sport_id' : s.sport_id,
+        'time' : 0.0,
+        'distance' : 0.0,
+        'elevation' : 0.0,
+        'sessions' : 0,
+      })
+      stat['time'] += s.time and s.time.total_seconds() or 0.0
+      stat['distance'] += s.distance or 0.0
+      stat['elevation'] += s.elevation_gain or 0.0
+      stat['sessions'] += 1
+
+    # Sports used per day
+    for day in days.values():
+      counts = {}
+      for s in day['sessions']:
+        counts[s['sport_id']] = counts.get(s['sport_id'], 0) + 1
+      day['sports_count'] = sorted(counts.items(), key=lambda c: c[1])
+
+    # Add total
+    stats = sports.values()
+    stats.append({
+      'sport_id' : None, # Total
+      'time' : sum([s['time'] for s in stats]),
+      'distance' : sum([s['distance'] for s in stats]),
+      'elevation' : sum([s['elevation'] for s in stats]),
+      'sessions' : sum([s['sessions'] for s in stats]),
+    })
+
+    return {
+      'week' : self.week.pk,
+      'days' : [days[d] for d in self.week.get_dates()],
+      'sports' : stats,
+      'sports_ids' : set([s['sport_id'] for d in days.values() for s in d['sessions']]),
+      'has_sessions' : bool(sports) or any([d['sessions'] for d in days.values()]),
+    }
+
+# Codes of the days types in a year summary,
+# by display priority
+YEAR_TYPES = (
+  ('race', 'r'),
+  ('training', 't'),
+  ('rest', 'x'),
+)
+
+# Code of a day without sessions
+YEAR_EMPTY = '.'
+
+
+class YearSummary(object):
+  '''
+  Compact year of an athlete: one value per
+  day in flat arrays (type codes, sessions,
+  load in minutes, distance, main sport),
+  built from the daily rollups in one query
+  Cached per data version, so never stale
+  '''
+  def __init__(self, user, year):
+    self.user = user
+    self.year = year
+    self.start = date(year, 1, 1)
+    self.end = date(year, 12, 31)
+
+  @staticmethod
+  def key(user_id, year, version):
+    return 'year:summary:%d:%d:%s' % (user_id, year, version.strftime('%s%f'))
+
+  def get(self):
+    '''
+    Load the current version, or build it
+    '''
+    from sport.version import DataVersion
+    key = self.key(self.user.pk, self.year, DataVersion(self.user.pk).value)
+    data = cache.get(key)
+    if data is None:
+      data = self.build()
+      cache.set(key, data, SUMMARY_CACHE)
+    return data
+
+  def build(self):
+    from sport.models import SportDailyRollup
+
+    nb_days = (self.end - self.start).days + 1
+    types = [YEAR_EMPTY] * nb_days
+    nb = [0] * nb_days
+    load = [0] * nb_days
+    distance = [0.0] * nb_days
+    sports = [0] * nb_days
+    sports_time = [-1] * nb_days
+    priority = dict((t, i) for i, (t, _) in enumerate(YEAR_TYPES))
+    codes = dict(YEAR_TYPES)
+
+    rollups = SportDailyRollup.objects.filter(user=self.user, date__gte=self.start, date__lte=self.end)
+    rollups = rollups.values_list('date', 'type', 'sport', 'nb', 'time', 'distance')
+    for day, type, sport_id, nb_sessions, time, dist in rollups:
+      i = (day - self.start).days
+      if types[i] == YEAR_EMPTY or priority[type] < priority[types[i]]:
+        types[i] = type
+      seconds = time and time.total_seconds() or 0
+      nb[i] += nb_sessions
+      load[i] += seconds
+      distance[i] += dist or 0.0
+
+      # Main sport has the longest time
+      if seconds > sports_time[i]:
+        sports[i], sports_time[i] = sport_id, seconds
+
+    return {
+      'year' : self.year,
+      'start' : self.start,
+      'types' : ''.join([codes.get(t, t) for t in types]),
+      'nb' : nb,
+      'load' : [int(round(l / 60.0)) for l in load],
+      'distance' : [round(d, 1) for d in distance],
+      'sports' : sports,
+      'sports_ids' : sorted(set([s for s in sports if s])),
+    }
+
+  @staticmethod
+  def list_days(data):
+    '''
+    Iterate over the days of a summary
+    '''
+    types = dict((c, t) for t, c in YEAR_TYPES)
+    for i, code in enumerate(data['types']):
+      yield {
+        'date' : data['start'] + timedelta(days=i),
+        'type' : types.get(code),
+        'nb' : data['nb'][i],
+        'load' : data['load'][i],
+        'distance' : data['distance'][i],
+        'sport_id' : data['sports'][i],
+      }
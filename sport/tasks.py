@@ -35,6 +35,23 @@ def publish_report(report, membership, uri):
   '''
   report.publish(membership, uri)
 
+@shared_task
+def rebuild_stats():
+  '''
+  Rebuild the stats periods queued as dirty
+  '''
+  from sport.stats import rebuild_dirty
+  return len(rebuild_dirty())
+
+@shared_task
+def update_training_load(user_id, start=None):
+  '''
+  Recompute the training load of an athlete,
+  from the oldest updated day
+  '''
+  from sport.models import TrainingLoad
+  TrainingLoad.update_user(user_id, start)
+
 @shared_task
 def sync_session_gcal(session, delete=False):
   '''
@@ -66,9 +83,9 @@ def sync_gcal(user):
   from sport.gcal import GCalSync
   from sport.models import SportSession
 
-  sessions = SportSession.objects.filter(day__week__user=user)
+  sessions = SportSession.objects.filter(user=user)
   sessions = sessions.filter(gcal_id__isnull=True)
-  sessions = sessions.order_by('-day__date')
+  sessions = sessions.order_by('-date')
 
   gc = GCalSync(user)
   for s in sessions:
@@ -91,7 +108,7 @@ def race_mail(*args, **kwargs):
 
   # Load tommorow's race
   tmrw = date.today() + timedelta(days=1)
-  races = SportSession.objects.filter(day__date=tmrw, type='race')
+  races = SportSession.objects.filter(date=tmrw, type='race')
 
   # Build and Send all mails
   for race in races:
@@ -105,3 +122,36 @@ def race_mail(*args, **kwargs):
     builder.to = [user.email, ]
     mail = builder.build(data)
     mail.send()
+
+@shared_task
+def build_dashboard(user_id):
+  '''
+  Rebuild the dashboards snapshots of a user
+  '''
+  from django.core.cache import cache
+  from sport.dashboard import Dashboard
+  from users.models import Athlete
+
+  # Later changes need a new build
+  cache.delete(Dashboard.pending_key(user_id))
+
+  user = Athlete.objects.get(pk=user_id)
+  Dashboard(user, 'athlete').save()
+  if user.is_trainer:
+    Dashboard(user, 'trainer').save()
+
+@shared_task
+def refresh_dashboards(user_ids):
+  '''
+  Schedule the rebuild of the dashboards
+  displaying some users sessions:
+  their own, their friends & trainers ones
+  '''
+  from sport.dashboard import Dashboard
+  from users.models import Athlete
+  from club.models import ClubMembership
+
+  users = set(user_ids)
+  users.update(Athlete.objects.filter(friends__in=user_ids).values_list('pk', flat=True))
+  users.update(ClubMembership.objects.filter(user__in=user_ids).values_list('trainers', flat=True))
+  Dashboard.schedule([u for u in users if u])
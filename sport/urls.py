@@ -40,6 +40,7 @@ urlpatterns = patterns('',
   url(r'^calendar/(?P<year>\d{4})/?$', login_required(RunCalendarYear.as_view()), name="report-year"),
 
   # Export a month
+  url(r'^export/?$', login_required(ExportSessions.as_view()), name="export-range"),
   url(r'^export/(?P<year>\d{4})/(?P<month>\d{1,2})/?$', login_required(ExportMonth.as_view()), name="export-month"),
 
   # Vma
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from datetime import datetime
+from hashlib import md5
+import time
+
+
+class DataVersion(object):
+  '''
+  Version of all the sport data of a user,
+  changed on every sessions, days, weeks,
+  comments & tracks update
+  Used to answer conditional requests
+  Other users versions & any extra context
+  (viewer, privacy) can be part of the etag
+  '''
+  def __init__(self, user_id, others=(), extra=''):
+    self.user_id = user_id
+    self.others = [pk for pk in set(others) if pk != user_id]
+    self.extra = extra
+
+  @staticmethod
+  def key(user_id):
+    return 'data:version:%d' % user_id
+
+  @classmethod
+  def bump(cls, user_id):
+    cache.set(cls.key(user_id), datetime.now(), None)
+
+  @cached_property
+  def values(self):
+    # Init unknown versions, once
+    keys = dict((self.key(pk), pk) for pk in [self.user_id] + self.others)
+    values = cache.get_many(keys.keys())
+    for key in keys:
+      if values.get(key) is None:
+        cache.add(key, datetime.now(), None)
+        values[key] = cache.get(key) or datetime.now()
+    return dict((keys[k], v) for k, v in values.items())
+
+  @property
+  def value(self):
+    # Most recent change
+    return max(self.values.values())
+
+  @property
+  def etag(self):
+    parts = ['%d:%s' % (pk, v.strftime('%s%f')) for pk, v in sorted(self.values.items())]
+    parts.append(self.extra)
+    return quote_etag('%d-%s' % (self.user_id, md5('|'.join(parts)).hexdigest()))
+
+  @property
+  def last_modified(self):
+    return http_date(time.mktime(self.value.timetuple()))
+
+  def match(self, request):
+    '''
+    Check the client already has this version
+    The etag is preferred when both are sent
+    '''
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+      return self.etag in [e.strip() for e in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+    # Dates can't identify the extra context
+    if self.extra:
+      return False
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and if_modified_since >= int(time.mktime(self.value.timetuple()))
+
+  def set_headers(self, response):
+    # Clients must always revalidate
+    response['ETag'] = self.etag
+    response['Last-Modified'] = self.last_modified
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
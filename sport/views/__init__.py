@@ -1,5 +1,5 @@
 from vma import VmaGlossary, VmaPaces
-from month import RunCalendar, ExportMonth
+from month import RunCalendar, ExportSessions, ExportMonth
 from day import RunCalendarDay, RunCalendarDayDelete
 from report import WeeklyReport, WeekPublish
 from year import RunCalendarYear
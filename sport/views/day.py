@@ -1,12 +1,14 @@
-from sport.models import SportSession, SportWeek
+from sport.models import SportWeek
 from coach.mixins import JsonResponseMixin, JSON_OPTION_NO_HTML, JSON_OPTION_BODY_RELOAD
-from users.models import Athlete
 from .mixins import SportSessionForms
 from django.views.generic import DateDetailView
 from django.views.generic.edit import DeleteView
 from mixins import CalendarDay
 from datetime import datetime, date, timedelta
 from helpers import date_to_week, check_task
+from friends.feed import FriendsFeed
+from tracks.group import list_companions
+from collections import OrderedDict
 
 class RunCalendarDay(SportSessionForms, CalendarDay, DateDetailView):
   template_name = 'sport/day/edit.html'
@@ -36,15 +38,20 @@ class RunCalendarDay(SportSessionForms, CalendarDay, DateDetailView):
     friends = []
     user = self.get_user()
     if user == self.request.user:
-      friends = SportSession.objects.filter(day__date=self.day, day__week__user__in=user.friends.all())
-      friends = friends.prefetch_related('day', 'day__week', 'sport', 'day__week__user', 'track')
-      friends = friends.order_by('day__week__user__first_name')
+      friends = FriendsFeed(user.pk).list_sessions(self.day, self.day)
+      friends = sorted(friends, key=lambda s: s.user.first_name)
     context['friends_sessions'] = friends
 
-    # Friends short list
+    # Friends short list, last updated first
     if friends:
-      friend_ids = set(friends.values_list('day__week__user', flat=True).order_by('-updated'))
-      context['friends_shortlist'] = Athlete.objects.filter(pk__in=friend_ids)
+      updated = sorted(friends, key=lambda s: s.updated, reverse=True)
+      context['friends_shortlist'] = OrderedDict([(s.user.pk, s.user) for s in updated]).values()
+
+    # Companions of the day tracks, visible to the visitor
+    context['companions'] = {}
+    if self.object.pk:
+      tracks = [s.track for s in self.object.sessions.filter(track__isnull=False).select_related('track')]
+      context['companions'] = list_companions(tracks, self.request.user)
 
     # Check task on week
     check_task(week)
@@ -59,8 +66,7 @@ class RunCalendarDayDelete(CalendarDay, JsonResponseMixin, DeleteView, DateDetai
     Delete day, then reload
     '''
     self.get_object()
-    self.object.delete()
-    self.object.rebuild_cache()
+    self.object.delete() # stats are updated through rollups
 
     # Configure output to reload page
     self.json_options = [JSON_OPTION_NO_HTML, JSON_OPTION_BODY_RELOAD]
@@ -1,10 +1,62 @@
 from datetime import timedelta, date
-from django.http import Http404
+from django.contrib import messages
+from django.http import Http404, HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.utils import translation
 from coach.mixins import LoginRequired
 from helpers import week_to_date, date_to_day, date_to_week
 from sport.models import SportWeek, SportDay, SportSession, SESSION_TYPES, RaceCategory
 from sport.forms import SportSessionForm
 from django.db.models import Sum, Count
+from sport.version import DataVersion
+from sport.bounds import CalendarBounds
+
+class DataVersionMixin(object):
+  '''
+  Answer 304 when the calendar user data did not
+  change since the last visit of this viewer
+  The whole page is in the etag: menu, notifications
+  & csrf token of base.html are part of it
+  '''
+  def get_version_others(self):
+    # Other users displayed on the page
+    return []
+
+  def get_data_version(self):
+    from coach.menu import menu_version
+    from users.notification import UserNotifications
+    viewer = self.request.user.is_authenticated() and self.request.user.pk or 0
+    extra = (
+      self.request.get_full_path(),
+      viewer,
+      ','.join(sorted(getattr(self, 'privacy', []))),
+      translation.get_language(),
+      date.today().isoformat(),
+      get_token(self.request),
+    )
+    if viewer:
+      extra += (
+        menu_version(viewer),
+        UserNotifications(self.request.user).total(),
+      )
+    return DataVersion(self.get_user().pk, self.get_version_others(), ':'.join(map(unicode, extra)))
+
+  def dispatch(self, request, *args, **kwargs):
+    if request.method != 'GET':
+      return super(DataVersionMixin, self).dispatch(request, *args, **kwargs)
+
+    # Flash messages are only displayed once
+    if len(messages.get_messages(request)):
+      return super(DataVersionMixin, self).dispatch(request, *args, **kwargs)
+
+    version = self.get_data_version()
+    if version.match(request):
+      return version.set_headers(HttpResponseNotModified())
+
+    response = super(DataVersionMixin, self).dispatch(request, *args, **kwargs)
+    if response.status_code != 200:
+      return response
+    return version.set_headers(response)
 
 class CurrentWeekMixin(LoginRequired):
   '''
@@ -44,10 +96,9 @@ class CurrentWeekMixin(LoginRequired):
   def check_limits(self, check=True):
     # Min date is oldest user sport week
     # or first day of current year by default
-    olds = SportDay.objects.filter(week__user=self.get_user()).order_by('date')
-    if olds.exists():
-      oldest = olds.first()
-      self.min_date = oldest.week.get_date_start()
+    bounds = CalendarBounds(self.get_user().pk).get()
+    if bounds['first']:
+      self.min_date = date_to_day(bounds['first'])
     else:
       self.min_date = date(self._today.year, 1, 1)
 
@@ -218,7 +269,7 @@ class CalendarSession(CalendarDay):
 
     # Init a session
     if session_id:
-      self.session = SportSession.objects.get(pk=session_id, day__week__user=self.request.user)
+      self.session = SportSession.objects.get(pk=session_id, user=self.request.user)
     else:
       if not self.object.pk:
         self.object.save() # need a pk to attribute
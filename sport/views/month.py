@@ -1,14 +1,16 @@
 from django.views.generic import MonthArchiveView, View
 from django.views.generic.dates import MonthMixin, YearMixin
 from django.http import Http404
-from django.db.models import Count
 from sport.models import SportSession, SportDay
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import calendar
 import collections
 from coach.mixins import CsvResponseMixin
+from django.utils.translation import ugettext as _
+from mixins import DataVersionMixin
+from friends.feed import FriendsFeed
 
-class RunCalendar(MonthArchiveView):
+class RunCalendar(DataVersionMixin, MonthArchiveView):
   template_name = 'sport/calendar/month.html'
   date_field = 'date'
   model = SportDay
@@ -27,6 +29,13 @@ class RunCalendar(MonthArchiveView):
   def get_user(self):
     return self.request.user
 
+  def get_version_others(self):
+    # Friends sessions are counted on own calendar
+    user = self.get_user()
+    if user != self.request.user:
+      return []
+    return user.friends.values_list('pk', flat=True)
+
   def get_links(self):
     return {
       'pageargs' : [],
@@ -53,17 +62,14 @@ class RunCalendar(MonthArchiveView):
     # Load all sessions for this month
     user = self.get_user()
     sessions = SportDay.objects.filter(week__user=user, date__in=self.days)
-    sessions = sessions.prefetch_related('sessions', 'sessions__sport', 'sessions__track', 'week')
-    sessions = sessions.prefetch_related('sessions__plan_session', 'sessions__plan_session__plan_session')
+    sessions = SportDay.load_summaries(sessions)
     sessions_per_days = dict((r.date, r) for r in sessions)
     sessions_per_days = collections.OrderedDict(sorted(sessions_per_days.items()))
 
     # Loadd all friends sessions for this month
     friends = None
     if user == self.request.user:
-      friends = SportSession.objects.filter(day__week__user__in=user.friends.all(), day__date__in=self.days)
-      friends = friends.values('day__date').annotate(nb=Count('day__date'))
-      friends = dict((f['day__date'], f['nb']) for f in friends)
+      friends = FriendsFeed(user.pk).count_days(self.days[0], self.days[-1])
 
     context = {
       'today' : date.today(),
@@ -75,50 +81,94 @@ class RunCalendar(MonthArchiveView):
     context.update(self.get_links())
     return (self.days, sessions_per_days, context)
 
-class ExportMonth(CsvResponseMixin, MonthMixin, YearMixin, View):
+class ExportSessions(CsvResponseMixin, View):
   '''
-  Export a month sessions, in CSV format
+  Export the sessions of any dates range, in CSV format
+  Streamed from a single ordered query
   '''
+  day_format = '%A %d %B %Y'
+  empty_days = True # list days without sessions
+  with_users = False # add an athlete column
+
   def get_user(self):
     return self.request.user
 
+  def get_users(self):
+    return [self.get_user(), ]
+
+  def get_dates(self):
+    try:
+      start = datetime.strptime(self.request.GET['start'], '%Y-%m-%d').date()
+      end = datetime.strptime(self.request.GET['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+      raise Http404('Invalid export dates.')
+    if start > end:
+      raise Http404('Invalid export dates.')
+    return start, end
+
+  def get_filename(self, start, end):
+    return '%s_%s_%s' % (self.get_user().username, start, end)
+
+  def get_headers(self, tracks=False):
+    headers = [_('Date'), _('Type'), _('Name'), _('Comment'), _('Distance'), _('Time')]
+    if self.with_users:
+      headers = [_('Athlete'), ] + headers
+    if tracks:
+      headers += [_('Elevation gain'), _('Elevation loss'), _('Average speed'), _('Energy')]
+    return headers
+
+  def list_rows(self, start, end, tracks=False):
+    '''
+    Iterate over the sessions as csv lines,
+    adding empty days between them
+    '''
+    fields = ['date', 'type', 'name', 'comment', 'distance', 'time']
+    if self.with_users:
+      fields = ['user__username', ] + fields
+    if tracks:
+      fields += ['track__split_total__elevation_gain', 'track__split_total__elevation_loss', 'track__split_total__speed', 'track__split_total__energy']
+    sessions = SportSession.objects.filter(user__in=self.get_users(), date__gte=start, date__lte=end)
+    sessions = sessions.order_by('date', 'user__username', 'created')
+    position = self.with_users and 1 or 0
+
+    day = start
+    for row in sessions.values_list(*fields).iterator():
+      row = list(row)
+      session_day = row[position]
+      while self.empty_days and day < session_day:
+        yield [day.strftime(self.day_format), ]
+        day += timedelta(days=1)
+      row[position] = session_day.strftime(self.day_format)
+      yield row
+      day = session_day + timedelta(days=1)
+
+    while self.empty_days and day <= end:
+      yield [day.strftime(self.day_format), ]
+      day += timedelta(days=1)
+
   def get(self, *args, **kwargs):
-    # Get year and month
+    start, end = self.get_dates()
+    tracks = 'tracks' in self.request.GET
+    context = {
+      'csv_filename' : self.get_filename(start, end),
+      'csv_headers' : self.get_headers(tracks),
+      'csv_data' : self.list_rows(start, end, tracks),
+      'csv_stream' : True,
+    }
+    return self.render_to_response(context)
+
+class ExportMonth(MonthMixin, YearMixin, ExportSessions):
+  '''
+  Export a month sessions, in CSV format
+  '''
+  def get_dates(self):
     month = int(self.get_month())
     year = int(self.get_year())
-
-    # Load calendar
     try:
-      cal = calendar.Calendar(calendar.MONDAY)
-      days = [d for d in cal.itermonthdates(year, month) if d.month == month]
+      _, nb_days = calendar.monthrange(year, month)
     except:
       raise Http404('Invalid export date.')
+    return date(year, month, 1), date(year, month, nb_days)
 
-    # Load sessions
-    day_format = '%A %d %B %Y'
-    data = []
-    sessions = SportSession.objects.filter(day__week__user=self.get_user(), day__date__in=days)
-    for day in days:
-      day_sessions = sessions.filter(day__date=day)
-      if day_sessions.count() > 0:
-
-        # Serialize every session as a list, for csv render
-        for session in day_sessions.all():
-          data.append([
-            day.strftime(day_format),
-            session.type,
-            session.name and session.name.encode('utf-8') or '',
-            session.comment and session.comment.encode('utf-8') or '',
-            session.distance,
-            session.time,
-          ])
-      else:
-        # Just display empty day
-        data.append([ day.strftime(day_format), ])
-
-    # Build csv lines
-    context = {
-      'csv_filename' : '%s_%d_%d' % (self.request.user.username, year, month),
-      'csv_data' : data,
-    }
-    return self.render_to_response(context)
+  def get_filename(self, start, end):
+    return '%s_%d_%d' % (self.request.user.username, start.year, start.month)
@@ -2,7 +2,7 @@ from django.views.generic import FormView, DetailView
 from django.http import HttpResponseRedirect
 from sport.tasks import publish_report
 from sport.forms import SportWeekPublish
-from mixins import CurrentWeekMixin, WeekPaginator
+from mixins import CurrentWeekMixin, WeekPaginator, DataVersionMixin
 from coach.mixins import JsonResponseMixin, JSON_OPTION_CLOSE, JSON_OPTION_NO_HTML, JSON_OPTION_BODY_RELOAD, JSON_OPTION_ONLY_AJAX, JSON_OPTION_REDIRECT_SKIP
 
 class WeekPublish(JsonResponseMixin, CurrentWeekMixin, FormView):
@@ -47,5 +47,11 @@ class WeekPublish(JsonResponseMixin, CurrentWeekMixin, FormView):
     self.json_options = [JSON_OPTION_REDIRECT_SKIP, ]
     return HttpResponseRedirect(report.get_absolute_url())
 
-class WeeklyReport(CurrentWeekMixin, WeekPaginator, DetailView):
+class WeeklyReport(CurrentWeekMixin, DataVersionMixin, WeekPaginator, DetailView):
   template_name = 'sport/week/edit.html'
+
+  def get_context_data(self, *args, **kwargs):
+    # Load the cached summary of the week
+    context = super(WeeklyReport, self).get_context_data(*args, **kwargs)
+    context['summary'] = self.object.get_summary()
+    return context
@@ -4,6 +4,7 @@ from sport.forms import SportSessionForm
 from coach.mixins import JsonResponseMixin, JSON_OPTION_BODY_RELOAD, JSON_OPTION_NO_HTML
 from mixins import CalendarSession
 from django.core.urlresolvers import reverse
+from tracks.group import list_companions
 from datetime import datetime
 
 class SportSessionView(CalendarSession, JsonResponseMixin, ModelFormMixin, ProcessFormView, DateDetailView):
@@ -35,6 +36,12 @@ class SportSessionView(CalendarSession, JsonResponseMixin, ModelFormMixin, Proce
     if extra:
       context.update(extra)
 
+    # Companions of the session track
+    session = context['session']
+    context['companions'] = {}
+    if session.pk and hasattr(session, 'track'):
+      context['companions'] = list_companions([session.track, ], self.request.user)
+
     # Modal from form ?
     context['modal'] = 'modal' in self.request.POST
 
@@ -57,10 +64,7 @@ class SportSessionView(CalendarSession, JsonResponseMixin, ModelFormMixin, Proce
     if not self.object.pk:
       self.object.save()
     session.day = self.object
-    session.save()
-
-    # Invalidate day cache
-    self.object.rebuild_cache()
+    session.save() # stats are updated through rollups
 
     # Render as saved
     extras = {
@@ -80,8 +84,7 @@ class SportSessionDelete(CalendarSession, JsonResponseMixin, DeleteView, DateDet
     Delete session, then reload
     '''
     self.get_object()
-    self.session.delete()
-    self.object.rebuild_cache()
+    self.session.delete() # stats are updated through rollups
 
     # Configure output to reload page
     self.json_options = [JSON_OPTION_NO_HTML, JSON_OPTION_BODY_RELOAD]
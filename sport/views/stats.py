@@ -2,8 +2,8 @@ from django.views.generic import TemplateView
 from datetime import date, timedelta
 from sport.stats import StatsMonth
 from calendar import monthrange
-from sport.models import Sport, SportDay
-from django.db.models import Min
+from sport.models import Sport, TrainingLoad
+from sport.bounds import CalendarBounds
 from django.http import Http404
 
 class SportStatsMixin(object):
@@ -21,14 +21,17 @@ class SportStatsMixin(object):
     except AttributeError, e:
       user = self.request.user
 
-    # List available years
-    limits = SportDay.objects.filter(week__user=user).aggregate(min=Min('date'))
-    years = limits['min'] and reversed(range(limits['min'].year, today.year+1)) or (today.year+1,)
+    # List active years, from cached bounds
+    bounds = CalendarBounds(user.pk).get()
+    years = sorted(set(bounds['years'] + [today.year, ]), reverse=True)
 
     year_delta = timedelta(days=365)
     if 'year' in args:
       # Full Year
-      year = int(args['year'])
+      try:
+        year = int(args['year'])
+      except ValueError:
+        raise Http404('Invalid year %s' % args['year'])
       start = date(year=year, month=1, day=1)
       end = start + year_delta
       date_range = 'year'
@@ -38,7 +41,7 @@ class SportStatsMixin(object):
     elif 'all' in args:
       # All the months !
       end = today
-      start = limits['min'] or date(year=today.year, month=1, day=1)
+      start = bounds['first'] or date(year=today.year, month=1, day=1)
       date_range = 'all'
 
     else:
@@ -52,15 +55,18 @@ class SportStatsMixin(object):
     months = []
     sports = []
     while d < end:
-      stat = StatsMonth(user, d.year, d.month)
-      if stat.sports:
-        sports += stat.sports.keys()
-      months.append(stat)
+      months.append(StatsMonth(user, d.year, d.month, preload=False))
 
       # Switch to next month
       _, nb_days = monthrange(d.year, d.month)
       d += timedelta(days=nb_days - d.day + 1)
 
+    # Fetch them all at once
+    StatsMonth.fetch_all(months)
+    for stat in months:
+      if stat.sports:
+        sports += stat.sports.keys()
+
     # Unique sports
     sports = Sport.objects.filter(pk__in=set(sports))
 
@@ -68,6 +74,8 @@ class SportStatsMixin(object):
       'start' : start,
       'end' : end,
       'months' : months,
+      'months_refreshing' : any([m.refreshing for m in months]),
+      'loads' : TrainingLoad.weekly(user, start, end),
       'date_range' : date_range,
       'sports' : sports,
       'years' : years,
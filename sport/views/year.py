@@ -1,11 +1,11 @@
 from django.views.generic.dates import YearArchiveView
-from sport.models import SportDay
-from datetime import date, timedelta
-from django.http import Http404
+from sport.models import SportDay, Sport
+from sport.summary import YearSummary
+from datetime import date
 from collections import OrderedDict
-import calendar
+from mixins import DataVersionMixin
 
-class RunCalendarYear(YearArchiveView):
+class RunCalendarYear(DataVersionMixin, YearArchiveView):
   template_name = 'sport/calendar/year.html'
   date_field = 'date'
   model = SportDay
@@ -13,31 +13,23 @@ class RunCalendarYear(YearArchiveView):
   def get_dated_items(self):
     year = int(self.get_year())
 
-    # Get all days as datetimes
-    # an ordered dict of
-    # 12 months ordered dict
-    # of datetimes, None
-    cal = calendar.Calendar()
-    months = OrderedDict([(date(year, m, 1), OrderedDict([
-      (d, None) for d in cal.itermonthdates(year, m) if d.month == m
-    ])) for m in range(1, 13)]) # yup.
-
-    # Load SportDays + SportSession
-    date_start = d = date(year, 1, 1)
-    date_end = date(year, 12, 31)
-    days_raw = SportDay.objects.filter(week__user=self.get_user(), date__gte=date_start, date__lte=date_end)
-    days_raw = days_raw.prefetch_related('sessions', 'sessions__sport')
-    days_raw = days_raw.order_by('date')
-
-    # Map days in months
+    # Compact year, without any ORM objects
+    summary = YearSummary(self.get_user(), year).get()
+    sports = Sport.objects.in_bulk(summary['sports_ids'])
+
+    # Map days in 12 months ordered dicts
+    # of dates, None for empty days
+    months = OrderedDict([(date(year, m, 1), OrderedDict()) for m in range(1, 13)])
     months_active = []
-    for d in days_raw:
-      months[date(year, d.date.month,1)][d.date] = d
+    for day in YearSummary.list_days(summary):
+      if day['type']:
+        day['sport'] = sports.get(day['sport_id'])
 
-      # List only month with active days
-      # for small displays
-      if d.date.month not in months_active:
-        months_active.append(d.date.month)
+        # List only month with active days
+        # for small displays
+        if day['date'].month not in months_active:
+          months_active.append(day['date'].month)
+      months[day['date'].replace(day=1)][day['date']] = day['type'] and day or None
 
     context = {
       'year' : year,
@@ -45,10 +37,11 @@ class RunCalendarYear(YearArchiveView):
       'next_year' : year+1,
       'member' : getattr(self, 'member', None),
       'months_active' : months_active,
+      'today' : date.today(),
     }
     context.update(self.get_links())
 
-    return (months, days_raw, context)
+    return (months, [], context)
 
   def get_user(self):
     return self.request.user
@@ -0,0 +1,147 @@
+from django.core.cache import cache
+from tracks.elevation import garmin_metrics
+import time
+
+# Common distance grid step, in meters
+COMPARE_STEP = 50.0
+
+# Distance of compared splits, in meters
+COMPARE_SPLIT = 1000.0
+
+# Cache duration, in seconds
+COMPARE_CACHE = 7 * 24 * 3600
+
+
+def interpolate(xs, ys, grid):
+  '''
+  Linear interpolation of (xs, ys) on a sorted grid
+  Both series are walked once, side by side
+  '''
+  out = []
+  nb = len(xs)
+  i = 0
+  for g in grid:
+    while i < nb - 2 and xs[i+1] < g:
+      i += 1
+    x0, x1 = xs[i], xs[i+1]
+    y0, y1 = ys[i], ys[i+1]
+    if y0 is None or y1 is None:
+      out.append(y0 if y1 is None else y1)
+    elif x1 == x0:
+      out.append(y0)
+    else:
+      out.append(y0 + (y1 - y0) * (g - x0) / (x1 - x0))
+  return out
+
+
+class TrackSeries(object):
+  '''
+  Distance (in m), time (in s) and elevation (in m)
+  series of a track
+  '''
+  def __init__(self, distances, times, elevations=None):
+    # Only keep increasing distances
+    points = []
+    for p in zip(distances, times, elevations or [None] * len(distances)):
+      if p[0] is None or p[1] is None:
+        continue
+      if points and p[0] <= points[-1][0]:
+        continue
+      points.append(p)
+    self.distances = [p[0] for p in points]
+    self.times = [p[1] for p in points]
+    self.elevations = [p[2] for p in points]
+
+  def __len__(self):
+    return len(self.distances)
+
+  @property
+  def distance(self):
+    return self.distances and self.distances[-1] or 0.0
+
+  @classmethod
+  def from_track(cls, track):
+    '''
+    Use detailed metrics when available
+    and fallback on splits
+    '''
+    if track.provider == 'garmin':
+      details = track.get_file('details')
+      metrics = details and garmin_metrics(details.get_data())
+      if metrics and 'sumDistance' in metrics:
+        times = metrics.get('sumDuration')
+        if not times and 'directTimestamp' in metrics:
+          start = metrics['directTimestamp'][0]
+          times = [t is not None and t - start or None for t in metrics['directTimestamp']]
+        if times:
+          series = cls(metrics['sumDistance'], times, metrics.get('directElevation'))
+          if len(series) >= 2:
+            return series
+
+    splits = track.splits.filter(position__gt=0).order_by('position').values_list('distance_total', 'time_total')
+    distances, times = [0.0], [0.0]
+    for d, t in splits:
+      distances.append(d)
+      times.append(t)
+    series = cls(distances, times)
+    return len(series) >= 2 and series or None
+
+
+def compare_tracks(track, other, step=COMPARE_STEP):
+  '''
+  Compare two tracks along their common distance
+  Gives the time gap curve (positive when the
+  first track is ahead), elevations & splits deltas
+  '''
+  a, b = TrackSeries.from_track(track), TrackSeries.from_track(other)
+  if not a or not b:
+    raise ValueError('Missing series to compare tracks')
+
+  distance = min(a.distance, b.distance)
+  grid = [i * step for i in xrange(int(distance / step) + 1)]
+  times_a, times_b = interpolate(a.distances, a.times, grid), interpolate(b.distances, b.times, grid)
+
+  # Splits on grid positions
+  splits = []
+  per_split = int(COMPARE_SPLIT / step)
+  positions = range(0, len(grid), per_split)
+  if positions[-1] != len(grid) - 1:
+    positions.append(len(grid) - 1)
+  for nb, (start, end) in enumerate(zip(positions, positions[1:])):
+    time_a, time_b = times_a[end] - times_a[start], times_b[end] - times_b[start]
+    splits.append({
+      'position' : nb + 1,
+      'distance' : grid[end] - grid[start],
+      'time_a' : time_a,
+      'time_b' : time_b,
+      'delta' : time_b - time_a,
+    })
+
+  has_elevation = None not in a.elevations and None not in b.elevations
+  return {
+    'tracks' : [track.pk, other.pk],
+    'step' : step,
+    'distances' : grid,
+    'gaps' : [tb - ta for ta, tb in zip(times_a, times_b)],
+    'elevations' : has_elevation and [
+      interpolate(a.distances, a.elevations, grid),
+      interpolate(b.distances, b.elevations, grid),
+    ] or None,
+    'splits' : splits,
+  }
+
+def cached_comparison(track, other):
+  '''
+  Comparison cached per tracks pair
+  Any update on a track changes the key
+  '''
+  key = 'tracks:compare:%d:%d:%d:%d' % (
+    track.pk, other.pk,
+    time.mktime(track.updated.timetuple()),
+    time.mktime(other.updated.timetuple()),
+  )
+  data = cache.get(key)
+  if data is None:
+    data = compare_tracks(track, other)
+    cache.set(key, data, COMPARE_CACHE)
+  return data
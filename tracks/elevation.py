@@ -0,0 +1,309 @@
+from django.conf import settings
+from helpers import gpolyline_decode, haversine
+import logging
+import math
+import mmap
+import os
+import struct
+
+logger = logging.getLogger('coach.sport.garmin')
+
+# Smoothing window, in points
+ELEVATION_WINDOW = 7
+
+# Minimal climb (in meters) to be counted
+# in elevation gain or loss
+ELEVATION_THRESHOLD = 3.0
+
+# Void value in SRTM tiles
+DEM_VOID = -32768
+
+
+class DemRaster(object):
+  '''
+  Read elevations from local SRTM .hgt tiles
+  (ie N45E006.hgt), mapped in memory
+  No network involved
+  '''
+  directory = None
+  tiles = {}
+
+  def __init__(self, directory=None):
+    self.directory = directory or settings.DEM_DIR
+    if not self.directory or not os.path.isdir(self.directory):
+      raise Exception('Missing DEM directory %s' % self.directory)
+    self.tiles = {}
+
+  def tile_name(self, lat, lng):
+    # Tiles are named from their south west corner
+    lat_base, lng_base = int(math.floor(lat)), int(math.floor(lng))
+    return '%s%02d%s%03d.hgt' % (
+      lat_base >= 0 and 'N' or 'S', abs(lat_base),
+      lng_base >= 0 and 'E' or 'W', abs(lng_base),
+    )
+
+  def get_tile(self, lat, lng):
+    '''
+    Load a tile through mmap, once
+    Gives a tuple (map, size) or None
+    '''
+    name = self.tile_name(lat, lng)
+    if name not in self.tiles:
+      path = os.path.join(self.directory, name)
+      if not os.path.exists(path):
+        self.tiles[name] = None
+      else:
+        with open(path, 'rb') as fd:
+          data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        size = int(math.sqrt(len(data) / 2))
+        self.tiles[name] = (data, size)
+    return self.tiles[name]
+
+  def _read(self, data, size, row, col):
+    # Big endian signed shorts, rows from north to south
+    offset = (row * size + col) * 2
+    value = struct.unpack('>h', data[offset:offset+2])[0]
+    if value == DEM_VOID:
+      return None
+    return float(value)
+
+  def elevation(self, lat, lng):
+    '''
+    Bilinear interpolation of the elevation
+    at a position
+    '''
+    tile = self.get_tile(lat, lng)
+    if tile is None:
+      return None
+    data, size = tile
+
+    # Position in tile grid, first row is the north edge
+    y = (math.floor(lat) + 1 - lat) * (size - 1)
+    x = (lng - math.floor(lng)) * (size - 1)
+    row, col = min(int(y), size - 2), min(int(x), size - 2)
+    dy, dx = y - row, x - col
+
+    values = [self._read(data, size, r, c) for r, c in ((row, col), (row, col+1), (row+1, col), (row+1, col+1))]
+    if None in values:
+      # Fallback to any valid neighbour
+      values = [v for v in values if v is not None]
+      if not values:
+        return None
+      return sum(values) / len(values)
+
+    top = values[0] * (1 - dx) + values[1] * dx
+    bottom = values[2] * (1 - dx) + values[3] * dx
+    return top * (1 - dy) + bottom * dy
+
+  def close(self):
+    for tile in self.tiles.values():
+      if tile:
+        tile[0].close()
+    self.tiles = {}
+
+
+def smooth(values, window=ELEVATION_WINDOW):
+  '''
+  Centered moving average, computed in one pass
+  using cumulative sums (no per point window sum)
+  '''
+  nb = len(values)
+  if nb < 3 or window < 2:
+    return list(values)
+
+  sums = [0.0]
+  for v in values:
+    sums.append(sums[-1] + v)
+
+  half = window / 2
+  out = []
+  for i in xrange(nb):
+    start, end = max(0, i - half), min(nb, i + half + 1)
+    out.append((sums[end] - sums[start]) / (end - start))
+  return out
+
+def elevation_delta(elevations, threshold=ELEVATION_THRESHOLD):
+  '''
+  Cumulated gain & loss, using an hysteresis
+  threshold to skip remaining noise
+  '''
+  gain, loss = 0.0, 0.0
+  ref = None
+  for e in elevations:
+    if ref is None:
+      ref = e
+      continue
+    diff = e - ref
+    if abs(diff) < threshold:
+      continue
+    if diff > 0:
+      gain += diff
+    else:
+      loss -= diff
+    ref = e
+  return gain, loss
+
+def garmin_metrics(details):
+  '''
+  Load all the measurements from Garmin details
+  as columns of values, per measurement key
+  Distances are converted in meters
+  '''
+  base = details.get('com.garmin.activity.details.json.ActivityDetails', {})
+  if 'measurements' not in base or 'metrics' not in base:
+    return None
+
+  def _ratio(m):
+    unit = m.get('unit')
+    unit = isinstance(unit, dict) and unit.get('key') or unit
+    return {'kilometer' : 1000.0, 'millisecond' : 0.001}.get(unit, 1.0)
+
+  indexes = dict([(m['key'], (m['metricsIndex'], _ratio(m))) for m in base['measurements']])
+  columns = dict([(k, []) for k in indexes])
+  for m in base['metrics']:
+    values = m.get('metrics')
+    if not values:
+      continue
+    for key, (index, ratio) in indexes.items():
+      v = values[index]
+      columns[key].append(v is not None and float(v) * ratio or v)
+
+  return columns
+
+
+class ElevationSeries(object):
+  '''
+  Distance (in m) and elevation series of a track
+  With optional positions for DEM resampling
+  '''
+  distances = []
+  elevations = []
+  positions = []
+
+  def __init__(self, distances, elevations, positions=None):
+    self.distances = distances
+    self.elevations = elevations
+    self.positions = positions or []
+
+  def __len__(self):
+    return len(self.distances)
+
+  @classmethod
+  def from_track(cls, track):
+    '''
+    Build the series from stored provider files
+    '''
+    details = track.get_file('details')
+    details = details and details.get_data()
+    if not details:
+      return None
+
+    if track.provider == 'garmin':
+      return cls.from_garmin(details)
+    if track.provider == 'strava':
+      return cls.from_strava(details)
+    return None
+
+  @classmethod
+  def from_garmin(cls, details):
+    metrics = garmin_metrics(details)
+    if not metrics or 'sumDistance' not in metrics:
+      return None
+
+    nb = len(metrics['sumDistance'])
+    distances = [d or 0.0 for d in metrics['sumDistance']]
+    elevations = metrics.get('directElevation', [None] * nb)
+    positions = []
+    if 'directLatitude' in metrics and 'directLongitude' in metrics:
+      positions = zip(metrics['directLatitude'], metrics['directLongitude'])
+
+    # Skip positions when partially available
+    if len([p for p in positions if p == (0.0, 0.0)]):
+      positions = []
+
+    return cls(distances, elevations, positions)
+
+  @classmethod
+  def from_strava(cls, details):
+    # No elevation stored, only a polyline
+    # DEM resampling is mandatory
+    polyline = details.get('map', {}).get('polyline')
+    if not polyline:
+      return None
+    positions = gpolyline_decode(polyline)
+
+    distances = [0.0]
+    for a, b in zip(positions, positions[1:]):
+      distances.append(distances[-1] + haversine(a, b))
+
+    return cls(distances, [None] * len(positions), positions)
+
+  def resample(self, dem):
+    '''
+    Replace elevations with DEM values
+    Keep original value when DEM has no data
+    '''
+    if len(self.positions) != len(self.distances):
+      return False
+    elevations = []
+    for (lat, lng), e in zip(self.positions, self.elevations):
+      value = dem.elevation(lat, lng)
+      elevations.append(value if value is not None else e)
+    self.elevations = elevations
+    return True
+
+  def cleanup(self):
+    '''
+    Remove points without elevation
+    '''
+    points = [(d, e) for d, e in zip(self.distances, self.elevations) if e is not None]
+    self.distances = [p[0] for p in points]
+    self.elevations = [float(p[1]) for p in points]
+    self.positions = []
+
+  def split(self, start, end):
+    # Elevations between two distances
+    return [e for d, e in zip(self.distances, self.elevations) if start <= d <= end]
+
+
+def build_elevation(track, dem=None, window=ELEVATION_WINDOW):
+  '''
+  Smooth the elevation series of a track, optionally
+  resampled on a DEM, then update gain & loss
+  on splits, total split & session
+  '''
+  series = ElevationSeries.from_track(track)
+  if not series:
+    return None
+
+  if dem:
+    series.resample(dem)
+  series.cleanup()
+  if len(series) < 2:
+    return None
+  series.elevations = smooth(series.elevations, window)
+
+  # Update every split from its distance range
+  for split in track.splits.filter(position__gt=0).order_by('position'):
+    elevations = series.split(split.distance_total - split.distance, split.distance_total)
+    if not elevations:
+      continue
+    split.elevation_gain, split.elevation_loss = elevation_delta(elevations)
+    split.elevation_min, split.elevation_max = min(elevations), max(elevations)
+    split.save()
+
+  # Update total
+  gain, loss = elevation_delta(series.elevations)
+  if track.split_total:
+    total = track.split_total
+    total.elevation_gain, total.elevation_loss = gain, loss
+    total.elevation_min, total.elevation_max = min(series.elevations), max(series.elevations)
+    total.save()
+
+  session = track.session
+  if (session.elevation_gain, session.elevation_loss) != (gain, loss):
+    session.elevation_gain, session.elevation_loss = gain, loss
+    session.save()
+  logger.debug('Track #%d elevation: +%f / -%f' % (track.pk, gain, loss))
+
+  return gain, loss
@@ -0,0 +1,196 @@
+from django.db.models import Q
+from tracks.models import Track
+from helpers import haversine
+import logging
+import math
+import time
+
+logger = logging.getLogger('coach.sport.garmin')
+
+# Size of a time bucket, in seconds
+GROUP_BUCKET = 900
+
+# Minimal time overlap between two tracks
+# as a ratio of the shortest one
+GROUP_TIME_RATIO = 0.5
+
+# Max distance between two points
+# to be considered together, in meters
+GROUP_DISTANCE = 100.0
+
+# Minimal ratio of close points, on both tracks
+GROUP_POINTS_RATIO = 0.6
+
+# Grid cell size for points lookup, in degrees
+# (~110m of latitude, less of longitude)
+GROUP_CELL = 0.001
+
+# Length of a degree of latitude, in meters
+DEGREE_LENGTH = 2 * math.pi * 6371000.0 / 360
+
+
+def _bucket(dt):
+  return int(time.mktime(dt.timetuple())) / GROUP_BUCKET
+
+def _related_users(user_ids):
+  '''
+  Map every user to the set of users
+  sharing a club or a friendship
+  '''
+  from club.models import ClubMembership
+  from users.models import Athlete
+
+  related = dict([(u, set()) for u in user_ids])
+
+  # Friends
+  friendships = Athlete.friends.through.objects.filter(from_athlete__in=user_ids, to_athlete__in=user_ids)
+  for a, b in friendships.values_list('from_athlete', 'to_athlete'):
+    related[a].add(b)
+
+  # Club members
+  clubs = {}
+  memberships = ClubMembership.objects.filter(user__in=user_ids).exclude(role__in=('prospect', 'archive'))
+  for club_id, user_id in memberships.values_list('club', 'user'):
+    clubs.setdefault(club_id, set()).add(user_id)
+  for members in clubs.values():
+    for u in members:
+      related[u].update(members)
+
+  return related
+
+class TrackPoints(object):
+  '''
+  Simplified track positions, indexed
+  on a regular grid for neighbours lookup
+  '''
+  def __init__(self, coords):
+    self.coords = coords
+    self.grid = {}
+    for c in coords:
+      self.grid.setdefault(self.cell(c), []).append(c)
+
+  def cell(self, c):
+    return (int(math.floor(c[0] / GROUP_CELL)), int(math.floor(c[1] / GROUP_CELL)))
+
+  def is_close(self, c, distance=GROUP_DISTANCE):
+    # Cells to search around the point, longitude
+    # cells shrinking with the latitude
+    cell = GROUP_CELL * DEGREE_LENGTH
+    nx = int(math.ceil(distance / cell))
+    ny = int(math.ceil(distance / (cell * max(math.cos(math.radians(c[0])), 0.01))))
+    x, y = self.cell(c)
+    for dx in range(-nx, nx + 1):
+      for dy in range(-ny, ny + 1):
+        for p in self.grid.get((x + dx, y + dy), []):
+          if haversine(c, p) <= distance:
+            return True
+    return False
+
+  def ratio(self, other):
+    # Ratio of points close to the other track
+    if not self.coords:
+      return 0.0
+    return len([c for c in self.coords if other.is_close(c)]) / float(len(self.coords))
+
+
+def _time_overlap(a, b):
+  start, end = max(a['date_start'], b['date_start']), min(a['date_end'], b['date_end'])
+  if end <= start:
+    return 0.0
+  shortest = min(a['date_end'] - a['date_start'], b['date_end'] - b['date_start'])
+  return (end - start).total_seconds() / max(shortest.total_seconds(), 1)
+
+def _bbox_intersects(a, b):
+  (ax1, ay1, ax2, ay2), (bx1, by1, bx2, by2) = a, b
+  return ax1 <= bx2 and bx1 <= ax2 and ay1 <= by2 and by1 <= ay2
+
+def detect_group_runs(start, end=None):
+  '''
+  Link tracks from related athletes done together
+  between two datetimes
+   * time buckets index to get concurrent tracks
+   * bounding box prefilter
+   * positions comparison on remaining pairs
+  '''
+  tracks = Track.objects.filter(simple__isnull=False, split_total__date_start__gte=start)
+  tracks = tracks.exclude(Q(split_total__date_start__isnull=True) | Q(split_total__date_end__isnull=True))
+  if end:
+    tracks = tracks.filter(split_total__date_start__lt=end)
+  tracks = tracks.select_related('split_total', 'session__day__week')
+
+  # Index tracks per time buckets
+  infos = {}
+  buckets = {}
+  for t in tracks:
+    info = {
+      'track' : t,
+      'user' : t.session.day.week.user_id,
+      'date_start' : t.split_total.date_start,
+      'date_end' : t.split_total.date_end,
+      'bbox' : t.simple.extent,
+    }
+    infos[t.pk] = info
+    for b in range(_bucket(info['date_start']), _bucket(info['date_end']) + 1):
+      buckets.setdefault(b, []).append(t.pk)
+  if not infos:
+    return 0
+
+  related = _related_users(set([i['user'] for i in infos.values()]))
+
+  # List candidate pairs sharing a bucket
+  pairs = set()
+  for pks in buckets.values():
+    for i, a in enumerate(pks):
+      for b in pks[i+1:]:
+        ia, ib = infos[a], infos[b]
+        if ia['user'] == ib['user'] or ib['user'] not in related[ia['user']]:
+          continue
+        pairs.add((min(a, b), max(a, b)))
+
+  # Compare remaining pairs
+  points = {}
+  def _points(pk):
+    if pk not in points:
+      points[pk] = TrackPoints(infos[pk]['track'].simple.coords)
+    return points[pk]
+
+  nb = 0
+  for a, b in pairs:
+    ia, ib = infos[a], infos[b]
+    if _time_overlap(ia, ib) < GROUP_TIME_RATIO:
+      continue
+    if not _bbox_intersects(ia['bbox'], ib['bbox']):
+      continue
+    pa, pb = _points(a), _points(b)
+    if pa.ratio(pb) < GROUP_POINTS_RATIO or pb.ratio(pa) < GROUP_POINTS_RATIO:
+      continue
+
+    ia['track'].companions.add(ib['track'])
+    logger.info('Group run between tracks #%d & #%d' % (a, b))
+    nb += 1
+
+  return nb
+
+def list_companions(tracks, visitor):
+  '''
+  Companions of some tracks visible to a visitor,
+  per track, checked against their athletes privacy
+  '''
+  companions = {}
+  through = Track.companions.through.objects.filter(from_track__in=tracks)
+  through = through.select_related('to_track__session__day__week__user')
+  rights = {}
+  for link in through.order_by('to_track'):
+    c = link.to_track
+    user = c.session.day.week.user
+    if user.pk not in rights:
+      rights[user.pk] = user.get_privacy_rights(visitor)
+    if 'tracks' not in rights[user.pk]:
+      continue
+    companions.setdefault(link.from_track_id, []).append({
+      'user' : user,
+      'date' : c.session.day.date,
+      'avatar' : 'avatar' in rights[user.pk],
+      'calendar' : 'calendar' in rights[user.pk],
+    })
+  return companions
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import connections
+from optparse import make_option
+from multiprocessing import Pool
+from tracks.models import Track
+from tracks.elevation import build_elevation, DemRaster
+import time
+
+def _build_tracks(args):
+  '''
+  Worker: re-process a chunk of tracks
+  Every worker uses its own db connection & DEM maps
+  '''
+  track_ids, dem_dir = args
+  dem = dem_dir and DemRaster(dem_dir) or None
+  done, failed = 0, 0
+  for track in Track.objects.filter(pk__in=track_ids).select_related('session', 'split_total'):
+    try:
+      if build_elevation(track, dem):
+        done += 1
+    except Exception, e:
+      print 'Track #%d failed: %s' % (track.pk, str(e))
+      failed += 1
+  if dem:
+    dem.close()
+  return len(track_ids), done, failed
+
+class Command(BaseCommand):
+  option_list = BaseCommand.option_list + (
+    make_option('--username',
+      action='store',
+      dest='username',
+      type='string',
+      default=False,
+      help='Only process tracks of the specified user.',
+    ),
+    make_option('--processes',
+      action='store',
+      dest='processes',
+      type='int',
+      default=4,
+      help='Number of worker processes.',
+    ),
+    make_option('--chunk',
+      action='store',
+      dest='chunk',
+      type='int',
+      default=50,
+      help='Number of tracks per worker task.',
+    ),
+    make_option('--no-dem',
+      action='store_false',
+      dest='dem',
+      default=True,
+      help='Do not resample elevation on local DEM.',
+    ),
+  )
+
+  def handle(self, *args, **options):
+    tracks = Track.objects.all().order_by('pk')
+    if options['username']:
+      tracks = tracks.filter(session__user__username=options['username'])
+    track_ids = list(tracks.values_list('pk', flat=True))
+    if not track_ids:
+      raise CommandError('No tracks to process')
+
+    dem_dir = options['dem'] and settings.DEM_DIR or None
+    chunk = options['chunk']
+    chunks = [(track_ids[i:i+chunk], dem_dir) for i in range(0, len(track_ids), chunk)]
+    print 'Processing %d tracks in %d chunks (DEM: %s)' % (len(track_ids), len(chunks), dem_dir or 'none')
+
+    # Forked workers must not share the parent db connections
+    for conn in connections.all():
+      conn.close()
+
+    start = time.time()
+    pool = Pool(options['processes'])
+    processed, done, failed = 0, 0, 0
+    try:
+      for p, d, f in pool.imap_unordered(_build_tracks, chunks):
+        processed += p
+        done += d
+        failed += f
+        print '%d/%d tracks processed' % (processed, len(track_ids))
+    finally:
+      pool.close()
+      pool.join()
+
+    print 'Updated %d tracks, %d failed, in %.1fs' % (done, failed, time.time() - start)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0013_track_thumb'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='companions',
+            field=models.ManyToManyField(related_name='companions_rel_+', to='tracks.Track', blank=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.gis.db import models
+from django.db.models.signals import post_save, post_delete
 from sport.models import SportSession, SportDay, SportWeek
+from sport.summary import WeekSummary
+from sport.version import DataVersion
 from .file import TrackFile
 from hashlib import md5
 from helpers import date_to_week
@@ -39,6 +42,10 @@ class Track(models.Model):
   image = models.ImageField(upload_to=build_image_path, null=True, blank=True)
   thumb = models.ImageField(upload_to=build_thumb_path, null=True, blank=True)
 
+  # Tracks from other athletes done together
+  # It's automatically symmetrical
+  companions = models.ManyToManyField('self', blank=True)
+
   class Meta:
     unique_together = (
       ('provider', 'provider_id'),
@@ -242,3 +249,18 @@ class Track(models.Model):
     return full_path
 
 
+def track_summary_bump(sender, instance, raw=False, **kwargs):
+  '''
+  Tracks are part of the days & weeks
+  summaries, and of the user data version
+  '''
+  if raw:
+    return
+  day = instance.session.day
+  day.update_summary()
+  WeekSummary.bump(day.week.user_id, day.date)
+  DataVersion.bump(day.week.user_id)
+
+# register the summary signals
+post_save.connect(track_summary_bump, sender=Track)
+post_delete.connect(track_summary_bump, sender=Track)
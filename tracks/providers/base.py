@@ -1,12 +1,12 @@
 from django.conf import settings
 import logging
 import json
-from django.db import transaction
+from helpers import commit_hooks
 from django.db.models import Min, Max, Count
 import hashlib
 from tracks.models import Track, TrackSplit, TrackFile
-from sport.stats import StatsMonth, StatsWeek
-from helpers import date_to_week
+from tracks.elevation import build_elevation, DemRaster
+from sport.stats import list_stats, mark_dirty
 
 logger = logging.getLogger('coach.sport.garmin')
 
@@ -108,8 +108,8 @@ class TrackProvider:
     '''
     Gives simple stats about imported tracks
     '''
-    tracks = Track.objects.filter(provider=self.NAME, session__day__week__user=self.user)
-    stats = tracks.aggregate(min_date=Min('session__day__date'), max_date=Max('session__day__date'), total=Count('id'))
+    tracks = Track.objects.filter(provider=self.NAME, session__user=self.user)
+    stats = tracks.aggregate(min_date=Min('session__date'), max_date=Max('session__date'), total=Count('id'))
     return stats
 
   def import_user(self, full=False):
@@ -125,22 +125,15 @@ class TrackProvider:
 
     # Import tracks !
     nb = 0
-    months = [] # to build stats cache
-    weeks = []
+    dates = [] # to build stats cache
     while True:
       tracks = []
       try:
         tracks = self.check_tracks(nb)
 
-        # Get the months & weeks to refresh stats
+        # Get the dates to refresh stats
         for t in tracks:
-          date = t.session.day.date
-          m = (date.year, date.month)
-          w = date_to_week(date)
-          if m not in months:
-            months.append(m)
-          if w not in weeks:
-            weeks.append(m)
+          dates.append(t.session.day.date)
           nb += 1
       except TrackSkipUpdateException, e:
         if full:
@@ -160,17 +153,10 @@ class TrackProvider:
       if not len(tracks):
         break
 
-    # Refresh months stats cache
-    for year,month in months:
-      logger.info("Refresh month stats %d/%d for %s" % (month, year, self.user))
-      st = StatsMonth(self.user, year, month, preload=False)
-      st.build()
-
-    # Refresh weeks stats cache
-    for year,week in weeks:
-      logger.info("Refresh week stats %d/%d for %s" % (week, year, self.user))
-      st = StatsWeek(self.user, year, week, preload=False)
-      st.build()
+    # Queue weeks & months stats rebuild, all at once
+    if dates:
+      logger.info("Refresh stats from %s to %s for %s" % (min(dates), max(dates), self.user))
+      mark_dirty(list_stats([self.user], min(dates), max(dates)))
 
   def import_activities(self, source=None):
     '''
@@ -185,7 +171,7 @@ class TrackProvider:
     for activity in source:
       act = None
       try:
-        with transaction.atomic():
+        with commit_hooks():
           act, updated = self.build_track(activity)
           if act:
             activities.append(act)
@@ -268,6 +254,24 @@ class TrackProvider:
     # Finally, attach splits
     self.attach_splits(track, activity)
 
+    # Smooth elevation & update gain/loss
+    dem = None
+    try:
+      dem = settings.DEM_DIR and DemRaster() or None
+      build_elevation(track, dem)
+    except Exception, e:
+      logger.warn('No elevation: %s' % (str(e), ))
+    finally:
+      if dem:
+        dem.close()
+
+    # Score planned workout execution
+    if hasattr(track.session, 'plan_session'):
+      try:
+        track.session.plan_session.check_compliance(track)
+      except Exception, e:
+        logger.warn('No compliance: %s' % (str(e), ))
+
     # Build image (needs pk)
     try:
       track.build_image()
@@ -26,3 +26,16 @@ def tracks_import(*args, **kwargs):
 def provider_import(provider):
   # Helper to run a provider import
   provider.import_user()
+
+@shared_task
+def group_runs(days=2):
+  '''
+  Link recent tracks done together
+  by friends or club members
+  '''
+  from tracks.group import detect_group_runs
+  from django.utils import timezone
+  from datetime import timedelta
+
+  start = timezone.now() - timedelta(days=days)
+  return detect_group_runs(start)
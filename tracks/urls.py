@@ -14,6 +14,9 @@ urlpatterns = patterns('',
   # Get track coordinates
   url(r'^coords/(?P<track_id>\d+).json$', TrackCoordsView.as_view(), name="track-coords"),
 
+  # Compare two tracks along distance
+  url(r'^compare/(?P<track_id>\d+)/(?P<other_id>\d+).json$', TrackCompareView.as_view(), name="track-compare"),
+
   # Update session
   url(r'^session/(?P<track_id>\d+)/?', TrackSessionView.as_view(), name="track-session"),
 )
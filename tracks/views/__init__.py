@@ -1,3 +1,3 @@
-from view import TrackCoordsView, TrackSessionView
+from view import TrackCoordsView, TrackCompareView, TrackSessionView
 from oauth import TrackOauthRedirect
 from providers import TrackProviders, TrackProviderDisconnect
@@ -12,13 +12,17 @@ class TrackMixin(object):
 
   def get_object(self, check_ownership=False):
     # Load requested track
-    self.track = get_object_or_404(Track, pk=self.kwargs['track_id'])
+    self.track = self.load_track(self.kwargs['track_id'], check_ownership)
+    return self.track
+
+  def load_track(self, track_id, check_ownership=False):
+    track = get_object_or_404(Track, pk=track_id)
 
     # Check right access to tracks
-    track_user = self.track.session.day.week.user
+    track_user = track.session.day.week.user
     if check_ownership and track_user != self.request.user:
       raise PermissionDenied
     if 'tracks' not in track_user.get_privacy_rights(self.request.user):
       raise PermissionDenied
 
-    return self.track
+    return track
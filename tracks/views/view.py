@@ -1,7 +1,9 @@
 from django.views.generic.detail import BaseDetailView
+from django.http import Http404
 from mixins import TrackMixin
 from coach.mixins import JsonResponseMixin, JSON_OPTION_RAW, JSON_OPTION_BODY_RELOAD, JSON_OPTION_NO_HTML
 from sport.models import SportSession
+from tracks.compare import cached_comparison
 
 
 class TrackCoordsView(TrackMixin, JsonResponseMixin, BaseDetailView):
@@ -21,6 +23,17 @@ class TrackCoordsView(TrackMixin, JsonResponseMixin, BaseDetailView):
       'coordinates' : track.simple and track.simple.coords or [],
     }
 
+class TrackCompareView(TrackMixin, JsonResponseMixin, BaseDetailView):
+  json_options = [JSON_OPTION_RAW, ]
+
+  def get_context_data(self, *args, **kwargs):
+    # Both tracks must be accessible
+    other = self.load_track(self.kwargs['other_id'])
+    try:
+      return cached_comparison(self.object, other)
+    except ValueError, e:
+      raise Http404(str(e)) # manual or split-less tracks
+
 class TrackSessionView(TrackMixin, JsonResponseMixin, BaseDetailView):
   json_options = [JSON_OPTION_BODY_RELOAD, JSON_OPTION_NO_HTML, ]
 
@@ -71,7 +71,7 @@ class Command(BaseCommand):
   def build_session(self, sport_day):
     # Pick a random SportSession
     week_day = int(sport_day.date.strftime('%w')) + 1 # special format for django orm (1 is sunday)
-    rand_session = SportSession.objects.filter(name__isnull=False, day__date__week_day=week_day).order_by('?').first()
+    rand_session = SportSession.objects.filter(name__isnull=False, date__week_day=week_day).order_by('?').first()
 
     # Build session
     session_data = {
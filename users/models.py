@@ -9,7 +9,7 @@ from django.core import validators
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed
 from django.utils.functional import cached_property
 from hashlib import md5
 from datetime import datetime
@@ -332,8 +332,8 @@ class Athlete(AthleteBase):
     tommorow = date.today() + timedelta(days=1)
     f = {
       'type' : 'race',
-      'day__date' : tommorow,
-      'day__week__user__in' : related,
+      'date' : tommorow,
+      'user__in' : related,
     }
     races = SportSession.objects.filter(**f)
     races = races.prefetch_related('day', 'day__week', 'day__week__user')
@@ -430,9 +430,51 @@ def user_initial_subscription(sender, instance, created=False, **kwargs):
     if created:
       instance.add_welcome_offer()
 
+def user_dashboard_refresh(sender, instance, raw=False, created=False, **kwargs):
+  '''
+  Profile (vma) or friends changed:
+  rebuild the user dashboard
+  '''
+  from sport.dashboard import Dashboard
+  if raw or created or kwargs.get('action', 'post_').startswith('pre_'):
+    return
+  if kwargs.get('update_fields') == frozenset(['last_login', ]):
+    return # on every login
+  Dashboard.schedule([instance.pk, ] + list(kwargs.get('pk_set') or []))
+
+def user_feed_rebuild(sender, instance, action, pk_set=None, **kwargs):
+  '''
+  Friends changed: rebuild both sides timelines
+  '''
+  from friends.tasks import rebuild_friends_feeds
+  if not action.startswith('post_'):
+    return
+  rebuild_friends_feeds.delay([instance.pk, ] + list(pk_set or []))
+
+def user_menu_bump(sender, instance, raw=False, **kwargs):
+  '''
+  Name & staff roles are in the navigation menu
+  '''
+  from coach.menu import bump_menu
+  if raw:
+    return
+  if kwargs.get('update_fields') == frozenset(['last_login', ]):
+    return # on every login
+  bump_menu([instance.pk, ])
+
 # register the Welcome offer signal
 post_save.connect(user_initial_subscription, sender=Athlete)
 
+# register the navigation menu signal
+post_save.connect(user_menu_bump, sender=Athlete)
+
+# register the dashboard signals
+post_save.connect(user_dashboard_refresh, sender=Athlete)
+m2m_changed.connect(user_dashboard_refresh, sender=Athlete.friends.through)
+
+# register the friends feed signals
+m2m_changed.connect(user_feed_rebuild, sender=Athlete.friends.through)
+
 
 class UserCategory(models.Model):
   code = models.CharField(max_length=10)
@@ -4,7 +4,7 @@ from garmin import GarminLogin
 from preferences import Preferences, UpdatePassword
 from profile import PublicProfile, OwnProfile
 from races import RacesView
-from calendar import AthleteCalendarWeek, AthleteCalendarMonth, AthleteCalendarDay, AthleteCalendarYear, AthleteExportMonth
+from calendar import AthleteCalendarWeek, AthleteCalendarMonth, AthleteCalendarDay, AthleteCalendarYear, AthleteExportMonth, AthleteExportRange
 from stats import AthleteStats
 from notifications import UserNotificationsList, UserNotificationsClear
 from gcal import GCalOauthView
@@ -1,5 +1,5 @@
 from users.views.mixins import ProfilePrivacyMixin
-from sport.views import RunCalendarYear, RunCalendar, RunCalendarDay, WeeklyReport, ExportMonth
+from sport.views import RunCalendarYear, RunCalendar, RunCalendarDay, WeeklyReport, ExportSessions, ExportMonth
 
 class AthleteCalendarMixin(ProfilePrivacyMixin):
   rights_needed = ('calendar', )
@@ -27,3 +27,6 @@ class AthleteCalendarDay(AthleteCalendarMixin, RunCalendarDay):
 
 class AthleteExportMonth(ProfilePrivacyMixin, ExportMonth):
   rights_needed = ('trainer', )
+
+class AthleteExportRange(ProfilePrivacyMixin, ExportSessions):
+  rights_needed = ('trainer', )
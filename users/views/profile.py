@@ -5,6 +5,7 @@ from users.views.mixins import ProfilePrivacyMixin
 from sport.views.mixins import AthleteRaces
 from sport.views.stats import SportStatsMixin
 from sport.models import SportSession
+from sport.summary import YearSummary
 from datetime import date
 import operator
 
@@ -43,12 +44,12 @@ class PublicProfile(ProfilePrivacyMixin, DetailView, SportStatsMixin, AthleteRac
   def get_recent_stats(self, nb=3):
     # Load last sessions
     today = date.today()
-    last_sessions = SportSession.objects.filter(day__week__user=self.member, day__date__lte=today)
+    last_sessions = SportSession.objects.filter(user=self.member, date__lte=today)
     last_sessions = last_sessions.exclude(type='rest')
-    last_sessions = last_sessions.order_by('-day__date')[:nb]
+    last_sessions = last_sessions.order_by('-date')[:nb]
 
     # Load most commented
-    commented_sessions = SportSession.objects.filter(day__week__user=self.member)
+    commented_sessions = SportSession.objects.filter(user=self.member)
     commented_sessions = commented_sessions.exclude(comments_public__isnull=True)
     commented_sessions = commented_sessions.annotate(nb_comments=Count('comments_public__messages')).order_by('-nb_comments')[:nb]
     for c in commented_sessions:
@@ -56,6 +57,7 @@ class PublicProfile(ProfilePrivacyMixin, DetailView, SportStatsMixin, AthleteRac
 
     return {
       'today' : today,
+      'year_days' : list(YearSummary.list_days(YearSummary(self.member, today.year).get())),
       'last_sessions' : last_sessions,
       'commented_sessions' : commented_sessions,
     }